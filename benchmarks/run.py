@@ -0,0 +1,220 @@
+# --- Pipeline Benchmark Suite --- #
+# Times each pipeline stage on its own and the full /match request, over synthetic profile sets of increasing size,
+# and compares the results with stored baselines to catch performance regressions.
+# The LLM is replaced by a local stand-in, so no API key or network access is needed.
+#
+# Usage: python -m benchmarks.run                      (compare with benchmarks/baselines.json)
+#        python -m benchmarks.run --save-baseline      (record the current timings as the new baseline)
+#        python -m benchmarks.run --sizes 10 1000      (only run the given profile set sizes)
+#
+# Baselines are machine specific: record them on the machine the comparison will run on.
+# Single-pair heuristic scoring is timed cold (config.TRAIT_CACHE_ENABLED off, so every pair is scored) and, under names
+# ending in _warm, with the trait cache already filled by the warm-up run, so the two are never compared with each other.
+
+
+# Import Libraries
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from src import config
+from src import heuristics
+from src import matching
+from src import pipeline
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baselines.json")
+AUDIO_PATH = os.path.join(pipeline.PROJECT_ROOT, "tests", "dummy_audio.wav")
+
+DEFAULT_SIZES = [10, 1000, 100_000, 1_000_000]
+# Per-pair Python loops are only timed up to this many pairs; larger sets are reported per pair
+SCALAR_PAIR_LIMIT = 10_000
+
+TRANSCRIPT = ("So what got you interested in space? Honestly I think it started with the Mars missions. "
+              "I love the idea of building something that outlasts us, but the logistics scare me a bit. ") * 20
+
+ANALYSIS_RESULTS = {"topic_vector": [0.9, 0.7, 0.3, 0.4, 0.6], "engagement_score": 0.75, "vader_engagement": 0.3, "word_count": 750}
+
+
+# Local Stand-in for the OpenAI API
+class _StandInCompletions:
+    def create(self, **kwargs):
+        content = json.dumps({"topics": ["Mars", "Risk", "Legacy", "Logistics", "Curiosity"],
+                              "topic_vector": [0.9, 0.7, 0.3, 0.4, 0.6],
+                              "engagement_score": 0.75})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class _AsyncStandInCompletions(_StandInCompletions):
+    async def create(self, **kwargs):
+        return _StandInCompletions.create(self, **kwargs)
+
+
+def _use_stand_in_llm():
+    """
+    Points the pipeline at the local stand-in LLM and disables the topic cache, so every call does the full work.
+    """
+    pipeline.get_openai_client = lambda: SimpleNamespace(chat=SimpleNamespace(completions=_StandInCompletions()))
+    pipeline.get_async_openai_client = lambda: SimpleNamespace(chat=SimpleNamespace(completions=_AsyncStandInCompletions()))
+    pipeline.get_topic_cache = lambda: None
+
+
+# Timing
+def _time(func, repeats: int) -> float:
+    """
+    Median wall time of func over several runs, after one warm-up run.
+    """
+    func()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+@contextlib.contextmanager
+def _trait_cache(enabled: bool):
+    """
+    Turns the per-pair trait score cache on or off for the block.
+    """
+    previous = config.TRAIT_CACHE_ENABLED
+    config.TRAIT_CACHE_ENABLED = enabled
+    try:
+        yield
+    finally:
+        config.TRAIT_CACHE_ENABLED = previous
+
+
+def _scalar_pairs(query, profiles):
+    for candidate in profiles:
+        heuristics.calculate_heuristic_score(query, candidate, ANALYSIS_RESULTS)
+
+
+def _scalar_baseline(query, profiles):
+    for candidate in profiles:
+        heuristics.baseline_compatibility_score(pipeline.fuse_vectors(query, ANALYSIS_RESULTS["topic_vector"]),
+                                                pipeline.fuse_vectors(candidate, ANALYSIS_RESULTS["topic_vector"]))
+
+
+def stage_benchmarks(repeats: int) -> dict:
+    """
+    Times each pipeline stage once per call.
+    """
+    results = {}
+    user_1, user_2 = [0.8, 0.4, 0.7, 0.2, 0.9], [0.3, 0.9, 0.1, 0.6, 0.4]
+
+    try:
+        pipeline.get_whisper_model()
+        results["transcribe_audio"] = _time(lambda: pipeline.transcribe_audio(AUDIO_PATH), max(1, repeats // 5))
+    except Exception as e:
+        print(f"Skipping transcribe_audio: {e}")
+
+    results["get_topics_and_vectors"] = _time(lambda: pipeline.get_topics_and_vectors(TRANSCRIPT), repeats)
+    results["get_vader_sentiment"] = _time(lambda: pipeline.get_vader_sentiment(TRANSCRIPT), repeats)
+    results["fuse_vectors"] = _time(lambda: pipeline.fuse_vectors(user_1, ANALYSIS_RESULTS["topic_vector"]), repeats)
+    with _trait_cache(False):
+        results["calculate_heuristic_score"] = _time(lambda: heuristics.calculate_heuristic_score(user_1, user_2, ANALYSIS_RESULTS), repeats)
+    with _trait_cache(True):
+        results["calculate_heuristic_score_warm"] = _time(lambda: heuristics.calculate_heuristic_score(user_1, user_2, ANALYSIS_RESULTS), repeats)
+
+    fused_1 = pipeline.fuse_vectors(user_1, ANALYSIS_RESULTS["topic_vector"])
+    fused_2 = pipeline.fuse_vectors(user_2, ANALYSIS_RESULTS["topic_vector"])
+    results["baseline_compatibility_score"] = _time(lambda: heuristics.baseline_compatibility_score(fused_1, fused_2), repeats)
+
+    from fastapi.testclient import TestClient
+    from src.main import app
+    client = TestClient(app)
+    # Each request gets a new transcript, so the analysis store cannot serve it and the LLM and VADER run every time
+    counter = itertools.count()
+    results["match_request"] = _time(lambda: client.post("/match", json={"text": f"{TRANSCRIPT} (call {next(counter)})"}), repeats)
+
+    return results
+
+
+def population_benchmarks(sizes: list[int], repeats: int) -> dict:
+    """
+    Times scoring one user against synthetic profile sets of each size.
+    Per-pair loops are timed on at most SCALAR_PAIR_LIMIT pairs and scaled up to the full set size.
+    """
+    results = {}
+    rng = np.random.default_rng(0)
+
+    for size in sizes:
+        profiles = rng.random((size, 5))
+        query = profiles[0].tolist()
+        sample = profiles[:SCALAR_PAIR_LIMIT].tolist()
+        scale = size / len(sample)
+        population_repeats = max(1, repeats // 10) if size >= 100_000 else repeats
+
+        with _trait_cache(False):
+            results[f"heuristic_score_loop[{size}]"] = _time(lambda: _scalar_pairs(query, sample), max(1, repeats // 10)) * scale
+        with _trait_cache(True):
+            results[f"heuristic_score_loop_warm[{size}]"] = _time(lambda: _scalar_pairs(query, sample), max(1, repeats // 10)) * scale
+        results[f"baseline_score_loop[{size}]"] = _time(lambda: _scalar_baseline(query, sample), max(1, repeats // 10)) * scale
+        results[f"heuristic_score_matrix[{size}]"] = _time(lambda: heuristics.calculate_heuristic_score_matrix([query], profiles, ANALYSIS_RESULTS), population_repeats)
+
+        start = time.perf_counter()
+        index = matching.PsychometricIndex([str(i) for i in range(size)], profiles)
+        results[f"top_k_index_build[{size}]"] = time.perf_counter() - start
+        results[f"top_k_query[{size}]"] = _time(lambda: index.top_k("0", 10), repeats)
+
+    return results
+
+
+def compare(results: dict, baselines: dict, tolerance: float) -> list[str]:
+    """
+    Returns the names of benchmarks that are more than `tolerance` slower than their baseline.
+    """
+    return [name for name, seconds in results.items()
+            if name in baselines and seconds > baselines[name] * (1 + tolerance)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the compatibility pipeline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Synthetic profile set sizes.")
+    parser.add_argument("--repeats", type=int, default=20, help="Timed runs per benchmark (the median is reported).")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown over baseline before failing, e.g. 0.25 = 25%%.")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file to compare with or save to.")
+    parser.add_argument("--save-baseline", action="store_true", help="Save these timings as the new baseline.")
+    args = parser.parse_args()
+
+    _use_stand_in_llm()
+    results = {**stage_benchmarks(args.repeats), **population_benchmarks(args.sizes, args.repeats)}
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+
+    print(f"\n{'benchmark':<40} {'time (ms)':>12} {'baseline (ms)':>14} {'change':>8}")
+    for name, seconds in results.items():
+        if name in baselines:
+            change = f"{(seconds / baselines[name] - 1) * 100:+.0f}%"
+            print(f"{name:<40} {seconds * 1000:>12.3f} {baselines[name] * 1000:>14.3f} {change:>8}")
+        else:
+            print(f"{name:<40} {seconds * 1000:>12.3f} {'-':>14} {'-':>8}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({**baselines, **results}, f, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    regressions = compare(results, baselines, args.tolerance)
+    if regressions:
+        print(f"\nREGRESSIONS (> {args.tolerance:.0%} slower than baseline): {', '.join(regressions)}")
+        sys.exit(1)
+    print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# --- Multi-process Serving Memory Benchmark --- #
+# Starts the pre-fork server with and without preloading, exercises each worker, and reports its memory:
+#   RSS - resident pages, counting shared pages in full in every process (so it overstates the total)
+#   PSS - resident pages, with each shared page split between the processes sharing it (sums to the true total)
+#   USS - pages only this process uses, i.e. what each extra worker costs
+#
+# Usage: python -m benchmarks.serving --workers 4 --preload whisper vader
+#
+# Linux only (it reads /proc/<pid>/smaps_rollup).
+
+
+# Import Libraries
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def memory_mb(pid: int) -> dict:
+    """
+    RSS, PSS and USS of a process in MB.
+    """
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {"rss": fields["Rss"], "pss": fields["Pss"], "uss": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+
+def _children(pid: int) -> list[int]:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def measure(n_workers: int, components: list[str], preload: bool, requests: int = 50):
+    """
+    Runs the server in one mode and returns the memory of the parent process, and of each worker after it has served some requests.
+    """
+    port = _free_port()
+    cmd = [sys.executable, "-m", "src.serve", "--host", "127.0.0.1", "--port", str(port), "--workers", str(n_workers),
+           "--preload", *components] + ([] if preload else ["--no-preload"])
+    server = subprocess.Popen(cmd, cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + 300
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read()
+                break
+            except OSError:
+                if server.poll() is not None or time.time() > deadline:
+                    raise RuntimeError("The server did not start")
+                time.sleep(0.5)
+
+        # Connections are spread across workers by the kernel, so enough requests reach every one of them
+        for _ in range(requests):
+            body = b'{"user_id": "user_1", "k": 5}'
+            request = urllib.request.Request(f"http://127.0.0.1:{port}/match/top-k", data=body, headers={"Content-Type": "application/json"})
+            urllib.request.urlopen(request, timeout=30).read()
+
+        # Workers that loaded their own state may still be warming up
+        time.sleep(2)
+        return memory_mb(server.pid), [memory_mb(pid) for pid in _children(server.pid)]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-worker memory with and without preloading before fork.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--preload", nargs="*", default=["whisper", "vader"], help="Components to load in every worker.")
+    args = parser.parse_args()
+
+    # Results depend heavily on what is preloaded (Whisper dominates), so label them with it
+    print(f"Preloaded components: {', '.join(args.preload) or 'none'}")
+    print(f"{'mode':<12} {'process':>6} {'RSS (MB)':>9} {'PSS (MB)':>9} {'USS (MB)':>9}")
+    for preload in (False, True):
+        mode = "preloaded" if preload else "per-worker"
+        parent, workers = measure(args.workers, args.preload, preload)
+        processes = [("parent", parent)] + list(enumerate(workers))
+        for name, memory in processes:
+            print(f"{mode:<12} {name:>6} {memory['rss']:>9.1f} {memory['pss']:>9.1f} {memory['uss']:>9.1f}")
+        total = {key: sum(memory[key] for _, memory in processes) for key in ("rss", "pss", "uss")}
+        print(f"{mode:<12} {'total':>6} {total['rss']:>9.1f} {total['pss']:>9.1f} {total['uss']:>9.1f}\n")
+
+
+if __name__ == "__main__":
+    main()
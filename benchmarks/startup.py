@@ -0,0 +1,67 @@
+# --- Startup Benchmark --- #
+# Reports import time, component load time and peak RSS for the dependency set of each endpoint.
+# Each measurement runs in a fresh interpreter so earlier imports do not hide the cost.
+#
+# Usage: python -m benchmarks.startup
+
+
+# Import Libraries
+import json
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Components from pipeline.COMPONENT_LOADERS that each endpoint needs on its first request
+ENDPOINT_DEPENDENCIES = {"/match/top-k": [],
+                         "/summarise": ["openai_async", "topic_cache"],
+                         "/match": ["openai_async", "topic_cache", "vader"],
+                         "/transcribe": ["whisper"]}
+
+_PROBE = """
+import json, sys, time
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+start = time.perf_counter()
+import src.main
+from src import pipeline
+imported = time.perf_counter()
+pipeline.warm_up(json.loads(sys.argv[1]))
+loaded = time.perf_counter()
+
+print(json.dumps({"import_s": imported - start, "load_s": loaded - imported, "peak_rss_mb": peak_rss_mb()}))
+"""
+
+
+def measure(components: list[str]) -> dict:
+    """
+    Imports the API and loads the given components in a fresh interpreter.
+    """
+    completed = subprocess.run([sys.executable, "-c", _PROBE, json.dumps(components)],
+                               cwd=PROJECT_ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    print(f"{'endpoint':<14} {'import (s)':>10} {'load (s)':>10} {'peak RSS (MB)':>14}")
+    for endpoint, components in ENDPOINT_DEPENDENCIES.items():
+        result = measure(components)
+        if "error" in result:
+            print(f"{endpoint:<14} failed: {result['error']}")
+            continue
+        rss = f"{result['peak_rss_mb']:.0f}" if result["peak_rss_mb"] is not None else "n/a"
+        print(f"{endpoint:<14} {result['import_s']:>10.2f} {result['load_s']:>10.2f} {rss:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# --- Topic Backend Benchmark --- #
+# Compares topic analysis backends (config.TOPIC_BACKEND) by latency per transcript, and by agreement with the OpenAI backend:
+#   topic MAE      - mean absolute difference of the 5 topic vector traits
+#   trait r        - Pearson correlation of all topic vector traits across the transcripts
+#   engagement MAE - mean absolute difference of the engagement score
+#   topic overlap  - Jaccard overlap of the topic lists, which only suits backends with free-form topics
+#
+# Usage: python -m benchmarks.topics --transcripts transcripts.jsonl --backends openai local
+#
+# Transcripts are read from a JSONL file with a "text" field per line, or a single transcript from --text.
+# The OpenAI backend, and agreement with it, are skipped when OPENAI_API_KEY is not set.
+
+
+# Import Libraries
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from src import config
+from src import pipeline
+
+DEFAULT_TRANSCRIPT = ("I have always wanted to go to Mars, honestly. The idea of building a whole new civilisation out there is "
+                      "terrifying and exciting at once. Do you ever think about what happens if we never leave Earth? "
+                      "I worry about it sometimes, but mostly I just find it fascinating to imagine.")
+
+
+def run_backend(backend: str, transcripts: list[str]) -> dict:
+    """
+    Analyses every transcript with one backend, bypassing the topic cache, and returns the results and latencies.
+    """
+    config.TOPIC_BACKEND = backend
+    pipeline.get_topic_cache = lambda: None
+    # A fresh getter, as the lazy one keeps the first backend it loaded
+    pipeline.get_topic_backend = pipeline._lazy(pipeline.get_topic_backend.__wrapped__)
+
+    load_start = time.perf_counter()
+    pipeline.get_topic_backend()
+    load_s = time.perf_counter() - load_start
+
+    results, latencies = [], []
+    for transcript in transcripts:
+        start = time.perf_counter()
+        results.append(pipeline.get_topics_and_vectors(transcript))
+        latencies.append(time.perf_counter() - start)
+    return {"load_s": load_s, "results": results, "latencies": latencies}
+
+
+def agreement(results: list[tuple], reference: list[tuple]) -> dict:
+    """
+    How closely one backend's results follow the reference backend's, over the transcripts both analysed.
+    """
+    pairs = [(result, ref) for result, ref in zip(results, reference)
+             if result != pipeline.TOPIC_FALLBACK and ref != pipeline.TOPIC_FALLBACK]
+    if not pairs:
+        return {}
+
+    vectors = np.array([result[1] for result, _ in pairs], dtype=float)
+    ref_vectors = np.array([ref[1] for _, ref in pairs], dtype=float)
+    overlaps = [len({t.lower() for t in result[0]} & {t.lower() for t in ref[0]}) / len({t.lower() for t in result[0] + ref[0]})
+                for result, ref in pairs]
+
+    correlation = np.corrcoef(vectors.ravel(), ref_vectors.ravel())[0, 1] if vectors.size > 1 else float("nan")
+    return {"topic_mae": float(np.abs(vectors - ref_vectors).mean()),
+            "trait_r": float(correlation),
+            "engagement_mae": float(np.mean([abs(result[2] - ref[2]) for result, ref in pairs])),
+            "topic_overlap": float(np.mean(overlaps))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare topic analysis backends by latency and agreement with OpenAI.")
+    parser.add_argument("--transcripts", help="JSONL file of transcripts, one {\"text\": ...} per line.")
+    parser.add_argument("--text", help="A single transcript to analyse instead.")
+    parser.add_argument("--backends", nargs="+", default=["openai", "local"], help="Backends to compare.")
+    args = parser.parse_args()
+
+    if args.transcripts:
+        with open(args.transcripts, "r", encoding="utf-8") as f:
+            transcripts = [json.loads(line)["text"] for line in f if line.strip()]
+    else:
+        transcripts = [args.text or DEFAULT_TRANSCRIPT]
+
+    backends = args.backends
+    if "openai" in backends and not os.getenv("OPENAI_API_KEY"):
+        print("OPENAI_API_KEY is not set, skipping the openai backend.\n")
+        backends = [backend for backend in backends if backend != "openai"]
+
+    print(f"{'backend':<8} {'load (s)':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} {'failed':>7} "
+          f"{'topic MAE':>10} {'trait r':>8} {'engagement MAE':>15} {'topic overlap':>14}")
+    runs = {backend: run_backend(backend, transcripts) for backend in backends}
+    for backend, run in runs.items():
+        latencies_ms = np.array(run["latencies"]) * 1000
+        failed = sum(result == pipeline.TOPIC_FALLBACK for result in run["results"])
+        line = (f"{backend:<8} {run['load_s']:>9.2f} {np.percentile(latencies_ms, 50):>9.1f} "
+                f"{np.percentile(latencies_ms, 95):>9.1f} {failed:>7}")
+
+        scores = agreement(run["results"], runs["openai"]["results"]) if "openai" in runs and backend != "openai" else {}
+        if scores:
+            line += (f" {scores['topic_mae']:>10.3f} {scores['trait_r']:>8.2f} "
+                     f"{scores['engagement_mae']:>15.3f} {scores['topic_overlap']:>14.2f}")
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# --- Transcription Benchmark --- #
+# Compares Whisper model sizes, thread counts and int8 quantization by real-time factor, peak memory and word error rate.
+# Each option runs in a fresh interpreter so its peak RSS is not hidden by models loaded before it.
+#
+# Usage: python -m benchmarks.transcription --audio conversation.wav --reference conversation.txt
+#        python -m benchmarks.transcription --sizes tiny base small --threads 1 4 --max-wer 0.1
+#
+# The real-time factor is transcription time divided by audio duration: below 1 is faster than real time.
+# Without a reference transcript, word error rates are not reported.
+
+
+# Import Libraries
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+AUDIO_PATH = os.path.join(PROJECT_ROOT, "tests", "dummy_audio.wav")
+
+_PROBE = """
+import json, sys, time
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+import whisper
+from src import pipeline
+
+option = json.loads(sys.argv[1])
+audio = whisper.load_audio(sys.argv[2])
+
+start = time.perf_counter()
+model = pipeline.load_whisper_model(option["size"], option["device"], option["threads"], option["int8"])
+loaded = time.perf_counter()
+model.transcribe(audio[:pipeline.WHISPER_SAMPLE_RATE], fp16=False)  # Warm-up
+
+start_transcribe = time.perf_counter()
+text = model.transcribe(audio, fp16=False)["text"]
+transcribe_s = time.perf_counter() - start_transcribe
+
+print(json.dumps({"load_s": loaded - start,
+                  "rtf": transcribe_s / (len(audio) / pipeline.WHISPER_SAMPLE_RATE),
+                  "peak_rss_mb": peak_rss_mb(),
+                  "text": text}))
+"""
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """
+    Word-level edit distance between a hypothesis and a reference transcript, divided by the reference length.
+    Case and punctuation are ignored.
+    """
+    def words(text):
+        return "".join(c.lower() if c.isalnum() or c.isspace() or c == "'" else " " for c in text).split()
+
+    ref, hyp = words(reference), words(hypothesis)
+    if not ref:
+        return float(len(hyp) > 0)
+
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, start=1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, start=1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def measure(option: dict, audio_path: str) -> dict:
+    """
+    Loads the model described by option and transcribes the audio in a fresh interpreter.
+    """
+    completed = subprocess.run([sys.executable, "-c", _PROBE, json.dumps(option), audio_path],
+                               cwd=PROJECT_ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Whisper model options.")
+    parser.add_argument("--audio", default=AUDIO_PATH, help="Audio file to transcribe.")
+    parser.add_argument("--reference", help="Text file with the reference transcript of the audio, for word error rates.")
+    parser.add_argument("--sizes", nargs="+", default=["tiny", "base", "small"], help="Whisper model sizes.")
+    parser.add_argument("--threads", type=int, nargs="+", default=[os.cpu_count()], help="Torch thread counts.")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--max-wer", type=float, help="Accuracy bar: recommend the fastest option at or below this word error rate.")
+    args = parser.parse_args()
+
+    reference = None
+    if args.reference:
+        with open(args.reference, "r", encoding="utf-8") as f:
+            reference = f.read()
+
+    int8_options = [False, True] if args.device == "cpu" else [False]
+    options = [{"size": size, "device": args.device, "threads": threads, "int8": int8}
+               for size, threads, int8 in itertools.product(args.sizes, args.threads, int8_options)]
+
+    print(f"{'model':<8} {'threads':>7} {'int8':>5} {'load (s)':>9} {'RTF':>7} {'peak RSS (MB)':>14} {'WER':>7}")
+    results = []
+    for option in options:
+        result = measure(option, args.audio)
+        label = f"{option['size']:<8} {option['threads']:>7} {'yes' if option['int8'] else 'no':>5}"
+        if "error" in result:
+            print(f"{label} failed: {result['error']}")
+            continue
+
+        result["wer"] = word_error_rate(reference, result["text"]) if reference is not None else None
+        results.append((option, result))
+        rss = f"{result['peak_rss_mb']:.0f}" if result["peak_rss_mb"] is not None else "n/a"
+        wer = f"{result['wer']:.1%}" if result["wer"] is not None else "n/a"
+        print(f"{label} {result['load_s']:>9.2f} {result['rtf']:>7.3f} {rss:>14} {wer:>7}")
+
+    if args.max_wer is not None and reference is not None:
+        eligible = [(option, result) for option, result in results if result["wer"] <= args.max_wer]
+        if not eligible:
+            print(f"\nNo option meets a word error rate of {args.max_wer:.1%}.")
+            return
+        option, result = min(eligible, key=lambda item: item[1]["rtf"])
+        print(f"\nFastest option within {args.max_wer:.1%} WER: WHISPER_MODEL_SIZE = {option['size']!r}, "
+              f"WHISPER_THREADS = {option['threads']}, WHISPER_INT8_QUANTIZATION = {option['int8']} "
+              f"(RTF {result['rtf']:.3f}, WER {result['wer']:.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# --- Admission Control and Request Coalescing --- #
+# Keeps latency predictable under load spikes for the expensive stages (Whisper and the LLM):
+#   - StageLimiter runs at most N calls of a stage at once, queues a bounded number more, and rejects the rest straight
+#     away (Overloaded, served as 429 or 503 with a Retry-After header) instead of letting every request slow down;
+#   - Coalescer shares one in-flight computation between identical concurrent requests, e.g. retries of the same
+#     transcript, so they cost one LLM call or one transcription instead of one each.
+# Limits are per process (and so per pre-fork worker), and are set in config.ADMISSION_LIMITS. They apply to API
+# requests only: offline callers (src/batch.py, backfills) pass admit=False and bound their own concurrency.
+
+
+# Import Libraries
+import asyncio
+import collections
+import contextlib
+import math
+import time
+
+from . import config
+from . import metrics
+
+
+class Overloaded(Exception):
+    """
+    Raised when a stage cannot take a request: 429 if its wait queue is full, 503 if the request waited too long for a slot.
+    retry_after is the estimated number of seconds until a retry would be admitted.
+    """
+
+    def __init__(self, stage: str, status_code: int, retry_after: int):
+        reason = "queue is full" if status_code == 429 else "request waited too long"
+        super().__init__(f"The {stage} stage is overloaded ({reason}), retry in {retry_after}s")
+        self.stage = stage
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class StageLimiter:
+    """
+    A concurrency limit with a bounded FIFO wait queue, for one stage in one event loop.
+    """
+
+    # Weight of the latest call in the running average of how long a slot is held
+    HOLD_TIME_SMOOTHING = 0.2
+
+    def __init__(self, stage: str, concurrency: int, queue: int, timeout: float):
+        self.stage = stage
+        self.concurrency = concurrency
+        self.max_queue = queue
+        self.timeout = timeout
+        self.active = 0
+        self._waiters = collections.deque()
+        self._mean_hold_seconds = 1.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """
+        Seconds until the work already admitted should have drained enough to take one more request.
+        """
+        backlog = (self.active + len(self._waiters) + 1) / self.concurrency
+        return max(1, math.ceil(self._mean_hold_seconds * backlog))
+
+    def check(self) -> None:
+        """
+        Raises Overloaded if a request arriving now would be rejected, for callers that must answer before starting the work.
+        """
+        if self.active >= self.concurrency and len(self._waiters) >= self.max_queue:
+            self._reject(429, "queue_full")
+
+    def _reject(self, status_code: int, reason: str):
+        metrics.ADMISSION_REJECTIONS.inc(self.stage, reason)
+        raise Overloaded(self.stage, status_code, self.retry_after())
+
+    def _update_gauges(self) -> None:
+        metrics.ADMISSION_IN_FLIGHT.set(self.active, self.stage)
+        metrics.ADMISSION_QUEUE_DEPTH.set(len(self._waiters), self.stage)
+
+    async def _acquire(self) -> None:
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self._reject(429, "queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._update_gauges()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+        except asyncio.TimeoutError:
+            self._reject(503, "timeout")
+        except asyncio.CancelledError:
+            # A slot handed over just as the caller gave up is passed on to the next waiter
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            metrics.ADMISSION_WAIT.observe(time.perf_counter() - start, self.stage)
+            self._update_gauges()
+
+    def _release(self) -> None:
+        # The slot goes straight to the longest waiting request, if any, so active only drops when nobody is waiting
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """
+        Holds one of the stage's slots for the duration of the block, waiting for one if needed. Raises Overloaded.
+        """
+        await self._acquire()
+        self._update_gauges()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            held = time.perf_counter() - start
+            self._mean_hold_seconds += self.HOLD_TIME_SMOOTHING * (held - self._mean_hold_seconds)
+            self._release()
+            self._update_gauges()
+
+
+class Coalescer:
+    """
+    Runs one computation per key at a time; identical requests arriving while it runs await the same result.
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self._in_flight = {}
+
+    async def run(self, key, compute):
+        """
+        Returns the result of compute(), a coroutine function, or of the identical call already in flight for key.
+        The shared computation is shielded, so a caller that disconnects does not cancel it for the others.
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            metrics.COALESCED_REQUESTS.inc(self.stage)
+        return await asyncio.shield(task)
+
+
+LIMITERS = {stage: StageLimiter(stage, **limits) for stage, limits in config.ADMISSION_LIMITS.items()}
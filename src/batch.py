@@ -0,0 +1,229 @@
+# --- Offline Batch Scoring --- #
+# Scores a JSONL file of conversations without the API, writing one JSONL result per input line, in input order.
+# Records flow through a bounded pipeline: a reader admits at most config.BATCH_MAX_IN_FLIGHT records at a time,
+# Whisper and VADER run in a pool of config.BATCH_WORKERS processes, at most config.BATCH_LLM_CONCURRENCY topic analyses
+# are in flight, and a writer appends each result as soon as every earlier one is written. Memory therefore stays
+# constant however large the input is.
+#
+# Usage: python -m src.batch conversations.jsonl scores.jsonl
+#        python -m src.batch conversations.jsonl scores.jsonl --workers 4 --llm-concurrency 16
+#
+# Each input line is one conversation, as a transcript or an audio file, and its two users:
+#   {"id": "call-1", "text": "...", "user_1_id": "user_1", "user_2_id": "user_2"}
+#   {"id": "call-2", "audio_path": "calls/2.wav", "pers_vec_1": [...5], "pers_vec_2": [...5]}
+# Each output line holds the "line" number and "id" of its input, with its topics, analysis_results, baseline_score and
+# heuristic_score (and transcript, for audio), or an "error".
+#
+# Progress is checkpointed next to the output (<output>.checkpoint). Running the same command again after a crash, or
+# after more lines are appended to the input, continues from the checkpoint; use --restart to start over.
+
+
+# Import Libraries
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from . import config
+from . import heuristics
+from . import pipeline
+
+
+# CPU Stages, Run in the Worker Processes
+def _transcribe(audio_path: str) -> str:
+    """
+    Transcribes in a worker process, limiting Whisper to config.JOB_WORKER_THREADS threads so workers scale across cores.
+    """
+    if not pipeline.get_whisper_model.is_loaded():
+        import torch
+        pipeline.get_whisper_model()
+        torch.set_num_threads(config.JOB_WORKER_THREADS)
+    return pipeline.transcribe_audio(audio_path)
+
+
+# Checkpoints
+def _checkpoint_path(output_path: str) -> str:
+    return output_path + ".checkpoint"
+
+
+def read_checkpoint(output_path: str) -> dict:
+    """
+    The number of input lines fully written, and the size of the output file at that point.
+    """
+    try:
+        with open(_checkpoint_path(output_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"input_lines": 0, "output_bytes": 0}
+
+
+def _write_checkpoint(output_path: str, output_file, input_lines: int) -> None:
+    """
+    Makes the output durable, then records it, so the checkpoint never points past data that a crash could lose.
+    """
+    output_file.flush()
+    os.fsync(output_file.fileno())
+    checkpoint = {"input_lines": input_lines, "output_bytes": output_file.tell()}
+    temp_path = _checkpoint_path(output_path) + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(temp_path, _checkpoint_path(output_path))
+
+
+class BatchScorer:
+    """
+    Scores the records of one batch run. CPU stages run in n_workers processes, or on the pipeline's thread executor if n_workers is 0.
+    """
+
+    def __init__(self, n_workers: int = config.BATCH_WORKERS, llm_concurrency: int = config.BATCH_LLM_CONCURRENCY, store=None):
+        self.n_workers = n_workers
+        self.llm_concurrency = llm_concurrency
+        self.store = store
+        self._process_pool = None
+        self._llm_slots = None
+
+    async def _run_cpu(self, func, *args):
+        if self._process_pool is None:
+            return await pipeline.run_in_executor(func, *args)
+        return await asyncio.get_running_loop().run_in_executor(self._process_pool, func, *args)
+
+    def _personality_vectors(self, record: dict):
+        if "pers_vec_1" in record and "pers_vec_2" in record:
+            return record["pers_vec_1"], record["pers_vec_2"]
+        for key in ("user_1_id", "user_2_id"):
+            if key not in record:
+                raise ValueError("Record needs pers_vec_1 and pers_vec_2, or user_1_id and user_2_id")
+            if self.store is None or record[key] not in self.store:
+                raise ValueError(f"Unknown user: {record[key]}")
+        return self.store.get(record["user_1_id"]).tolist(), self.store.get(record["user_2_id"]).tolist()
+
+    async def score(self, line_number: int, line: str) -> dict:
+        result = {"line": line_number}
+        try:
+            record = json.loads(line)
+            result["id"] = record.get("id")
+            pers_vec_1, pers_vec_2 = self._personality_vectors(record)
+
+            if "text" in record:
+                transcript = record["text"]
+            elif "audio_path" in record:
+                transcript = await self._run_cpu(_transcribe, record["audio_path"])
+                result["transcript"] = transcript
+            else:
+                raise ValueError("Record needs text or audio_path")
+
+            # VADER runs while the record waits for, and then holds, one of the LLM slots
+            vader_task = asyncio.ensure_future(self._run_cpu(pipeline.get_vader_sentiment, transcript))
+            try:
+                async with self._llm_slots:
+                    topics, topic_vec, engagement_score = await pipeline.get_topics_and_vectors_async(transcript, admit=False)
+            finally:
+                vader = await vader_task
+
+            analysis_results = {"topic_vector": topic_vec,
+                                "engagement_score": engagement_score,
+                                "vader_engagement": vader,
+                                "word_count": len(transcript.split())}
+            baseline = heuristics.baseline_compatibility_score(pipeline.fuse_vectors(pers_vec_1, topic_vec), pipeline.fuse_vectors(pers_vec_2, topic_vec))
+            heuristic = pipeline.heuristic_compatibility_score(pers_vec_1, pers_vec_2, analysis_results)
+
+            result.update({"topics": topics,
+                           "analysis_results": analysis_results,
+                           "baseline_score": {"score": float(baseline["score"]), "interpretation": baseline["interpretation"]},
+                           "heuristic_score": {"match_score": heuristic["match_score"], "explanation": heuristic["explanation"]}})
+        except Exception as e:
+            result["error"] = str(e)
+        return result
+
+    async def run(self, input_path: str, output_path: str, restart: bool = False,
+                  max_in_flight: int = config.BATCH_MAX_IN_FLIGHT, checkpoint_every: int = config.BATCH_CHECKPOINT_EVERY) -> dict:
+        """
+        Scores every input line after the checkpoint and appends the results to output_path.
+        Returns the counts of lines scored and failed in this run.
+        """
+        checkpoint = {"input_lines": 0, "output_bytes": 0} if restart else read_checkpoint(output_path)
+        if checkpoint["input_lines"]:
+            print(f"Resuming after line {checkpoint['input_lines']} of {input_path}.")
+
+        # Anything written after the last checkpoint is dropped, and rewritten from the records it came from
+        output_dir = os.path.dirname(os.path.abspath(output_path))
+        os.makedirs(output_dir, exist_ok=True)
+        with open(output_path, "ab") as f:
+            f.truncate(checkpoint["output_bytes"])
+
+        self._llm_slots = asyncio.Semaphore(self.llm_concurrency)
+        if self.n_workers > 0:
+            self._process_pool = ProcessPoolExecutor(max_workers=self.n_workers, mp_context=multiprocessing.get_context("spawn"))
+
+        in_flight = asyncio.Semaphore(max_in_flight)
+        ordered = asyncio.Queue()
+        counts = {"scored": 0, "failed": 0}
+
+        async def read():
+            with open(input_path, "r", encoding="utf-8") as f:
+                for line_number, line in enumerate(f, start=1):
+                    if line_number <= checkpoint["input_lines"]:
+                        continue
+                    await in_flight.acquire()
+                    task = asyncio.ensure_future(self.score(line_number, line)) if line.strip() else None
+                    await ordered.put((line_number, task))
+            await ordered.put(None)
+
+        async def write():
+            with open(output_path, "a", encoding="utf-8") as f:
+                while True:
+                    item = await ordered.get()
+                    if item is None:
+                        break
+                    line_number, task = item
+                    if task is not None:
+                        result = await task
+                        f.write(json.dumps(result) + "\n")
+                        counts["failed" if "error" in result else "scored"] += 1
+                    in_flight.release()
+                    if line_number % checkpoint_every == 0:
+                        _write_checkpoint(output_path, f, line_number)
+                        print(f"Written up to line {line_number} ({counts['scored']} scored, {counts['failed']} failed in this run).")
+                    checkpoint["input_lines"] = line_number
+                _write_checkpoint(output_path, f, checkpoint["input_lines"])
+
+        try:
+            await asyncio.gather(read(), write())
+        finally:
+            if self._process_pool is not None:
+                self._process_pool.shutdown()
+                self._process_pool = None
+        return counts
+
+
+def run_batch(input_path: str, output_path: str, n_workers: int = config.BATCH_WORKERS,
+              llm_concurrency: int = config.BATCH_LLM_CONCURRENCY, restart: bool = False, **kwargs) -> dict:
+    """
+    Blocking entry point to BatchScorer.run, using the profile store for records given by user id.
+    """
+    try:
+        store = pipeline.load_profile_store()
+    except FileNotFoundError:
+        store = None
+    scorer = BatchScorer(n_workers, llm_concurrency, store)
+    return asyncio.run(scorer.run(input_path, output_path, restart, **kwargs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a JSONL file of conversations offline.")
+    parser.add_argument("input", help="JSONL file of conversations.")
+    parser.add_argument("output", help="JSONL file to append the results to.")
+    parser.add_argument("--workers", type=int, default=config.BATCH_WORKERS, help="Processes for Whisper and VADER (0: threads in this process).")
+    parser.add_argument("--llm-concurrency", type=int, default=config.BATCH_LLM_CONCURRENCY, help="Topic analyses in flight at once.")
+    parser.add_argument("--max-in-flight", type=int, default=config.BATCH_MAX_IN_FLIGHT, help="Records held in memory at once.")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and rewrite the output from the first line.")
+    args = parser.parse_args()
+
+    counts = run_batch(args.input, args.output, args.workers, args.llm_concurrency, args.restart, max_in_flight=args.max_in_flight)
+    print(f"Done: {counts['scored']} scored, {counts['failed']} failed. Results in {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
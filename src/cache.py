@@ -0,0 +1,162 @@
+# --- Analysis Caches --- #
+
+
+# Import Libraries
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalise_transcript(transcript: str) -> str:
+    """
+    Collapses all whitespace so trivially different copies of a transcript share one cache entry.
+    """
+    return " ".join(transcript.split())
+
+
+def make_cache_key(transcript: str, model_name: str, prompt_version: str) -> str:
+    """
+    Content address for an LLM analysis: a hash of the normalised transcript, the model and the prompt version.
+    """
+    digest = hashlib.sha256()
+    for part in (prompt_version, model_name, normalise_transcript(transcript)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class TopicCache:
+    """
+    Persistent SQLite cache of LLM topic analyses.
+    Entries expire after ttl_seconds, and the least recently used entries are evicted above max_entries.
+    Use ":memory:" as the path for a cache that does not survive restarts.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl_seconds: float | None = None):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL" if path != ":memory:" else "PRAGMA journal_mode=MEMORY")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS topic_cache (
+                                  key TEXT PRIMARY KEY,
+                                  value TEXT NOT NULL,
+                                  created_at REAL NOT NULL,
+                                  last_accessed REAL NOT NULL)""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS topic_cache_lru ON topic_cache (last_accessed)")
+        self._conn.commit()
+
+    def get(self, key: str):
+        """
+        Returns the cached value for a key, or None on a miss or an expired entry.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM topic_cache WHERE key = ?", (key,)).fetchone()
+
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM topic_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE topic_cache SET last_accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key: str, value) -> None:
+        """
+        Stores a JSON-serialisable value, evicting the least recently used entries if the cache is full.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO topic_cache (key, value, created_at, last_accessed) VALUES (?, ?, ?, ?)",
+                               (key, json.dumps(value), now, now))
+
+            if self.ttl_seconds is not None:
+                self._conn.execute("DELETE FROM topic_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+
+            overflow = self._conn.execute("SELECT COUNT(*) FROM topic_cache").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._conn.execute("""DELETE FROM topic_cache WHERE key IN (
+                                          SELECT key FROM topic_cache ORDER BY last_accessed ASC LIMIT ?)""", (overflow,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM topic_cache")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM topic_cache").fetchone()[0]
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters since startup and the current number of entries.
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self)}
+
+
+class AnalysisStore:
+    """
+    Bounded in-process LRU store of full transcript analyses, keyed by an analysis handle.
+    Entries evicted from memory are spilled to an optional TopicCache on disk and promoted back on their next use.
+    """
+
+    def __init__(self, max_entries: int = 1024, spill: TopicCache | None = None):
+        self.max_entries = max_entries
+        self.spill = spill
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        value = self.spill.get(key) if self.spill is not None else None
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def set(self, key: str, value) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False))
+
+        if self.spill is not None:
+            for evicted_key, evicted_value in evicted:
+                self.spill.set(evicted_key, evicted_value)
+
+    def pop(self, key: str):
+        """
+        Removes an entry from memory and returns it, or None. Entries already spilled to disk are left to expire there.
+        """
+        with self._lock:
+            return self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries or (self.spill is not None and self.spill.get(key) is not None)
@@ -0,0 +1,266 @@
+# --- Weight Calibration Sweep --- #
+# Tunes the scoring weights in config.py offline, against a labelled set of past matches instead of one /match call at a time.
+# Every variant of a parameter grid is scored on all records in one vectorized pass (heuristics.calculate_heuristic_score_pairs),
+# variants are spread across processes, and each is ranked by how well its scores order the records by outcome.
+#
+# Usage: python -m src.calibration records.jsonl --grid grid.json --workers 8
+#        python -m src.calibration records.jsonl --grid grid.json --samples 5000 --output results.json
+#
+# Each line of records.jsonl is one past match:
+#   {"pers_vec_1": [...5], "pers_vec_2": [...5],
+#    "analysis_results": {"topic_vector": [...5], "engagement_score": 0.7, "vader_engagement": 0.3, "word_count": 800},
+#    "outcome": 1}
+# where outcome is 1/0 (e.g. matched again or not) or any number where higher is better (e.g. a rating).
+#
+# grid.json maps parameter names to the values to try. Dict entries in config.py are named with a dot:
+#   {"HEURISTIC_WEIGHTS.agreeableness": [0.2, 0.34, 0.5], "HEURISTIC_PERSONALITY_BONUS.max_cap": [1000, 1500, 2000]}
+# Parameters not in the grid keep their config.py values.
+
+
+# Import Libraries
+import argparse
+import contextlib
+import copy
+import itertools
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.stats import spearmanr
+from sklearn.metrics import average_precision_score, roc_auc_score
+
+from . import config
+from . import heuristics
+
+# Parameters a grid may vary
+TUNABLE_PARAMETERS = ("HEURISTIC_WEIGHTS", "HEURISTIC_TOPIC_WEIGHTS", "HEURISTIC_PERSONALITY_WEIGHT", "HEURISTIC_PERSONALITY_BONUS",
+                      "FUSION_PERSONALITY_WEIGHT", "OPENNESS_SIMILARITY_WEIGHT", "CONSCIENTIOUSNESS_SIMILARITY_WEIGHT")
+
+# Scores a variant can be judged on. FUSION_PERSONALITY_WEIGHT only affects the baseline score.
+SCORES = ("heuristic", "baseline")
+
+# Used without --grid: each weight at 0.5x, 1x and 1.5x its current value, for a quick look at what matters most
+DEFAULT_GRID_PARAMETERS = ["HEURISTIC_WEIGHTS.openness", "HEURISTIC_WEIGHTS.extraversion", "HEURISTIC_WEIGHTS.agreeableness",
+                           "HEURISTIC_WEIGHTS.neuroticism", "HEURISTIC_PERSONALITY_WEIGHT", "HEURISTIC_TOPIC_WEIGHTS.social_cue_bonus",
+                           "HEURISTIC_PERSONALITY_BONUS.weight"]
+
+
+def _split(parameter: str) -> tuple[str, str | None]:
+    name, _, key = parameter.partition(".")
+    if name not in TUNABLE_PARAMETERS:
+        raise ValueError(f"Unknown parameter {parameter!r}, expected one of {TUNABLE_PARAMETERS} (with .key for dicts)")
+    if key and key not in getattr(config, name):
+        raise ValueError(f"Unknown parameter {parameter!r}: {name} has no key {key!r}")
+    return name, key or None
+
+
+def get_parameter(parameter: str):
+    name, key = _split(parameter)
+    value = getattr(config, name)
+    return value[key] if key else value
+
+
+@contextlib.contextmanager
+def config_overrides(variant: dict):
+    """
+    Temporarily sets the parameters of a variant in config, restoring the previous values afterwards.
+    """
+    saved = {}
+    try:
+        for parameter, value in variant.items():
+            name, key = _split(parameter)
+            if name not in saved:
+                saved[name] = getattr(config, name)
+                setattr(config, name, copy.copy(saved[name]))
+            if key:
+                getattr(config, name)[key] = value
+            else:
+                setattr(config, name, value)
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(config, name, value)
+
+
+def default_grid() -> dict:
+    return {parameter: [round(get_parameter(parameter) * factor, 4) for factor in (0.5, 1.0, 1.5)]
+            for parameter in DEFAULT_GRID_PARAMETERS}
+
+
+def grid_size(grid: dict) -> int:
+    return int(np.prod([len(values) for values in grid.values()]))
+
+
+def grid_variants(grid: dict, samples: int | None = None, seed: int = 0) -> list[dict]:
+    """
+    Every combination of the grid's values, or a random sample of them without replacement.
+    Sampled variants are decoded from their index in the full grid, so huge grids are never enumerated.
+    """
+    names = list(grid)
+    total = grid_size(grid)
+    if samples is None or samples >= total:
+        return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+    variants = []
+    for index in sorted(random.Random(seed).sample(range(total), samples)):
+        variant = {}
+        for name in reversed(names):
+            index, position = divmod(index, len(grid[name]))
+            variant[name] = grid[name][position]
+        variants.append({name: variant[name] for name in names})
+    return variants
+
+
+# Labelled Records, as Column Arrays
+def load_records(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return records_to_arrays([json.loads(line) for line in f if line.strip()])
+
+
+def records_to_arrays(records: list[dict]) -> dict:
+    """
+    Converts a list of match records into one array per field, the form the vectorized scoring works on.
+    """
+    if not records:
+        raise ValueError("No records to calibrate on")
+    analyses = [record["analysis_results"] for record in records]
+    return {"pers_mat_1": np.array([record["pers_vec_1"] for record in records], dtype=np.float64),
+            "pers_mat_2": np.array([record["pers_vec_2"] for record in records], dtype=np.float64),
+            "topic_vectors": np.array([analysis["topic_vector"] for analysis in analyses], dtype=np.float64),
+            "engagement_scores": np.array([analysis["engagement_score"] for analysis in analyses], dtype=np.float64),
+            "vader_engagements": np.array([analysis["vader_engagement"] for analysis in analyses], dtype=np.float64),
+            "word_counts": np.array([analysis["word_count"] for analysis in analyses], dtype=np.float64),
+            "outcomes": np.array([record["outcome"] for record in records], dtype=np.float64)}
+
+
+def score_records(arrays: dict, score: str = "heuristic") -> np.ndarray:
+    """
+    The score of every record under the current config.
+    """
+    if score == "heuristic":
+        return heuristics.calculate_heuristic_score_pairs(arrays["pers_mat_1"], arrays["pers_mat_2"], arrays["topic_vectors"],
+                                                          arrays["engagement_scores"], arrays["vader_engagements"], arrays["word_counts"])["match_score"]
+
+    # Cosine similarity of the fused vectors, as pipeline.fuse_vectors and heuristics.baseline_compatibility_score do per pair
+    weight = config.FUSION_PERSONALITY_WEIGHT
+    fused_1 = weight * arrays["pers_mat_1"] + (1 - weight) * arrays["topic_vectors"]
+    fused_2 = weight * arrays["pers_mat_2"] + (1 - weight) * arrays["topic_vectors"]
+    return heuristics.baseline_compatibility_scores(fused_1, fused_2)
+
+
+def ranking_metrics(scores: np.ndarray, outcomes: np.ndarray) -> dict:
+    """
+    How well scores rank records by outcome: Spearman correlation always, and ROC AUC and average precision for 1/0 outcomes.
+    """
+    result = {"spearman": float(spearmanr(scores, outcomes)[0]) if np.ptp(scores) > 0 and np.ptp(outcomes) > 0 else 0.0}
+    if np.isin(outcomes, (0, 1)).all() and 0 < outcomes.sum() < len(outcomes):
+        result["auc"] = float(roc_auc_score(outcomes, scores))
+        result["average_precision"] = float(average_precision_score(outcomes, scores))
+    return result
+
+
+# Per-process Records, Set Once by the Pool Initializer Rather than Sent with Every Variant
+_RECORDS = {}
+
+def _init_worker(arrays: dict, score: str) -> None:
+    _RECORDS["arrays"] = arrays
+    _RECORDS["score"] = score
+
+
+def _evaluate_chunk(variants: list[dict]) -> list[dict]:
+    results = []
+    for variant in variants:
+        with config_overrides(variant):
+            scores = score_records(_RECORDS["arrays"], _RECORDS["score"])
+        results.append(ranking_metrics(scores, _RECORDS["arrays"]["outcomes"]))
+    return results
+
+
+def sweep(arrays: dict, variants: list[dict], score: str = "heuristic", n_workers: int | None = None, chunk_size: int = 64) -> list[dict]:
+    """
+    Evaluates every variant on all records and returns, for each variant in order, {"variant": ..., "metrics": ...}.
+    Chunks of variants run in n_workers processes (one per core by default), or in this process if n_workers is 1.
+    """
+    if score not in SCORES:
+        raise ValueError(f"Unknown score {score!r}, expected one of {SCORES}")
+
+    chunks = [variants[start:start + chunk_size] for start in range(0, len(variants), chunk_size)]
+    n_workers = min(n_workers or os.cpu_count() or 1, len(chunks)) or 1
+    if n_workers == 1:
+        _init_worker(arrays, score)
+        chunk_results = map(_evaluate_chunk, chunks)
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(arrays, score)) as executor:
+            chunk_results = list(executor.map(_evaluate_chunk, chunks))
+
+    metric_results = [result for chunk in chunk_results for result in chunk]
+    return [{"variant": variant, "metrics": result} for variant, result in zip(variants, metric_results)]
+
+
+def sensitivity(results: list[dict], metric: str) -> dict:
+    """
+    For each parameter, the mean metric at each of its values over all other variants (its main effect),
+    and the spread between the best and worst value, which ranks parameters by how much they matter.
+    """
+    report = {}
+    for parameter in results[0]["variant"] if results else []:
+        by_value = {}
+        for result in results:
+            by_value.setdefault(result["variant"][parameter], []).append(result["metrics"].get(metric, np.nan))
+        means = {value: float(np.nanmean(values)) for value, values in by_value.items()}
+        report[parameter] = {"means": means, "spread": max(means.values()) - min(means.values())}
+    return dict(sorted(report.items(), key=lambda item: -item[1]["spread"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep scoring weights against labelled past matches.")
+    parser.add_argument("records", help="JSONL file of labelled match records.")
+    parser.add_argument("--grid", help="JSON file mapping parameters to the values to try (default: 0.5x/1x/1.5x of the main weights).")
+    parser.add_argument("--samples", type=int, help="Evaluate a random sample of this many variants instead of the full grid.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--score", choices=SCORES, default="heuristic")
+    parser.add_argument("--metric", choices=("auc", "average_precision", "spearman"), help="Metric to rank variants by (default: auc for 1/0 outcomes, else spearman).")
+    parser.add_argument("--workers", type=int, help="Processes to use (default: one per core).")
+    parser.add_argument("--top", type=int, default=10, help="Number of best variants to print.")
+    parser.add_argument("--output", help="Write every variant and its metrics to this JSON file.")
+    args = parser.parse_args()
+
+    arrays = load_records(args.records)
+    if args.grid:
+        with open(args.grid, "r", encoding="utf-8") as f:
+            grid = json.load(f)
+    else:
+        grid = default_grid()
+    for parameter in grid:
+        _split(parameter)
+
+    variants = grid_variants(grid, args.samples, args.seed)
+    print(f"Evaluating {len(variants)} of {grid_size(grid)} variants on {len(arrays['outcomes'])} records...")
+
+    current = ranking_metrics(score_records(arrays, args.score), arrays["outcomes"])
+    results = sweep(arrays, variants, args.score, args.workers)
+
+    metric = args.metric or ("auc" if "auc" in current else "spearman")
+    ranked = sorted(results, key=lambda result: -result["metrics"].get(metric, -np.inf))
+
+    print(f"\nCurrent config.py: {metric} = {current.get(metric, float('nan')):.4f}")
+    print(f"\nTop {min(args.top, len(ranked))} variants by {metric}:")
+    for result in ranked[:args.top]:
+        settings = ", ".join(f"{parameter}={value}" for parameter, value in result["variant"].items())
+        print(f"  {result['metrics'].get(metric, float('nan')):.4f}  {settings}")
+
+    print(f"\nSensitivity of {metric} (mean at each value, spread between best and worst):")
+    for parameter, effect in sensitivity(results, metric).items():
+        means = ", ".join(f"{value}: {mean:.4f}" for value, mean in effect["means"].items())
+        print(f"  {parameter:<45} spread {effect['spread']:.4f}   ({means})")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"metric": metric, "current": current, "results": ranked}, f, indent=2)
+        print(f"\nWrote {len(ranked)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -28,3 +28,132 @@ HEURISTIC_TOPIC_WEIGHTS = {"topic_centring": 0.4,
 OPENNESS_SIMILARITY_WEIGHT = 0.2
 CONSCIENTIOUSNESS_SIMILARITY_WEIGHT = 0.2
 
+
+
+# Single-pair scoring memoises the five trait scores per pair of personality vectors, as they do not depend on the
+# transcript. Entries are keyed by both vectors and a hash of the trait weights above, so changes never give stale scores.
+TRAIT_CACHE_ENABLED = True
+TRAIT_CACHE_MAX_ENTRIES = 100000
+
+# /match/batch scores its pairs, and streams them back, this many at a time.
+BATCH_MATCH_CHUNK_SIZE = 1000
+
+# Number of users per block in the top-k psychometric index. Smaller blocks give tighter pruning bounds
+# but more blocks to rank per query.
+TOP_K_INDEX_BLOCK_SIZE = 1024
+
+# Topic analysis backend: "openai" (LLM_MODEL_NAME over the network), "local" (LOCAL_TOPIC_MODEL_NAME, a small
+# sentence-embedding model run on the CPU, see src/topic_backends.py) or "mock" (fixed example output).
+# LOCAL_TOPIC_TEMPERATURE sets how sharply the local backend's trait and engagement scores move away from 0.5.
+TOPIC_BACKEND = "openai"
+LOCAL_TOPIC_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+LOCAL_TOPIC_TEMPERATURE = 0.05
+
+# Cache of LLM topic analyses, keyed by a hash of the transcript, the backend's model and TOPIC_PROMPT_VERSION.
+# Bump TOPIC_PROMPT_VERSION whenever the prompt in pipeline.get_topics_and_vectors changes, so stale analyses are not reused.
+TOPIC_PROMPT_VERSION = "1"
+TOPIC_CACHE_ENABLED = True
+TOPIC_CACHE_FILENAME = "topic_cache.sqlite3"
+TOPIC_CACHE_MAX_ENTRIES = 10000
+TOPIC_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Maximum number of threads used to run blocking pipeline stages (Whisper, VADER) off the event loop.
+PIPELINE_MAX_WORKERS = 4
+
+# Admission control for the expensive stages (see src/admission.py): at most "concurrency" calls of a stage run at once per
+# process, at most "queue" more wait for a slot, for up to "timeout" seconds. Beyond that requests are rejected at once,
+# with 429 if the queue is full or 503 if they waited too long, and a Retry-After estimated from recent stage durations.
+ADMISSION_LIMITS = {"whisper": {"concurrency": 2, "queue": 8, "timeout": 60.0},
+                    "llm": {"concurrency": 16, "queue": 64, "timeout": 30.0}}
+
+# Per-request profiling (see src/profiling.py), for requests sent with an "X-Profile: <PROFILING_TOKEN>" header.
+# Off by default; if it is enabled on a public deployment, set a token so only those who know it can trigger profiles.
+# Artifacts go to cache/<PROFILING_DIR>, keeping the PROFILING_MAX_PROFILES most recent. Stacks are sampled every
+# PROFILING_SAMPLE_INTERVAL_SECONDS, and allocations are traced PROFILING_TRACEMALLOC_FRAMES frames deep. A profile still
+# running after PROFILING_MAX_SECONDS (e.g. its client disconnected before the body was sent) is stopped and saved anyway.
+PROFILING_ENABLED = False
+PROFILING_TOKEN = None
+PROFILING_DIR = "profiles"
+PROFILING_MAX_PROFILES = 100
+PROFILING_SAMPLE_INTERVAL_SECONDS = 0.005
+PROFILING_TRACEMALLOC_FRAMES = 1
+PROFILING_MAX_SECONDS = 300
+
+# Heavy pipeline components are loaded on first use. List any of "whisper", "openai", "openai_async", "vader", "topic_cache", "topic_backend"
+# here to load them during API startup instead, trading a slower start for a fast first request.
+PIPELINE_WARM_UP_COMPONENTS = []
+
+# Pre-fork serving (python -m src.serve): SERVE_WORKERS API processes, forked after SERVE_PRELOAD_COMPONENTS are loaded
+# so they share them copy-on-write. Each worker gives Whisper SERVE_WORKER_THREADS threads (None: cores / workers).
+# A worker that exits is replaced after SERVE_RESTART_BACKOFF_SECONDS, doubling with each recent restart; if more than
+# SERVE_MAX_RESTARTS happen within SERVE_RESTART_WINDOW_SECONDS (e.g. workers crash on startup), the server stops instead.
+SERVE_WORKERS = 4
+SERVE_PRELOAD_COMPONENTS = ["whisper", "vader"]
+SERVE_WORKER_THREADS = None
+SERVE_RESTART_BACKOFF_SECONDS = 1.0
+SERVE_MAX_RESTARTS = 5
+SERVE_RESTART_WINDOW_SECONDS = 60.0
+
+# Whisper model used for transcription: "tiny", "base", "small", "medium", "large" (or the English-only ".en" variants).
+# WHISPER_THREADS limits the torch intra-op threads (None leaves the torch default, one per core).
+# WHISPER_INT8_QUANTIZATION converts the model's linear layers to int8 with dynamic quantization, for faster, smaller
+# CPU inference at some cost in accuracy. It is CPU only. Compare the options with `python -m benchmarks.transcription`.
+WHISPER_MODEL_SIZE = "base"
+WHISPER_DEVICE = "cpu"
+WHISPER_THREADS = None
+WHISPER_INT8_QUANTIZATION = False
+
+# Optional voice activity detection before transcription. Frames (VAD_FRAME_SECONDS long) more than VAD_THRESHOLD_DB
+# below the loudest frame, or below VAD_MIN_DB absolute, are silent. Silences longer than VAD_MIN_SILENCE_SECONDS are
+# dropped before Whisper sees the audio, keeping VAD_PADDING_SECONDS of audio either side of each voiced region.
+VAD_ENABLED = False
+VAD_FRAME_SECONDS = 0.03
+VAD_THRESHOLD_DB = -35
+VAD_MIN_DB = -60
+VAD_MIN_SILENCE_SECONDS = 1.0
+VAD_PADDING_SECONDS = 0.2
+
+# Live conversation sessions: the LLM topic analysis is re-run each time this many new words have arrived,
+# and at most LIVE_MAX_SESSIONS sessions are kept open (the least recently used are dropped).
+LIVE_TOPIC_INTERVAL_WORDS = 150
+LIVE_MAX_SESSIONS = 1000
+
+# Uploaded audio up to this size is decoded from memory. Larger uploads are decoded straight from the temporary file
+# the server spools them to, rather than being read into memory.
+UPLOAD_MEMORY_LIMIT_BYTES = 32 * 1024 * 1024
+
+# Streaming transcription decodes audio in windows of TRANSCRIBE_WINDOW_SECONDS (Whisper's native context is 30s),
+# with TRANSCRIBE_OVERLAP_SECONDS of shared audio between windows so words at a boundary are not lost.
+TRANSCRIBE_WINDOW_SECONDS = 30
+TRANSCRIBE_OVERLAP_SECONDS = 4
+
+# Batch transcription jobs. JOB_WORKERS processes (each holding one Whisper model limited to JOB_WORKER_THREADS threads)
+# are started by the API on the first submission; set it to 0 to run workers separately with `python -m src.jobs work`.
+# A running job is leased to its worker for JOB_LEASE_SECONDS, renewed while the worker is alive; a job whose lease
+# runs out (its worker crashed) is put back in the queue, or failed if that crash used up its JOB_MAX_ATTEMPTS.
+JOB_QUEUE_FILENAME = "jobs.sqlite3"
+JOB_WORKERS = 2
+JOB_WORKER_THREADS = 1
+JOB_MAX_ATTEMPTS = 3
+JOB_POLL_INTERVAL_SECONDS = 1.0
+JOB_LEASE_SECONDS = 60.0
+
+# Offline batch scoring (python -m src.batch): BATCH_WORKERS processes run the CPU stages (Whisper, VADER), at most
+# BATCH_LLM_CONCURRENCY topic analyses are in flight, and at most BATCH_MAX_IN_FLIGHT records are held in memory at once.
+# Progress is checkpointed every BATCH_CHECKPOINT_EVERY input lines, so a crashed run resumes from there.
+BATCH_WORKERS = 2
+BATCH_LLM_CONCURRENCY = 8
+BATCH_MAX_IN_FLIGHT = 64
+BATCH_CHECKPOINT_EVERY = 100
+
+# Batched topic analysis (pipeline.get_topics_and_vectors_batch): transcripts packed into one LLM request,
+# how many packed requests may be in flight at once, and the overall request rate limit.
+LLM_BATCH_PACK_SIZE = 5
+LLM_BATCH_MAX_CONCURRENCY = 4
+LLM_BATCH_REQUESTS_PER_MINUTE = 60
+
+# Full transcript analyses (topics, topic vector, engagement, VADER score, word count) kept in memory so /match can reuse
+# the analysis_id returned by /summarise. With spill enabled, analyses evicted from memory are kept on disk instead of dropped.
+ANALYSIS_STORE_MAX_ENTRIES = 1024
+ANALYSIS_STORE_SPILL = False
+ANALYSIS_STORE_SPILL_FILENAME = "analysis_spill.sqlite3"
@@ -2,29 +2,52 @@
 
 
 # Import Libraries
+import hashlib
+import json
+
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
-from scipy.spatial.distance import euclidean
 
+from . import cache
 from . import config
+from . import metrics
+
+
+TRAITS = ("openness", "conscientiousness", "extraversion", "agreeableness", "neuroticism")
 
 
 # Euclidean Distance Instead of Cosine Similarity
+def _scaled_euclidean_similarities(matrix, vec) -> np.ndarray:
+    """
+    Calculates the similarity of every row of an (N,5) matrix to a single vector,
+    based on Euclidean distance, scaled to [0,1].
+    The squared differences are summed in a fixed order so every row gives the same result as a single pair.
+    """
+    diff = np.asarray(matrix, dtype=np.float64) - np.asarray(vec, dtype=np.float64)
+    squared = diff * diff
+
+    total = squared[:, 0]
+    for i in range(1, squared.shape[1]):
+        total = total + squared[:, i]
+
+    distance = np.sqrt(total)
+    return 1 / (1 + distance)
+
+
 def _scaled_euclidean_similarity(vec1, vec2) -> float:
     """
     Calculated the similarity based on Euclidean distance, scaled to [0,1]
     """
-    distance = euclidean(np.array(vec1), np.array(vec2))
-    similarity = 1 / (1 + distance)
-    return similarity
+    return float(_scaled_euclidean_similarities(np.atleast_2d(vec1), vec2)[0])
 
 
 # Explanable Scores for Each Personality Trait
+# These accept floats or broadcastable numpy arrays, so the same logic scores one pair or a whole N x M grid.
 def _score_openness(p1_score, p2_score):
     """
     Similarity on openness is generally good, with a bias towards high openness.
     """
-    similarity = 1.0 - abs(p1_score - p2_score)
+    similarity = 1.0 - np.abs(p1_score - p2_score)
     avg_score = (p1_score + p2_score) / 2
     weight = config.OPENNESS_SIMILARITY_WEIGHT
 
@@ -35,7 +58,7 @@ def _score_conscientiousness(p1_score, p2_score):
     """
     Similarity on conscientiousness is generally good, with a bias towards high conscientiousness.
     """
-    similarity = 1.0 - abs(p1_score - p2_score)
+    similarity = 1.0 - np.abs(p1_score - p2_score)
     avg_score = (p1_score + p2_score) / 2
     weight = config.CONSCIENTIOUSNESS_SIMILARITY_WEIGHT
 
@@ -46,7 +69,7 @@ def _score_extraversion(p1_score, p2_score):
     """
     Complementary extraversion scores are preferred. Ambiverts also pair well together.
     """
-    return 1 - abs((p1_score + p2_score) - 1)
+    return 1 - np.abs((p1_score + p2_score) - 1)
 
 
 def _score_agreeableness(p1_score, p2_score):
@@ -54,7 +77,7 @@ def _score_agreeableness(p1_score, p2_score):
     Agreeableness is generally good for compatibility.
     """
     penalty = (1 - p1_score) * (1 - p2_score)
-    return max(0, min(1,(p1_score + p2_score) / 2 - (penalty * 0.25)))
+    return np.clip((p1_score + p2_score) / 2 - (penalty * 0.25), 0, 1)
 
 
 def _score_neuroticism(p1_score, p2_score):
@@ -63,7 +86,14 @@ def _score_neuroticism(p1_score, p2_score):
     """
     friction_score = 1 - ((p1_score + p2_score)/2)
     clash_penalty = p1_score * p2_score
-    return max(0, min(1, friction_score - (clash_penalty * 0.25)))
+    return np.clip(friction_score - (clash_penalty * 0.25), 0, 1)
+
+
+TRAIT_SCORERS = {"openness": _score_openness,
+                 "conscientiousness": _score_conscientiousness,
+                 "extraversion": _score_extraversion,
+                 "agreeableness": _score_agreeableness,
+                 "neuroticism": _score_neuroticism}
 
 
 def _time_embedded_vector_weighting(personality_weight, word_count, max_bonus, max_cap):
@@ -71,38 +101,94 @@ def _time_embedded_vector_weighting(personality_weight, word_count, max_bonus, m
     Calculates the new psychometric vs. audio compatibility weighting
     based on the length of conversation.
     '''
-    word_count_bonus = -max_bonus
-
     # Calculate the bonus line using the maximum bonus, and the point it is achieved
     denom = (max_bonus * 2)/max_cap
 
-    if word_count <= max_cap:
-        word_count_bonus = word_count*denom - max_bonus
-    else:
-        word_count_bonus = max_cap
-    
+    # word_count may be an array of counts, one per conversation
+    word_count_bonus = np.where(np.asarray(word_count) <= max_cap, word_count*denom - max_bonus, max_cap)
+
     return np.clip(personality_weight - word_count_bonus, 0.0, 1.0)
 
 
+def _as_psychometric_matrix(vectors) -> np.ndarray:
+    """
+    Converts a single personality vector or a list of them into an (N,5) float64 matrix.
+    """
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float64))
+    if matrix.ndim != 2 or matrix.shape[1] != len(TRAITS):
+        raise ValueError(f"Expected psychometrics of shape (N, {len(TRAITS)}), got {matrix.shape}")
+    return matrix
 
-def calculate_heuristic_score(pers_vec_1: list[float], pers_vec_2: list[float], analysis_results: dict) -> dict:
+
+def calculate_trait_score_matrix(pers_mat_1, pers_mat_2) -> tuple[dict, np.ndarray]:
+    """
+    Scores every row of an (N,5) psychometrics matrix against every row of an (M,5) matrix.
+    Returns the per-trait N x M breakdown and the weighted psychometric score matrix.
+    """
+    mat_1 = _as_psychometric_matrix(pers_mat_1)
+    mat_2 = _as_psychometric_matrix(pers_mat_2)
+
+    # Broadcast (N,1) against (1,M) so every trait function produces an N x M grid
+    scores = {trait: TRAIT_SCORERS[trait](mat_1[:, i][:, None], mat_2[:, i][None, :])
+              for i, trait in enumerate(TRAITS)}
+
+    # Summed one trait at a time, in the same order as the scalar path
+    psychometric_score = 0
+    for trait in TRAITS:
+        psychometric_score = psychometric_score + scores[trait] * config.HEURISTIC_WEIGHTS[trait]
+
+    return scores, psychometric_score
+
+
+# Memoised Trait Scores for Single Pairs
+# The psychometric half of the score does not depend on the conversation, so repeat matches of a pair reuse it.
+# Entries are keyed by the two personality vectors themselves and a fingerprint of the trait config, so a changed
+# profile or weight gives a new key rather than a stale hit; old entries age out of the LRU.
+TRAIT_SCORE_CACHE = cache.AnalysisStore(max_entries=config.TRAIT_CACHE_MAX_ENTRIES)
+
+def trait_config_fingerprint() -> str:
+    """
+    Hash of every config value the trait scores depend on. Read on each call, so runtime config changes are picked up.
+    """
+    values = [config.HEURISTIC_WEIGHTS, config.OPENNESS_SIMILARITY_WEIGHT, config.CONSCIENTIOUSNESS_SIMILARITY_WEIGHT]
+    return hashlib.sha256(json.dumps(values, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def cached_trait_scores(mat_1: np.ndarray, mat_2: np.ndarray) -> tuple[dict, np.ndarray]:
+    """
+    calculate_trait_score_matrix for one pair, served from TRAIT_SCORE_CACHE when the pair has been scored before.
+    The returned arrays are shared with the cache and must not be modified.
+    """
+    key = mat_1.tobytes() + mat_2.tobytes() + trait_config_fingerprint().encode("ascii")
+    cached = TRAIT_SCORE_CACHE.get(key)
+    metrics.TRAIT_CACHE_REQUESTS.inc("hit" if cached is not None else "miss")
+    if cached is None:
+        cached = calculate_trait_score_matrix(mat_1, mat_2)
+        TRAIT_SCORE_CACHE.set(key, cached)
+    return cached
+
+
+def calculate_heuristic_score_matrix(pers_mat_1, pers_mat_2, analysis_results: dict, trait_scores=None) -> dict:
+    """
+    Batched heuristic compatibility for an (N,5) and an (M,5) psychometrics matrix that share one conversation analysis.
+    Returns the N x M match scores, the per-trait breakdown and the intermediate topic terms.
+    trait_scores can pass in the result of calculate_trait_score_matrix for the same matrices, if already known.
+    """
+    mat_1 = _as_psychometric_matrix(pers_mat_1)
+    mat_2 = _as_psychometric_matrix(pers_mat_2)
 
     # How compatible people are based on individual personality trait heuristics
-    scores = {"openness": _score_openness(pers_vec_1[0], pers_vec_2[0]),
-              "conscientiousness": _score_conscientiousness(pers_vec_1[1], pers_vec_2[1]),
-              "extraversion": _score_extraversion(pers_vec_1[2], pers_vec_2[2]),
-              "agreeableness": _score_agreeableness(pers_vec_1[3], pers_vec_2[3]),
-              "neuroticism": _score_neuroticism(pers_vec_1[4], pers_vec_2[4])}
-    
+    scores, psychometric_score = trait_scores if trait_scores is not None else calculate_trait_score_matrix(mat_1, mat_2)
+
     topic_vec = analysis_results["topic_vector"]
 
     engagement_score = analysis_results["engagement_score"]
     vadeder_engagement = analysis_results["vader_engagement"] * config.HEURISTIC_TOPIC_WEIGHTS['vader_cue_bonus']
 
     # How interested is the least intersted person in the conversation.
-    interest_1 = _scaled_euclidean_similarity(pers_vec_1, topic_vec)
-    interest_2 = _scaled_euclidean_similarity(pers_vec_2, topic_vec)
-    min_interest = min(interest_1, interest_2)
+    interest_1 = _scaled_euclidean_similarities(mat_1, topic_vec)
+    interest_2 = _scaled_euclidean_similarities(mat_2, topic_vec)
+    min_interest = np.minimum(interest_1[:, None], interest_2[None, :])
 
     # Scale the Topic Interest Vector to a Wider Range of Value (Necessary due to min)
     mu = config.HEURISTIC_TOPIC_WEIGHTS["topic_centring"]
@@ -114,38 +200,108 @@ def calculate_heuristic_score(pers_vec_1: list[float], pers_vec_2: list[float],
     scores_topic = np.clip(vec_interest + engagenent_adjustment + vadeder_engagement, 0.0, 1.0)
 
     # How important are different personality traits and topic contexual personality
-    weights = {"openness": config.HEURISTIC_WEIGHTS["openness"],
-               "conscientiousness": config.HEURISTIC_WEIGHTS["conscientiousness"],
-               "extraversion": config.HEURISTIC_WEIGHTS["extraversion"],
-               "agreeableness": config.HEURISTIC_WEIGHTS["agreeableness"],
-               "neuroticism": config.HEURISTIC_WEIGHTS["neuroticism"]}
-    
-    
     word_count = analysis_results["word_count"]
     personality_weight = config.HEURISTIC_PERSONALITY_WEIGHT
     p_weight = _time_embedded_vector_weighting(personality_weight, word_count, config.HEURISTIC_PERSONALITY_BONUS["weight"], config.HEURISTIC_PERSONALITY_BONUS["max_cap"])
 
-    final_score = sum(scores[key] * weights[key] for key in weights) * p_weight + scores_topic * (1-p_weight)
+    final_score = psychometric_score * p_weight + scores_topic * (1-p_weight)
 
-    explanation = (f"Final Score: {final_score:.2f}." 
-                   f"Topic Interest: {vec_interest:.2f}, Social Cue Bonus: {engagenent_adjustment + vadeder_engagement:.2f}, Length of Audio Bonus: {2*(personality_weight - p_weight):.2f}. "
-                   f"Trait Scores (0-1): Openness: {scores["openness"]:.2f}, Conscientiousness: {scores['conscientiousness']:.2f}, "
-                   f"Extraversion: {scores['extraversion']:.2f}, Agreeableness: {scores['agreeableness']:.2f}, Neuroticosim: {scores['neuroticism']:.2f}.")
+    return {"match_score": final_score,
+            "breakdown": scores,
+            "topic_interest": vec_interest,
+            "social_cue_bonus": engagenent_adjustment + vadeder_engagement,
+            "length_bonus": 2*(personality_weight - p_weight)}
+
+
+def calculate_heuristic_score_pairs(pers_mat_1, pers_mat_2, topic_vectors, engagement_scores, vader_engagements, word_counts) -> dict:
+    """
+    Heuristic compatibility for R separate pairs, row i of pers_mat_1 with row i of pers_mat_2, each with its own conversation
+    analysis (the rows of topic_vectors and the elements of the other arrays; a single row or value is shared by every pair).
+    Gives the same scores as calculate_heuristic_score on each pair, but in one vectorized pass.
+    Returns length R arrays of the match scores, the per-trait breakdown and the intermediate topic terms.
+    """
+    mat_1 = _as_psychometric_matrix(pers_mat_1)
+    mat_2 = _as_psychometric_matrix(pers_mat_2)
+    topic_mat = _as_psychometric_matrix(topic_vectors)
+
+    scores = {trait: TRAIT_SCORERS[trait](mat_1[:, i], mat_2[:, i]) for i, trait in enumerate(TRAITS)}
+    psychometric_score = 0
+    for trait in TRAITS:
+        psychometric_score = psychometric_score + scores[trait] * config.HEURISTIC_WEIGHTS[trait]
+
+    min_interest = np.minimum(_scaled_euclidean_similarities(mat_1, topic_mat), _scaled_euclidean_similarities(mat_2, topic_mat))
+    mu = config.HEURISTIC_TOPIC_WEIGHTS["topic_centring"]
+    stretch_factor = config.HEURISTIC_TOPIC_WEIGHTS["topic_stretch_factor"]
+    vec_interest = np.clip(mu + stretch_factor*(min_interest - mu), 0.0, 1.0)
+
+    engagenent_adjustment = (np.asarray(engagement_scores, dtype=np.float64) - 0.5) * config.HEURISTIC_TOPIC_WEIGHTS["social_cue_bonus"]
+    vadeder_engagement = np.asarray(vader_engagements, dtype=np.float64) * config.HEURISTIC_TOPIC_WEIGHTS['vader_cue_bonus']
+    scores_topic = np.clip(vec_interest + engagenent_adjustment + vadeder_engagement, 0.0, 1.0)
+
+    personality_weight = config.HEURISTIC_PERSONALITY_WEIGHT
+    p_weight = _time_embedded_vector_weighting(personality_weight, np.asarray(word_counts, dtype=np.float64),
+                                               config.HEURISTIC_PERSONALITY_BONUS["weight"], config.HEURISTIC_PERSONALITY_BONUS["max_cap"])
+
+    final_score = psychometric_score * p_weight + scores_topic * (1-p_weight)
+
+    n_pairs = len(final_score)
+    return {"match_score": final_score,
+            "breakdown": scores,
+            "topic_interest": vec_interest,
+            "social_cue_bonus": np.broadcast_to(engagenent_adjustment + vadeder_engagement, n_pairs),
+            "length_bonus": np.broadcast_to(2*(personality_weight - p_weight), n_pairs)}
+
+
+def explain_heuristic_score(final_score: float, vec_interest: float, social_cue_bonus: float, length_bonus: float, scores: dict) -> str:
+    """
+    The human readable explanation returned with a heuristic score.
+    """
+    return (f"Final Score: {final_score:.2f}." 
+            f"Topic Interest: {vec_interest:.2f}, Social Cue Bonus: {social_cue_bonus:.2f}, Length of Audio Bonus: {length_bonus:.2f}. "
+            f"Trait Scores (0-1): Openness: {scores['openness']:.2f}, Conscientiousness: {scores['conscientiousness']:.2f}, "
+            f"Extraversion: {scores['extraversion']:.2f}, Agreeableness: {scores['agreeableness']:.2f}, Neuroticosim: {scores['neuroticism']:.2f}.")
+
+
+def calculate_heuristic_score(pers_vec_1: list[float], pers_vec_2: list[float], analysis_results: dict) -> dict:
+    """
+    Scores a single pair of users. This is a thin wrapper over calculate_heuristic_score_matrix.
+    """
+    mat_1, mat_2 = _as_psychometric_matrix([pers_vec_1]), _as_psychometric_matrix([pers_vec_2])
+    trait_scores = cached_trait_scores(mat_1, mat_2) if config.TRAIT_CACHE_ENABLED else None
+    result = calculate_heuristic_score_matrix(mat_1, mat_2, analysis_results, trait_scores)
+
+    final_score = float(result["match_score"][0, 0])
+    vec_interest = float(result["topic_interest"][0, 0])
+    scores = {trait: float(result["breakdown"][trait][0, 0]) for trait in TRAITS}
+
+    explanation = explain_heuristic_score(final_score, vec_interest, result['social_cue_bonus'], result['length_bonus'], scores)
     return {"match_score": final_score, "explanation": explanation, "breakdown": scores}
 
 
 
 
 # Baseline Compatibility Score
-def baseline_compatibility_score(vec1, vec2):
-    score = cosine_similarity(vec1.reshape(1,-1), vec2.reshape(1,-1))[0][0]
-
-    # Interpret the score
+def interpret_baseline_score(score: float) -> str:
     if score > 0.8:
-        interpretation = "High compatibility in this conversation."
+        return "High compatibility in this conversation."
     elif score > 0.5:
-        interpretation = "Moderate compatibility in this conversation."
+        return "Moderate compatibility in this conversation."
     else:
-        interpretation = "Low compatibility in this conversation."
-    return {"score": score, "interpretation": interpretation}
+        return "Low compatibility in this conversation."
+
+
+@metrics.timed("baseline_score")
+def baseline_compatibility_score(vec1, vec2):
+    score = cosine_similarity(vec1.reshape(1,-1), vec2.reshape(1,-1))[0][0]
+    return {"score": score, "interpretation": interpret_baseline_score(score)}
+
+
+def baseline_compatibility_scores(fused_mat_1, fused_mat_2) -> np.ndarray:
+    """
+    Cosine similarity of row i of one (R,5) matrix of fused vectors with row i of the other, for R pairs at once.
+    """
+    fused_mat_1 = np.asarray(fused_mat_1, dtype=np.float64)
+    fused_mat_2 = np.asarray(fused_mat_2, dtype=np.float64)
+    norms = np.linalg.norm(fused_mat_1, axis=1) * np.linalg.norm(fused_mat_2, axis=1)
+    return np.einsum("ij,ij->i", fused_mat_1, fused_mat_2) / np.where(norms == 0, 1, norms)
 
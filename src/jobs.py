@@ -0,0 +1,286 @@
+# --- Batch Transcription Job Queue --- #
+# Jobs are stored in SQLite so any number of worker processes (in the API or started from the command line) can share one queue.
+# A claimed job is leased to its worker, which renews the lease while it transcribes. Only jobs whose lease has run out,
+# because their worker died, are taken back, so workers in other processes never lose jobs they are still running.
+#
+# Usage: python -m src.jobs enqueue <audio files...>
+#        python -m src.jobs work --workers 4
+
+
+# Import Libraries
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from . import config
+from . import pipeline
+
+JOB_QUEUE_PATH = os.path.join(pipeline.PROJECT_ROOT, "cache", config.JOB_QUEUE_FILENAME)
+JOB_AUDIO_DIR = os.path.join(pipeline.PROJECT_ROOT, "cache", "job_audio")
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobQueue:
+    """
+    Persistent queue of transcription jobs.
+    A failed job is re-queued until it has been attempted max_attempts times.
+    Running jobs are leased for lease_seconds, and re-queued if the lease is not renewed in time.
+    Each process should open its own JobQueue on the same path.
+    """
+
+    def __init__(self, path: str = JOB_QUEUE_PATH, max_attempts: int = config.JOB_MAX_ATTEMPTS, lease_seconds: float = config.JOB_LEASE_SECONDS):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                                  id TEXT PRIMARY KEY,
+                                  audio_path TEXT NOT NULL,
+                                  cleanup INTEGER NOT NULL,
+                                  status TEXT NOT NULL,
+                                  attempts INTEGER NOT NULL DEFAULT 0,
+                                  result TEXT,
+                                  error TEXT,
+                                  created_at REAL NOT NULL,
+                                  updated_at REAL NOT NULL,
+                                  lease_expires_at REAL)""")
+        # Queues created before leases were added get the column; their running jobs count as expired
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")]
+        if "lease_expires_at" not in columns:
+            try:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN lease_expires_at REAL")
+            except sqlite3.OperationalError:
+                pass  # Added by another process opening the queue at the same time
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def submit(self, audio_path: str, cleanup: bool = False) -> str:
+        """
+        Queues an audio file for transcription and returns the job id.
+        If cleanup is set, the file is deleted once the job has finished.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT INTO jobs (id, audio_path, cleanup, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                               (job_id, audio_path, int(cleanup), QUEUED, now, now))
+        return job_id
+
+    def claim(self):
+        """
+        Atomically takes the oldest queued job and marks it as running, leased to the caller, after re-queueing any jobs
+        whose lease has expired. Returns (job_id, audio_path) or None. Keep the lease alive with renew().
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                failed = self._requeue_expired(now)[1]
+                row = self._conn.execute("SELECT id, audio_path FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)).fetchone()
+                if row is not None:
+                    self._conn.execute("UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ?, lease_expires_at = ? WHERE id = ?",
+                                       (RUNNING, now, now + self.lease_seconds, row[0]))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        for job_id in failed:
+            self._cleanup(job_id)
+        return row
+
+    def complete(self, job_id: str, transcript: str) -> None:
+        """
+        Records a job's transcript. Ignored if the job is no longer running, i.e. its lease expired and it was taken back.
+        """
+        with self._lock:
+            updated = self._conn.execute("UPDATE jobs SET status = ?, result = ?, error = NULL, updated_at = ? WHERE id = ? AND status = ?",
+                                         (DONE, transcript, time.time(), job_id, RUNNING)).rowcount
+        if updated:
+            self._cleanup(job_id)
+
+    def fail(self, job_id: str, error: str) -> None:
+        """
+        Records a failed attempt, re-queueing the job if it has attempts left. Ignored if the job is no longer running.
+        """
+        with self._lock:
+            updated = self._conn.execute("UPDATE jobs SET status = CASE WHEN attempts < ? THEN ? ELSE ? END, error = ?, updated_at = ? WHERE id = ? AND status = ?",
+                                         (self.max_attempts, QUEUED, FAILED, error, time.time(), job_id, RUNNING)).rowcount
+        if updated and self.get(job_id)["status"] == FAILED:
+            self._cleanup(job_id)
+
+    def renew(self, job_id: str) -> None:
+        """
+        Extends the lease of a running job by lease_seconds from now.
+        """
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND status = ?", (time.time() + self.lease_seconds, job_id, RUNNING))
+
+    def requeue_expired(self) -> int:
+        """
+        Takes back running jobs whose lease has expired (their worker crashed), re-queueing those with attempts left and
+        failing the rest, and returns how many there were. Safe to call while other workers are running: their jobs are still leased.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                expired, failed = self._requeue_expired(time.time())
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        for job_id in failed:
+            self._cleanup(job_id)
+        return expired
+
+    def _requeue_expired(self, now: float) -> tuple[int, list[str]]:
+        """
+        Expires leases inside the caller's transaction. Returns the number of expired jobs and the ids of those now failed,
+        whose audio the caller cleans up once the transaction is over.
+        """
+        # A job that keeps crashing its worker counts each crash as an attempt, so it cannot be retried forever
+        expired = "status = ? AND COALESCE(lease_expires_at, 0) < ?"
+        failed = [row[0] for row in self._conn.execute(f"SELECT id FROM jobs WHERE {expired} AND attempts >= ?", (RUNNING, now, self.max_attempts))]
+        n_expired = self._conn.execute(f"UPDATE jobs SET status = CASE WHEN attempts < ? THEN ? ELSE ? END, error = ?, updated_at = ?, lease_expires_at = NULL WHERE {expired}",
+                                       (self.max_attempts, QUEUED, FAILED, "Worker stopped responding before finishing the job", now, RUNNING, now)).rowcount
+        return n_expired, failed
+
+    def get(self, job_id: str):
+        with self._lock:
+            row = self._conn.execute("SELECT id, status, attempts, result, error FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {"job_id": row[0], "status": row[1], "attempts": row[2], "result": row[3], "error": row[4]}
+
+    def counts(self) -> dict:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def _cleanup(self, job_id: str) -> None:
+        with self._lock:
+            row = self._conn.execute("SELECT audio_path, cleanup FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is not None and row[1] and os.path.exists(row[0]):
+            os.remove(row[0])
+
+
+# Workers
+def _renew_lease(queue: JobQueue, job_id: str, finished: threading.Event) -> None:
+    """
+    Renews a job's lease every third of the lease period until it has finished, so it is never taken back while its worker is alive.
+    """
+    while not finished.wait(queue.lease_seconds / 3):
+        queue.renew(job_id)
+
+
+def run_worker(queue: JobQueue, transcribe=None, stop_event=None, poll_interval: float = config.JOB_POLL_INTERVAL_SECONDS, exit_when_empty: bool = False) -> int:
+    """
+    Pulls jobs from the queue and transcribes them until stop_event is set (or the queue is empty, if exit_when_empty).
+    Returns the number of jobs processed.
+    """
+    transcribe = transcribe or pipeline.transcribe_audio
+    processed = 0
+
+    while stop_event is None or not stop_event.is_set():
+        job = queue.claim()
+        if job is None:
+            if exit_when_empty:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        job_id, audio_path = job
+        finished = threading.Event()
+        heartbeat = threading.Thread(target=_renew_lease, args=(queue, job_id, finished), name=f"lease-{job_id}", daemon=True)
+        heartbeat.start()
+        try:
+            queue.complete(job_id, transcribe(audio_path))
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            queue.fail(job_id, str(e))
+        finally:
+            finished.set()
+            heartbeat.join()
+        processed += 1
+
+    return processed
+
+
+def _worker_process(queue_path: str, stop_event) -> None:
+    """
+    Entry point of each worker process: limits Whisper to config.JOB_WORKER_THREADS threads, so workers scale across cores
+    instead of competing for them, and loads one model before pulling jobs.
+    """
+    import torch
+    pipeline.get_whisper_model()
+    # Set after loading, so it takes precedence over config.WHISPER_THREADS
+    torch.set_num_threads(config.JOB_WORKER_THREADS)
+    run_worker(JobQueue(queue_path), stop_event=stop_event)
+
+
+class WorkerPool:
+    """
+    A pool of worker processes, each holding its own Whisper model and pulling from the same queue.
+    """
+
+    def __init__(self, n_workers: int = config.JOB_WORKERS, queue_path: str = JOB_QUEUE_PATH):
+        self.n_workers = n_workers
+        self.queue_path = queue_path
+        self._context = multiprocessing.get_context("spawn")
+        self._stop_event = self._context.Event()
+        self._processes = []
+
+    def start(self) -> None:
+        requeued = JobQueue(self.queue_path).requeue_expired()
+        if requeued:
+            print(f"Re-queued {requeued} jobs whose workers stopped responding.")
+        for i in range(self.n_workers):
+            process = self._context.Process(target=_worker_process, args=(self.queue_path, self._stop_event), name=f"transcribe-worker-{i}", daemon=True)
+            process.start()
+            self._processes.append(process)
+        print(f"Started {self.n_workers} transcription workers.")
+
+    def stop(self, timeout: float = 30) -> None:
+        self._stop_event.set()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+
+    @property
+    def running(self) -> bool:
+        return any(process.is_alive() for process in self._processes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch transcription job queue.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    enqueue = subparsers.add_parser("enqueue", help="Queue audio files for transcription.")
+    enqueue.add_argument("audio_paths", nargs="+")
+    work = subparsers.add_parser("work", help="Run a pool of transcription workers until interrupted.")
+    work.add_argument("--workers", type=int, default=max(1, config.JOB_WORKERS))
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        queue = JobQueue()
+        for audio_path in args.audio_paths:
+            print(f"{queue.submit(os.path.abspath(audio_path))}\t{audio_path}")
+    else:
+        pool = WorkerPool(args.workers)
+        pool.start()
+        try:
+            while pool.running:
+                time.sleep(config.JOB_POLL_INTERVAL_SECONDS)
+        except KeyboardInterrupt:
+            pool.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,126 @@
 
 # Import Libraries
 import uvicorn
+import json
 import shutil
 import os
-from fastapi import FastAPI, UploadFile, File, HTTPException
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import List
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
+from . import admission
 from . import pipeline
+from . import profiling
 from . import heuristics
 from . import schemas
+from . import matching
+from . import config
+from . import jobs
+from . import metrics
+from . import sessions
 
-app = FastAPI(title="Compatibility AI", description="A 48h speech recognition take-home task.")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Optionally loads heavy pipeline components at startup (see config.PIPELINE_WARM_UP_COMPONENTS).
+    """
+    if config.PIPELINE_WARM_UP_COMPONENTS:
+        await pipeline.run_in_executor(pipeline.warm_up, config.PIPELINE_WARM_UP_COMPONENTS)
+    yield
+    if JOB_POOL is not None:
+        JOB_POOL.stop()
+
+
+app = FastAPI(title="Compatibility AI", description="A 48h speech recognition take-home task.", lifespan=lifespan)
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """
+    Records the latency of every request, labelled by the route template so ids in paths do not create new series.
+    """
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    metrics.HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, request.method, path, str(response.status_code))
+    return response
+
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """
+    Profiles the request if it asks to be and config allows it (see src/profiling.py), returning the profile's id in X-Profile-Id.
+    """
+    if not profiling.requested(request.headers, request.query_params):
+        return await call_next(request)
+
+    profile = profiling.try_start(request.method, request.url.path)
+    if profile is None:
+        response = await call_next(request)
+        response.headers["X-Profile-Skipped"] = "Another request is being profiled"
+        return response
 
-# Load User Profiles
+    try:
+        response = await call_next(request)
+    except BaseException:
+        profile.stop()
+        raise
+
+    # Streamed bodies are produced after the handler returns, so profiling stops once the body has been sent, or after
+    # config.PROFILING_MAX_SECONDS if the body is never iterated (a client that disconnects first)
+    body = response.body_iterator
+    async def profiled_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            profile.stop(response.status_code)
+
+    response.body_iterator = profiled_body()
+    response.headers["X-Profile-Id"] = profile.request_id
+    return response
+
+
+@app.exception_handler(admission.Overloaded)
+async def overloaded(request: Request, exc: admission.Overloaded):
+    """
+    Requests turned away by admission control (see config.ADMISSION_LIMITS) get 429 or 503, and when to retry.
+    """
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)}, headers={"Retry-After": str(exc.retry_after)})
+
+
+# Load User Profiles from the memory-mapped profile store, and build the Top-K Candidate Index on it once at startup.
+# The store holds psychometrics as float32, so every endpoint scores float32-rounded profiles: scores differ from
+# scoring the float64 values in user_profiles.json by around 1e-7.
 try:
-    USER_PROFILES = pipeline.load_user_profiles()
-    USER_1_VEC = USER_PROFILES["user_1"]["psychometrics"]
-    USER_2_VEC = USER_PROFILES["user_2"]["psychometrics"]
+    PROFILE_STORE = pipeline.load_profile_store()
+    USER_1_VEC = PROFILE_STORE.get("user_1").tolist()
+    USER_2_VEC = PROFILE_STORE.get("user_2").tolist()
+    PROFILE_INDEX = matching.PsychometricIndex.from_store(PROFILE_STORE)
 except FileNotFoundError:
     print("WARNING: user_profiles.json not found. Using defaults.")
+    PROFILE_STORE = None
     USER_1_VEC = [0.5, 0.5, 0.5, 0.5, 0.5]
     USER_2_VEC = [0.5, 0.5, 0.5, 0.5, 0.5]
+    PROFILE_INDEX = matching.PsychometricIndex.from_profiles({})
+
+
+# Read Uploaded Audio
+async def _read_upload(file: UploadFile):
+    """
+    Returns an uploaded audio file for the pipeline to decode: its bytes if it is at most config.UPLOAD_MEMORY_LIMIT_BYTES,
+    and otherwise the temporary file the server spooled it to, which ffmpeg then reads directly.
+    """
+    if file.size is not None and file.size <= config.UPLOAD_MEMORY_LIMIT_BYTES:
+        return await file.read()
+    await file.seek(0)
+    return file.file
 
 
 # Transcribe Audio
@@ -29,32 +129,57 @@ async def transcribe(file: UploadFile = File(...)):
     """
     Uploads an audio file and returns the transcript.
     """
-    #temp_path = f"temp_{file.filename}"
-    temp_path = os.path.join(pipeline.PROJECT_ROOT, f"temp_{file.filename}")
     try:
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        transcript_text = pipeline.transcribe_audio(temp_path)
+        audio = await _read_upload(file)
+        transcript_text = await pipeline.transcribe_audio_async(audio)
         return {"transcript": transcript_text}
     
+    except admission.Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Transcription Failed: {str(e)}")
-    
-    finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+
+
+# Stream a Transcript for Long Audio
+@app.post("/transcribe/stream")
+async def transcribe_stream(file: UploadFile = File(...)):
+    """
+    Uploads an audio file and streams transcript segments back as Server-Sent Events while Whisper works through the audio.
+    Each event carries {"start", "end", "text"}; a final "done" event marks the end of the transcript.
+    """
+    # Turned away before the stream starts, so the client gets a 429 rather than an error event
+    admission.LIMITERS["whisper"].check()
+    try:
+        audio = await _read_upload(file)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Transcription Failed: {str(e)}")
+
+    async def events():
+        try:
+            async for segment in pipeline.transcribe_audio_stream_async(audio):
+                yield f"data: {json.dumps(segment)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            detail = {"detail": f"Transcription Failed: {str(e)}"}
+            yield f"event: error\ndata: {json.dumps(detail)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
 
 
 # Extract Topics
 @app.post("/summarise", response_model=schemas.TopicsOutput)
 async def summarise(request: schemas.TranscriptInput):
     """
-    Takes a transcript string and returns a list of 5 topics.
+    Takes a transcript string and returns a list of 5 topics,
+    plus an analysis_id that can be passed to /match instead of the transcript to reuse this analysis.
     """
     try:
-        topics, _, _ = pipeline.get_topics_and_vectors(request.text) # Use get_topics_and_vectors_mock() while the API calls are down
-        return {"topics": topics}
+        analysis = await pipeline.analyse_transcript_async(request.text, request.analysis_id)
+        return {"topics": analysis["topics"], "analysis_id": analysis["analysis_id"]}
+    except pipeline.UnknownAnalysisError:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired analysis_id: {request.analysis_id}. Send the transcript text instead.")
+    except admission.Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Topic extraction failed: {str(e)}")
     
@@ -63,13 +188,14 @@ async def summarise(request: schemas.TranscriptInput):
 @app.post("/match", response_model=schemas.MatchOutput)
 async def match(request: schemas.TranscriptInput):
     """
-    Takes a transcript, returns the compatibility scores
+    Takes a transcript (or the analysis_id from /summarise), returns the compatibility scores
     """
     try:
 
-        # Extract topic vectors
-        topics, topic_vec, engagement_score = pipeline.get_topics_and_vectors(request.text) # Use get_topics_and_vectors_mock() while the API calls are down
-        vader_compound_score = pipeline.get_vader_sentiment(request.text)
+        # Extract topic vectors, sentiment and transcript length, or reuse them from an earlier /summarise
+        analysis = await pipeline.analyse_transcript_async(request.text, request.analysis_id)
+        analysis_results = analysis["analysis_results"]
+        topic_vec = analysis_results["topic_vector"]
 
         # Fuse vectors
         fused_vec_1 = pipeline.fuse_vectors(USER_1_VEC, topic_vec)
@@ -78,20 +204,219 @@ async def match(request: schemas.TranscriptInput):
         # Calculate baseline score
         baseline = heuristics.baseline_compatibility_score(fused_vec_1, fused_vec_2)
 
-        # Calculate transcript length
-        word_count = len(request.text.split())
-
         # Calculate heuristic score
-        analysis_results = {"topic_vector":topic_vec, "engagement_score": engagement_score, "vader_engagement": vader_compound_score, "word_count": word_count}
         heuristic = pipeline.heuristic_compatibility_score(USER_1_VEC, USER_2_VEC, analysis_results)
 
         return {"baseline_score": baseline,
-                "heuristic_score": heuristic}
+                "heuristic_score": heuristic,
+                "analysis_id": analysis["analysis_id"]}
     
+    except pipeline.UnknownAnalysisError:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired analysis_id: {request.analysis_id}. Send the transcript text instead.")
+    except admission.Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Matching failed: {str(e)}")
     
 
+# Score Many Pairs Against One Conversation
+@app.post("/match/batch")
+async def match_batch(request: schemas.BatchMatchInput):
+    """
+    Takes one transcript (or analysis_id) shared by many pairs of users, e.g. from a group event, and analyses it once.
+    Streams back one schemas.BatchMatchLine per pair as newline-delimited JSON, in request order; the analysis_id is
+    returned in the X-Analysis-Id header. A line with an "error" key means the rest of the batch failed.
+    """
+    user_ids_1 = [pair.user_1_id for pair in request.pairs]
+    user_ids_2 = [pair.user_2_id for pair in request.pairs]
+    unknown = sorted({user_id for user_id in user_ids_1 + user_ids_2 if PROFILE_STORE is None or user_id not in PROFILE_STORE})
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown users: {', '.join(unknown[:10])}" + (" ..." if len(unknown) > 10 else ""))
+
+    try:
+        analysis = await pipeline.analyse_transcript_async(request.text, request.analysis_id)
+    except pipeline.UnknownAnalysisError:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired analysis_id: {request.analysis_id}. Send the transcript text instead.")
+    except admission.Overloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Matching failed: {str(e)}")
+
+    pers_mat_1 = PROFILE_STORE.get_many(user_ids_1)
+    pers_mat_2 = PROFILE_STORE.get_many(user_ids_2)
+
+    async def lines():
+        try:
+            for start in range(0, len(request.pairs), config.BATCH_MATCH_CHUNK_SIZE):
+                end = start + config.BATCH_MATCH_CHUNK_SIZE
+                results = await pipeline.run_in_executor(pipeline.match_pairs, pers_mat_1[start:end], pers_mat_2[start:end], analysis["analysis_results"])
+                yield "".join(json.dumps({"user_1_id": user_1_id, "user_2_id": user_2_id, **result}) + "\n"
+                              for user_1_id, user_2_id, result in zip(user_ids_1[start:end], user_ids_2[start:end], results))
+        except Exception as e:
+            yield json.dumps({"error": f"Matching failed: {str(e)}"}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"X-Analysis-Id": analysis["analysis_id"]})
+
+
+# Find the Best Partners for One User
+@app.post("/match/top-k", response_model=schemas.TopKOutput)
+async def match_top_k(request: schemas.TopKInput):
+    """
+    Takes a user id, returns the k most compatible users by psychometric heuristic score.
+    """
+    if request.user_id not in PROFILE_INDEX:
+        raise HTTPException(status_code=404, detail=f"Unknown user: {request.user_id}")
+
+    try:
+        matches = PROFILE_INDEX.top_k(request.user_id, request.k)
+        return {"user_id": request.user_id, "matches": matches}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Top-k matching failed: {str(e)}")
+
+# Audio to Match in One Request
+@app.post("/analyse")
+async def analyse(file: UploadFile = File(...), user_1_id: str = Form(...), user_2_id: str = Form(...)):
+    """
+    Uploads a conversation and the ids of its two speakers, and runs the whole pipeline server side.
+    Each stage's result is streamed back as a Server-Sent Event named after the stage (transcript, topics, baseline_score,
+    sentiment, heuristic_score) as soon as it is ready; a final "done" event marks the end of the analysis.
+    """
+    for user_id in (user_1_id, user_2_id):
+        if PROFILE_STORE is None or user_id not in PROFILE_STORE:
+            raise HTTPException(status_code=404, detail=f"Unknown user: {user_id}")
+    pers_vec_1 = PROFILE_STORE.get(user_1_id).tolist()
+    pers_vec_2 = PROFILE_STORE.get(user_2_id).tolist()
+    admission.LIMITERS["whisper"].check()
+
+    try:
+        audio = await _read_upload(file)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Upload Failed: {str(e)}")
+
+    async def events():
+        try:
+            async for stage, result in pipeline.analyse_audio_async(audio, pers_vec_1, pers_vec_2):
+                yield f"event: {stage}\ndata: {json.dumps(result)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            detail = {"detail": f"Analysis Failed: {str(e)}"}
+            yield f"event: error\ndata: {json.dumps(detail)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+# Live Conversation Scoring
+@app.post("/sessions", response_model=schemas.LiveSessionOutput)
+async def start_live_session(request: schemas.LiveSessionInput):
+    """
+    Opens a live scoring session for a conversation between two users.
+    """
+    for user_id in (request.user_1_id, request.user_2_id):
+        if PROFILE_STORE is None or user_id not in PROFILE_STORE:
+            raise HTTPException(status_code=404, detail=f"Unknown user: {user_id}")
+
+    session = sessions.start_session(PROFILE_STORE.get(request.user_1_id).tolist(), PROFILE_STORE.get(request.user_2_id).tolist())
+    return {"session_id": session.session_id}
+
+
+@app.post("/sessions/{session_id}/chunks", response_model=schemas.LiveScoreOutput)
+async def add_live_chunk(session_id: str, request: schemas.ChunkInput):
+    """
+    Adds the next transcript chunk to a live session and returns the updated compatibility scores.
+    """
+    session = sessions.get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Unknown session: {session_id}")
+    try:
+        return await session.add_chunk(request.text)
+    except admission.Overloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Live scoring failed: {str(e)}")
+
+
+@app.delete("/sessions/{session_id}", response_model=schemas.LiveScoreOutput)
+async def end_live_session(session_id: str):
+    """
+    Closes a live session, returning its final scores once any topic analysis in progress has finished.
+    """
+    session = sessions.end_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Unknown session: {session_id}")
+    return await session.flush()
+
+
+# Batch Transcription Jobs
+JOB_QUEUE = None
+JOB_POOL = None
+_job_lock = threading.Lock()
+
+def _get_job_queue(start_workers: bool = False) -> jobs.JobQueue:
+    """
+    Opens the job queue. On the first submission, also starts the worker pool if config.JOB_WORKERS > 0.
+    """
+    global JOB_QUEUE, JOB_POOL
+    with _job_lock:
+        if JOB_QUEUE is None:
+            JOB_QUEUE = jobs.JobQueue()
+        if start_workers and JOB_POOL is None and config.JOB_WORKERS > 0:
+            JOB_POOL = jobs.WorkerPool(config.JOB_WORKERS)
+            JOB_POOL.start()
+    return JOB_QUEUE
+
+
+@app.post("/jobs/transcribe", response_model=schemas.JobSubmissionOutput)
+async def submit_transcription_jobs(files: List[UploadFile] = File(...)):
+    """
+    Uploads one or more audio files and queues each for background transcription.
+    """
+    queue = await pipeline.run_in_executor(_get_job_queue, True)
+    os.makedirs(jobs.JOB_AUDIO_DIR, exist_ok=True)
+
+    job_ids = []
+    try:
+        for file in files:
+            audio_path = os.path.join(jobs.JOB_AUDIO_DIR, f"{uuid.uuid4().hex}_{os.path.basename(file.filename or 'audio')}")
+            with open(audio_path, "wb") as buffer:
+                await pipeline.run_in_executor(shutil.copyfileobj, file.file, buffer)
+            job_ids.append(queue.submit(audio_path, cleanup=True))
+        return {"job_ids": job_ids}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Job submission failed: {str(e)}")
+
+
+@app.get("/jobs/{job_id}", response_model=schemas.JobStatusOutput)
+async def job_status(job_id: str):
+    """
+    Returns the status of a transcription job: queued, running, done or failed.
+    """
+    job = _get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+
+@app.get("/jobs/{job_id}/result", response_model=schemas.TranscriptOutput)
+async def job_result(job_id: str):
+    """
+    Returns the transcript of a finished transcription job.
+    """
+    job = _get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    if job["status"] != jobs.DONE:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job['status']}")
+    return {"transcript": job["result"]}
+
+# Metrics
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Per-stage latency histograms, LLM fallbacks, cache hits and Whisper audio seconds in the Prometheus text format.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,145 @@
+# --- Top-K Candidate Retrieval --- #
+
+
+# Import Libraries
+import numpy as np
+
+from . import config
+from . import heuristics
+from . import metrics
+
+
+# Slack added to block bounds so floating point rounding can never prune a true top-k candidate
+BOUND_TOLERANCE = 1e-12
+
+
+def _trait_upper_bounds(query_vec: np.ndarray, lows: np.ndarray, highs: np.ndarray) -> np.ndarray:
+    """
+    Upper bound of the weighted psychometric score between one user and every block of candidates.
+    Every trait function is piecewise linear (or clipped linear) in the partner's score,
+    with breakpoints only where the partner's score equals a or 1-a.
+    So its maximum over [low, high] is found at one of those points or at the ends of the interval.
+    """
+    bound = 0
+    for i, trait in enumerate(heuristics.TRAITS):
+        a = query_vec[i]
+        lo, hi = lows[:, i], highs[:, i]
+        candidates = (lo, hi, np.clip(a, lo, hi), np.clip(1 - a, lo, hi))
+        trait_max = np.max([heuristics.TRAIT_SCORERS[trait](a, b) for b in candidates], axis=0)
+        bound = bound + trait_max * config.HEURISTIC_WEIGHTS[trait]
+    return bound
+
+
+class PsychometricIndex:
+    """
+    In-memory index of every user's psychometrics, used to find the best partners for one user.
+    Candidates are grouped into blocks of users with similar agreeableness and neuroticism (the two most heavily weighted traits),
+    and each block stores the per-trait min and max of its members.
+    At query time blocks are visited in order of their score upper bound, and the search stops once no remaining block can beat the current K-th best.
+    """
+
+    def __init__(self, user_ids: list[str], psychometrics, block_size: int = config.TOP_K_INDEX_BLOCK_SIZE, row_of: dict | None = None):
+        matrix = np.asarray(psychometrics)
+        if matrix.ndim != 2 or matrix.shape[1] != len(heuristics.TRAITS):
+            raise ValueError(f"Expected psychometrics of shape (N, {len(heuristics.TRAITS)}), got {matrix.shape}")
+        if len(user_ids) != matrix.shape[0]:
+            raise ValueError("user_ids and psychometrics must have the same length")
+
+        self.block_size = max(1, int(block_size))
+        self.user_ids = user_ids
+        self.row_of = row_of if row_of is not None else {user_id: row for row, user_id in enumerate(self.user_ids)}
+        self.psychometrics = matrix
+
+        # Sort candidates so each block covers a narrow range of the heaviest traits
+        agreeableness = heuristics.TRAITS.index("agreeableness")
+        neuroticism = heuristics.TRAITS.index("neuroticism")
+        n_bins = max(1, int(np.sqrt(max(1, matrix.shape[0] / self.block_size))))
+        coarse = np.minimum((matrix[:, agreeableness] * n_bins).astype(np.int64), n_bins - 1)
+        self.order = np.lexsort((matrix[:, neuroticism], coarse))
+
+        starts = np.arange(0, matrix.shape[0], self.block_size)
+        self.block_starts = starts
+        if matrix.shape[0]:
+            sorted_matrix = matrix[self.order]
+            self.block_lows = np.minimum.reduceat(sorted_matrix, starts, axis=0).astype(np.float64)
+            self.block_highs = np.maximum.reduceat(sorted_matrix, starts, axis=0).astype(np.float64)
+        else:
+            self.block_lows = np.empty((0, matrix.shape[1]))
+            self.block_highs = np.empty((0, matrix.shape[1]))
+
+    @classmethod
+    def from_profiles(cls, profiles: dict, block_size: int = config.TOP_K_INDEX_BLOCK_SIZE) -> "PsychometricIndex":
+        """
+        Builds the index from the dictionary returned by pipeline.load_user_profiles.
+        """
+        user_ids = list(profiles)
+        psychometrics = np.array([profiles[user_id]["psychometrics"] for user_id in user_ids], dtype=np.float64).reshape(-1, len(heuristics.TRAITS))
+        return cls(user_ids, psychometrics, block_size=block_size)
+
+    @classmethod
+    def from_store(cls, store, block_size: int = config.TOP_K_INDEX_BLOCK_SIZE) -> "PsychometricIndex":
+        """
+        Builds the index directly on a profile_store.ProfileStore, sharing its memory-mapped matrix without copying.
+        The id index is copied, so users appended to the store afterwards do not change the index.
+        If some users have been superseded by newer rows, only the latest rows are indexed (which does copy them).
+        """
+        if len(store) == len(store.ids):
+            return cls(list(store.ids), store.psychometrics, block_size=block_size, row_of=dict(store.row_of))
+
+        rows = store.live_rows()
+        return cls([store.ids[row] for row in rows], store.psychometrics[rows], block_size=block_size)
+
+    def __len__(self) -> int:
+        return self.psychometrics.shape[0]
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self.row_of
+
+    @metrics.timed("top_k")
+    def top_k(self, user_id: str, k: int) -> list[dict]:
+        """
+        Returns the k best partners for a user, ranked by the psychometric part of the heuristic score.
+        Each entry has the partner's id, their weighted score and the per-trait breakdown.
+        """
+        if user_id not in self:
+            raise KeyError(user_id)
+
+        query_row = self.row_of[user_id]
+        query_vec = np.asarray(self.psychometrics[query_row], dtype=np.float64)
+        k = min(int(k), len(self) - 1)
+        if k <= 0:
+            return []
+
+        bounds = _trait_upper_bounds(query_vec, self.block_lows, self.block_highs)
+        visit_order = np.argsort(-bounds, kind="stable")
+
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float64)
+
+        for block in visit_order:
+            # Stop once no remaining block can beat the current k-th best score
+            if len(best_scores) == k and bounds[block] + BOUND_TOLERANCE < best_scores.min():
+                break
+
+            start = self.block_starts[block]
+            rows = self.order[start:start + self.block_size]
+            rows = rows[rows != query_row]
+            if not len(rows):
+                continue
+
+            _, scores = heuristics.calculate_trait_score_matrix(query_vec, self.psychometrics[rows])
+
+            best_rows = np.concatenate([best_rows, rows])
+            best_scores = np.concatenate([best_scores, scores[0]])
+            if len(best_scores) > k:
+                keep = np.argpartition(-best_scores, k - 1)[:k]
+                best_rows, best_scores = best_rows[keep], best_scores[keep]
+
+        ranking = np.lexsort((best_rows, -best_scores))
+        best_rows = best_rows[ranking]
+
+        breakdown, scores = heuristics.calculate_trait_score_matrix(query_vec, self.psychometrics[best_rows])
+        return [{"user_id": self.user_ids[row],
+                 "score": float(scores[0, i]),
+                 "breakdown": {trait: float(breakdown[trait][0, i]) for trait in heuristics.TRAITS}}
+                for i, row in enumerate(best_rows)]
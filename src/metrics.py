@@ -0,0 +1,164 @@
+# --- Pipeline Metrics --- #
+# A minimal in-process metrics registry rendered in the Prometheus text format on /metrics.
+# Recording a value is a lock, a bisect and two additions, so it is cheap enough for every hot-path call.
+
+
+# Import Libraries
+import bisect
+import functools
+import inspect
+import threading
+import time
+
+# Upper bounds (seconds) of the latency histogram buckets; covers sub-millisecond scoring up to minutes of transcription
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _format_labels(label_names, label_values, extra=()) -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(label_names, label_values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """
+    A monotonically increasing count, optionally split by label values.
+    """
+
+    def __init__(self, name: str, documentation: str, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    """
+    A value that can go up and down, such as a queue depth.
+    """
+
+    def set(self, value: float, *label_values) -> None:
+        with self._lock:
+            self._values[label_values] = value
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    """
+    Distribution of observed values in fixed buckets, optionally split by label values.
+    """
+
+    def __init__(self, name: str, documentation: str, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values) -> int:
+        series = self._series.get(label_values)
+        return series[2] if series else 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (bucket_counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                    cumulative += bucket_count
+                    le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.label_names, label_values, [le])} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, label_values)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, label_values)} {count}")
+        return lines
+
+
+# Registry
+REGISTRY = []
+
+def _register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+def render() -> str:
+    """
+    Renders every registered metric in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Pipeline Metrics
+STAGE_DURATION = _register(Histogram("pipeline_stage_duration_seconds", "Time spent in each pipeline stage.", ["stage"]))
+HTTP_REQUEST_DURATION = _register(Histogram("http_request_duration_seconds", "End-to-end handler latency per endpoint.", ["method", "path", "status"]))
+LLM_FALLBACKS = _register(Counter("llm_fallbacks_total", "LLM topic analyses that fell back to the default [0.5]*5 vector.", ["reason"]))
+TOPIC_CACHE_REQUESTS = _register(Counter("topic_cache_requests_total", "Topic cache lookups by result.", ["result"]))
+TRAIT_CACHE_REQUESTS = _register(Counter("trait_cache_requests_total", "Per-pair trait score cache lookups by result.", ["result"]))
+WHISPER_AUDIO_SECONDS = _register(Counter("whisper_audio_seconds_total", "Seconds of audio processed by Whisper."))
+VAD_TRIMMED_SECONDS = _register(Counter("vad_trimmed_audio_seconds_total", "Seconds of silence dropped by voice activity detection before Whisper."))
+VAD_TRIMMED_FRACTION = _register(Histogram("vad_trimmed_fraction", "Fraction of each file's audio dropped as silence before Whisper.",
+                                           buckets=(0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)))
+
+ADMISSION_IN_FLIGHT = _register(Gauge("admission_in_flight", "Calls running in each admission-controlled stage.", ["stage"]))
+ADMISSION_QUEUE_DEPTH = _register(Gauge("admission_queue_depth", "Requests waiting for a slot in each admission-controlled stage.", ["stage"]))
+ADMISSION_WAIT = _register(Histogram("admission_wait_seconds", "Time queued requests waited for a slot.", ["stage"]))
+ADMISSION_REJECTIONS = _register(Counter("admission_rejections_total", "Requests rejected by admission control.", ["stage", "reason"]))
+COALESCED_REQUESTS = _register(Counter("coalesced_requests_total", "Requests served by an identical computation already in flight.", ["stage"]))
+
+
+def timed(stage: str):
+    """
+    Decorator recording the duration of every call to a sync or async function under the given stage label.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    STAGE_DURATION.observe(time.perf_counter() - start, stage)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                STAGE_DURATION.observe(time.perf_counter() - start, stage)
+        return wrapper
+    return decorator
@@ -1,21 +1,35 @@
 # --- Pipeline Architecture --- #
 
 # Import Libraries
-import whisper
+# Whisper, OpenAI and VADER are imported inside their loaders below, so importing this module stays cheap.
+import asyncio
+import contextlib
+import functools
+import hashlib
+import io
 import json
 import os
-from openai import OpenAI
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from transformers import pipeline as hf_pipeline
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 
+from . import admission
 from . import heuristics
 from . import config
+from . import cache
+from . import metrics
+from . import profile_store
+from . import topic_backends
+from . import vad
 
 # Define Absolute Paths
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 USER_PROFILES_PATH = os.path.join(PROJECT_ROOT, "data", "user_profiles.json")
+PROFILE_STORE_PATH = os.path.join(PROJECT_ROOT, "data", "profile_store")
 
 
 # Load User Profiles
@@ -40,27 +54,395 @@ def load_user_profiles(file_path: str = USER_PROFILES_PATH) -> dict:
         raise
 
 
+def load_profile_store(store_path: str = PROFILE_STORE_PATH, json_path: str = USER_PROFILES_PATH) -> profile_store.ProfileStore:
+    """
+    Opens the memory-mapped profile store, converting it from the JSON profiles the first time, and again whenever
+    the JSON has changed since. Raises ValueError if the JSON has changed but users were also appended to the store,
+    since rebuilding would lose them.
+    """
+    if not os.path.exists(os.path.join(store_path, profile_store.MATRIX_FILENAME)):
+        if not os.path.exists(json_path):
+            print(f"ERROR: No user profiles found at {json_path}")
+            raise FileNotFoundError(json_path)
+        return profile_store.convert_json_to_store(json_path, store_path)
+
+    if os.path.exists(json_path) and profile_store.is_stale(store_path, json_path):
+        source = profile_store.read_source(store_path)
+        if source is not None and len(profile_store.ProfileStore(store_path).ids) > source["rows"]:
+            raise ValueError(f"{json_path} has changed since {store_path} was built from it, and users have been appended to the store since. "
+                             f"Merge them into the JSON and rebuild it with: python -m src.profile_store convert {json_path} {store_path}")
+        print(f"{json_path} has changed since the profile store was built. Rebuilding it.")
+        return profile_store.convert_json_to_store(json_path, store_path)
+
+    store = profile_store.ProfileStore(store_path)
+    print(f"Profile store opened with {len(store)} users.")
+    return store
+
+
+# Lazy, Thread-safe Loading of Heavy Components
+def _lazy(loader):
+    """
+    Turns a loader function into a getter that runs the loader once, on first use.
+    Concurrent first calls block on a lock, so the component is never loaded twice.
+    """
+    lock = threading.Lock()
+    instance = []
+
+    @functools.wraps(loader)
+    def getter():
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(loader())
+        return instance[0]
+
+    getter.is_loaded = lambda: bool(instance)
+    return getter
+
+
+# Bounded Executor for CPU-bound Stages (Whisper, VADER) called from async handlers
+executor = ThreadPoolExecutor(max_workers=config.PIPELINE_MAX_WORKERS, thread_name_prefix="pipeline")
+
+async def run_in_executor(func, *args):
+    """
+    Runs a blocking pipeline function on the shared bounded executor.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args))
+
+
 # Transcription
+WHISPER_SAMPLE_RATE = 16000
 model_cache_dir = os.path.join(PROJECT_ROOT, "whisper_cache")
-print(f"Whisper model cache set to: {model_cache_dir}")
-model = whisper.load_model("base", download_root=model_cache_dir)
 
+def load_whisper_model(model_size: str = config.WHISPER_MODEL_SIZE,
+                       device: str = config.WHISPER_DEVICE,
+                       threads: int | None = config.WHISPER_THREADS,
+                       int8: bool = config.WHISPER_INT8_QUANTIZATION):
+    """
+    Loads a Whisper model of the given size on a device, optionally with int8 dynamic quantization of its linear layers.
+    The thread count is process wide: it applies to every model in the process.
+    """
+    import whisper
+
+    if int8 and device != "cpu":
+        raise ValueError("int8 dynamic quantization is only supported on the CPU")
+    if threads is not None:
+        import torch
+        torch.set_num_threads(threads)
+
+    print(f"Whisper model cache set to: {model_cache_dir}")
+    model = whisper.load_model(model_size, device=device, download_root=model_cache_dir)
+
+    if int8:
+        import torch
+        # Whisper's Linear only adds a dtype cast to nn.Linear, which quantize_dynamic does not recognise as a subclass
+        for module in model.modules():
+            if isinstance(module, whisper.model.Linear):
+                module.__class__ = torch.nn.Linear
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+@_lazy
+def get_whisper_model():
+    return load_whisper_model()
+
+
+def _transcribe_pcm(model, audio: np.ndarray, **kwargs):
+    """
+    Runs Whisper on a 16kHz float32 clip and returns (result, seconds of silence trimmed).
+    With config.VAD_ENABLED, long silences are dropped first and segment times are mapped back to the clip.
+    """
+    if not config.VAD_ENABLED:
+        metrics.WHISPER_AUDIO_SECONDS.inc(amount=len(audio) / WHISPER_SAMPLE_RATE)
+        return model.transcribe(audio, **kwargs), 0.0
 
-def transcribe_audio(audio_path: str) -> str:
+    speech = vad.detect_speech(audio, WHISPER_SAMPLE_RATE)
+    metrics.VAD_TRIMMED_SECONDS.inc(amount=speech.trimmed_seconds)
+    metrics.WHISPER_AUDIO_SECONDS.inc(amount=speech.voiced_samples / WHISPER_SAMPLE_RATE)
+    if not speech.regions:
+        return {"text": "", "segments": []}, speech.trimmed_seconds
 
-    result = model.transcribe(audio_path)
+    result = model.transcribe(speech.voiced(audio), **kwargs)
+    return {**result, "segments": speech.map_segments(result["segments"])}, speech.trimmed_seconds
+
+
+def _observe_trimmed_fraction(trimmed_seconds: float, total_seconds: float) -> None:
+    if config.VAD_ENABLED and total_seconds > 0:
+        metrics.VAD_TRIMMED_FRACTION.observe(trimmed_seconds / total_seconds)
+
+
+# Audio Decoding
+# Audio can be a file path, the bytes of an upload, or a binary file object (such as the spooled file behind an upload).
+# Bytes and file objects are piped into ffmpeg, so uploads are decoded without first being written to a file of our own.
+def _ffmpeg_pcm_command(source: str) -> list[str]:
+    return ["ffmpeg", "-nostdin", "-threads", "0", "-i", source,
+            "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(WHISPER_SAMPLE_RATE), "-"]
+
+
+def _ffmpeg_source(audio):
+    """
+    Returns (ffmpeg input, stdin, bytes to write to stdin) for audio.
+    File objects backed by a real file are handed to ffmpeg as its stdin, and any other file object is read into memory.
+    """
+    if isinstance(audio, str):
+        return audio, subprocess.DEVNULL, None
+    if not isinstance(audio, (bytes, bytearray, memoryview)):
+        audio.seek(0)
+        try:
+            audio.fileno()
+            return "pipe:0", audio, None
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            audio = audio.read()
+    return "pipe:0", subprocess.PIPE, bytes(audio)
+
+
+@contextlib.contextmanager
+def _audio_temp_file(audio):
+    """
+    Copies bytes or a file object to a uniquely named temporary file, for containers ffmpeg cannot decode from a pipe
+    (e.g. MP4 with its index at the end). The file is removed on exit.
+    """
+    fd, path = tempfile.mkstemp(prefix="audio_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if isinstance(audio, (bytes, bytearray, memoryview)):
+                f.write(audio)
+            else:
+                audio.seek(0)
+                shutil.copyfileobj(audio, f)
+        yield path
+    finally:
+        os.remove(path)
+
+
+def decode_audio(audio) -> np.ndarray:
+    """
+    Decodes audio into the 16kHz mono float32 array Whisper accepts.
+    """
+    if isinstance(audio, str):
+        import whisper
+        return whisper.load_audio(audio)
+
+    source, stdin, data = _ffmpeg_source(audio)
+    process = subprocess.run(_ffmpeg_pcm_command(source), stdin=None if data is not None else stdin, input=data, capture_output=True)
+    if process.returncode != 0:
+        with _audio_temp_file(audio) as path:
+            return decode_audio(path)
+    return np.frombuffer(process.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+@metrics.timed("transcribe")
+def transcribe_audio(audio) -> str:
+    """
+    Transcribes an audio file path, the bytes of an audio file, or a binary file object.
+    """
+    audio = decode_audio(audio)
+    result, trimmed_seconds = _transcribe_pcm(get_whisper_model(), audio)
+    _observe_trimmed_fraction(trimmed_seconds, len(audio) / WHISPER_SAMPLE_RATE)
     return result["text"]
 
 
+TRANSCRIPTIONS = admission.Coalescer("whisper")
+
+async def _transcribe_admitted(audio) -> str:
+    async with admission.LIMITERS["whisper"].slot():
+        return await run_in_executor(transcribe_audio, audio)
+
+
+async def transcribe_audio_async(audio) -> str:
+    """
+    Runs Whisper on the bounded pipeline executor so transcription does not block the event loop.
+    Concurrent uploads of the same bytes share one transcription, and admission control may raise admission.Overloaded.
+    """
+    if isinstance(audio, (bytes, bytearray)):
+        return await TRANSCRIPTIONS.run(hashlib.sha256(audio).hexdigest(), lambda: _transcribe_admitted(audio))
+    return await _transcribe_admitted(audio)
+
+
+# Streaming Transcription for Long Audio
+
+def _iter_pcm_windows(pcm_stream, window_seconds: float, overlap_seconds: float):
+    """
+    Reads 16kHz mono s16le PCM from a binary stream and yields (offset_seconds, float32 window, is_last).
+    Consecutive windows share overlap_seconds of audio. Only one window is held in memory at a time.
+    """
+    window_samples = int(window_seconds * WHISPER_SAMPLE_RATE)
+    overlap_samples = int(overlap_seconds * WHISPER_SAMPLE_RATE)
+    if not 0 <= overlap_samples < window_samples:
+        raise ValueError("overlap_seconds must be non-negative and shorter than window_seconds")
+
+    def read_samples(n_samples):
+        data = pcm_stream.read(n_samples * 2)
+        return np.frombuffer(data[:len(data) - len(data) % 2], dtype=np.int16).astype(np.float32) / 32768.0
+
+    window = read_samples(window_samples)
+    offset = 0
+    while True:
+        fresh = read_samples(window_samples - overlap_samples)
+        is_last = len(fresh) == 0
+        yield offset / WHISPER_SAMPLE_RATE, window, is_last
+        if is_last:
+            return
+
+        keep = window[len(window) - overlap_samples:] if overlap_samples else window[:0]
+        offset += len(window) - len(keep)
+        window = np.concatenate([keep, fresh])
+
+
+def _write_and_close(pipe, data: bytes) -> None:
+    try:
+        pipe.write(data)
+    except BrokenPipeError:
+        # ffmpeg stopped reading, e.g. it could not decode the input; its exit code reports why
+        pass
+    finally:
+        try:
+            pipe.close()
+        except BrokenPipeError:
+            pass
+
+
+def _iter_audio_windows(audio, window_seconds: float, overlap_seconds: float):
+    """
+    Decodes audio with ffmpeg as a stream, rather than loading the whole file like decode_audio.
+    """
+    source, stdin, data = _ffmpeg_source(audio)
+    process = subprocess.Popen(_ffmpeg_pcm_command(source), stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    if data is not None:
+        threading.Thread(target=_write_and_close, args=(process.stdin, data), daemon=True).start()
+
+    try:
+        windows = _iter_pcm_windows(process.stdout, window_seconds, overlap_seconds)
+        first = next(windows)
+        if not len(first[1]) and source == "pipe:0" and process.wait() != 0:
+            with _audio_temp_file(audio) as path:
+                yield from _iter_audio_windows(path, window_seconds, overlap_seconds)
+            return
+        yield first
+        yield from windows
+    finally:
+        process.stdout.close()
+        process.kill()
+        process.wait()
+
+
+def transcribe_audio_stream(audio,
+                            window_seconds: float = config.TRANSCRIBE_WINDOW_SECONDS,
+                            overlap_seconds: float = config.TRANSCRIBE_OVERLAP_SECONDS):
+    """
+    Transcribes audio window by window, yielding {"start", "end", "text"} segments as soon as each window is done.
+    Windows overlap, and segments are stitched by cutting at the middle of each overlap:
+    a segment belongs to the window in which it starts before the cut.
+    """
+    model = get_whisper_model()
+    cut = 0.0
+    previous_text = ""
+    total_seconds = trimmed_seconds = 0.0
+
+    try:
+        for offset, window, is_last in _iter_audio_windows(audio, window_seconds, overlap_seconds):
+            if not len(window):
+                return
+
+            # The tail of the previous window's text keeps Whisper's context across the boundary
+            start_time = time.perf_counter()
+            result, window_trimmed = _transcribe_pcm(model, window, initial_prompt=previous_text[-200:] or None)
+            metrics.STAGE_DURATION.observe(time.perf_counter() - start_time, "transcribe_window")
+
+            window_end = offset + len(window) / WHISPER_SAMPLE_RATE
+            next_cut = window_end if is_last else window_end - overlap_seconds / 2
+
+            # Both include the overlaps, which Whisper also processes twice
+            total_seconds += len(window) / WHISPER_SAMPLE_RATE
+            trimmed_seconds += window_trimmed
+
+            for segment in result["segments"]:
+                start = offset + segment["start"]
+                if start < cut or start >= next_cut:
+                    continue
+                previous_text += segment["text"]
+                yield {"start": start, "end": min(offset + segment["end"], window_end), "text": segment["text"]}
+
+            cut = next_cut
+    finally:
+        _observe_trimmed_fraction(trimmed_seconds, total_seconds)
+
+
+async def transcribe_audio_stream_async(audio):
+    """
+    Async iterator over transcribe_audio_stream, running each window on the bounded pipeline executor.
+    It holds a Whisper admission slot until the stream ends.
+    """
+    segments = transcribe_audio_stream(audio)
+    done = object()
+    try:
+        async with admission.LIMITERS["whisper"].slot():
+            while True:
+                segment = await run_in_executor(next, segments, done)
+                if segment is done:
+                    return
+                yield segment
+    finally:
+        try:
+            segments.close()
+        except ValueError:
+            # Still running on the executor after the client disconnected; it finishes its current window and is collected
+            pass
+
+
 
 # Extract Topics and get Vector Representation:
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+@_lazy
+def get_openai_client():
+    from openai import OpenAI
+    return OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
 
-def get_topics_and_vectors(transcript: str):
+@_lazy
+def get_async_openai_client():
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+
+# Persistent cache of valid LLM analyses, so the same transcript is only sent to the LLM once
+TOPIC_CACHE_PATH = os.path.join(PROJECT_ROOT, "cache", config.TOPIC_CACHE_FILENAME)
+
+@_lazy
+def get_topic_cache():
+    if not config.TOPIC_CACHE_ENABLED:
+        return None
+    return cache.TopicCache(TOPIC_CACHE_PATH, max_entries=config.TOPIC_CACHE_MAX_ENTRIES, ttl_seconds=config.TOPIC_CACHE_TTL_SECONDS)
+
+TOPIC_FALLBACK = (["blank topic"], [0.5] * 5, 0.0)
+
+
+# Topic Analysis Backends: "openai" (below) or one of the local backends in topic_backends.BACKENDS, set by config.TOPIC_BACKEND
+def topic_model_name() -> str:
     """
-    This uses an LLM to extract the 5 main, high-level topics from the transcript,
-    and then score those 5 topics against the 5 personality traits.
-    It also analyses social cues (like style, and seniment) to esitmate conversational engagement level.
+    The model behind the selected backend, which is part of every topic cache key so backends never share results.
+    """
+    if config.TOPIC_BACKEND == "openai":
+        return config.LLM_MODEL_NAME
+    return topic_backends.BACKENDS[config.TOPIC_BACKEND].model_name()
+
+@_lazy
+def get_topic_backend():
+    if config.TOPIC_BACKEND == "openai":
+        return None
+    return topic_backends.BACKENDS[config.TOPIC_BACKEND]()
+
+
+def _local_topics(transcript: str, cache_key: str):
+    """
+    Runs the selected local backend, caching its result like a valid LLM result.
+    """
+    topics, topic_vector, engagement_score = get_topic_backend().analyse(transcript)
+    return _accept_topic_result({"topics": topics, "topic_vector": topic_vector, "engagement_score": engagement_score}, cache_key)
+
+
+def _build_topic_messages(transcript: str) -> list[dict]:
+    """
+    Builds the chat messages for the multi-stage topic, trait and engagement analysis.
     """
     prompt = f"""
     You are a multi-stage analysis tool for the transcipt:
@@ -80,52 +462,380 @@ def get_topics_and_vectors(transcript: str):
     3. "engagement_score": A float (0.0 - 1.0).
     """
 
-    try:
-        response = client.chat.completions.create(model = config.LLM_MODEL_NAME,
-                                                  response_format = {"type": "json_object"},
-                                                  messages = [{"role": "system", "content": "You are a helpful assistant that returns ONLY valid JSON."},
-                                                              {"role": "user", "content": prompt}],
-                                                  temperature = 0.1)
-        
-        result_data = json.loads(response.choices[0].message.content)
+    return [{"role": "system", "content": "You are a helpful assistant that returns ONLY valid JSON."},
+            {"role": "user", "content": prompt}]
+
+
+def _cached_topics(cache_key: str):
+    topic_cache = get_topic_cache()
+    if topic_cache is None:
+        return None
+    cached = topic_cache.get(cache_key)
+    metrics.TOPIC_CACHE_REQUESTS.inc("miss" if cached is None else "hit")
+    if cached is None:
+        return None
+    return cached["topics"], cached["topic_vector"], cached["engagement_score"]
 
-        if (isinstance(result_data, dict) and 
+
+def _is_valid_topic_result(result_data) -> bool:
+    return (isinstance(result_data, dict) and 
             "topics" in result_data and "topic_vector" in result_data and "engagement_score" in result_data and
             isinstance(result_data["topics"], list) and len(result_data["topics"]) == 5 and
             isinstance(result_data["topic_vector"], list) and len(result_data["topic_vector"]) == 5 and
-            isinstance(result_data["engagement_score"], float)):
-
-            print(f"LLM-generated topics: {result_data['topics']}")
-            print(f"LLM-generated vector: {result_data['topic_vector']}")
-            print(f"LLM-generated engagement: {result_data['engagement_score']}")
-            return result_data["topics"], result_data["topic_vector"], result_data["engagement_score"]
-        else:
-            print(f"Warning: LLM output invalid: {result_data}. Falling back to defaults.")
-            return ["blank topic"], [0.5] * 5, 0.0
+            isinstance(result_data["engagement_score"], float))
+
+
+def _accept_topic_result(result_data: dict, cache_key: str):
+    """
+    Caches a validated LLM result and returns it as (topics, topic_vector, engagement_score).
+    """
+    print(f"LLM-generated topics: {result_data['topics']}")
+    print(f"LLM-generated vector: {result_data['topic_vector']}")
+    print(f"LLM-generated engagement: {result_data['engagement_score']}")
+
+    topic_cache = get_topic_cache()
+    if topic_cache is not None:
+        topic_cache.set(cache_key, {"topics": result_data["topics"],
+                                    "topic_vector": result_data["topic_vector"],
+                                    "engagement_score": result_data["engagement_score"]})
+    return result_data["topics"], result_data["topic_vector"], result_data["engagement_score"]
+
+
+def _parse_topic_response(content: str, cache_key: str):
+    """
+    Validates the LLM's JSON output. Valid results are cached and returned; invalid ones fall back to defaults.
+    """
+    result_data = json.loads(content)
+
+    if _is_valid_topic_result(result_data):
+        return _accept_topic_result(result_data, cache_key)
+    else:
+        print(f"Warning: LLM output invalid: {result_data}. Falling back to defaults.")
+        metrics.LLM_FALLBACKS.inc("invalid_output")
+        return TOPIC_FALLBACK
+
+
+@metrics.timed("llm_topics")
+def get_topics_and_vectors(transcript: str):
+    """
+    This uses an LLM to extract the 5 main, high-level topics from the transcript,
+    and then score those 5 topics against the 5 personality traits.
+    It also analyses social cues (like style, and seniment) to esitmate conversational engagement level.
+    Valid results are cached by transcript content; fallbacks are not.
+    """
+    cache_key = cache.make_cache_key(transcript, topic_model_name(), config.TOPIC_PROMPT_VERSION)
+    cached = _cached_topics(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        if config.TOPIC_BACKEND != "openai":
+            return _local_topics(transcript, cache_key)
+
+        response = get_openai_client().chat.completions.create(model = config.LLM_MODEL_NAME,
+                                                  response_format = {"type": "json_object"},
+                                                  messages = _build_topic_messages(transcript),
+                                                  temperature = 0.1)
+        
+        return _parse_topic_response(response.choices[0].message.content, cache_key)
         
     except Exception as e:
         print(f"Error: {e}. Falling back to defaults.")
-        return ["blank topic"], [0.5] * 5, 0.0
+        metrics.LLM_FALLBACKS.inc("error")
+        return TOPIC_FALLBACK
+
+
+TOPIC_REQUESTS = admission.Coalescer("llm")
+
+@metrics.timed("llm_topics")
+async def get_topics_and_vectors_async(transcript: str, admit: bool = True):
+    """
+    Non-blocking version of get_topics_and_vectors using the AsyncOpenAI client, or the bounded executor for local backends.
+    Concurrent requests for the same transcript share one LLM call. API requests go through the llm admission limiter,
+    which may raise admission.Overloaded; offline callers pass admit=False and bound their own concurrency instead.
+    """
+    cache_key = cache.make_cache_key(transcript, topic_model_name(), config.TOPIC_PROMPT_VERSION)
+    cached = _cached_topics(cache_key)
+    if cached is not None:
+        return cached
+
+    # Admitted and offline calls are not coalesced with each other, so an offline call never inherits an API rejection
+    return await TOPIC_REQUESTS.run((cache_key, admit), lambda: _fetch_topics_async(transcript, cache_key, admit))
+
+
+async def _fetch_topics_async(transcript: str, cache_key: str, admit: bool):
+    async with admission.LIMITERS["llm"].slot() if admit else contextlib.nullcontext():
+        try:
+            if config.TOPIC_BACKEND != "openai":
+                return await run_in_executor(_local_topics, transcript, cache_key)
+
+            response = await get_async_openai_client().chat.completions.create(model = config.LLM_MODEL_NAME,
+                                                                  response_format = {"type": "json_object"},
+                                                                  messages = _build_topic_messages(transcript),
+                                                                  temperature = 0.1)
+
+            return _parse_topic_response(response.choices[0].message.content, cache_key)
+
+        except Exception as e:
+            print(f"Error: {e}. Falling back to defaults.")
+            metrics.LLM_FALLBACKS.inc("error")
+            return TOPIC_FALLBACK
     
 
+# Batched Topic Analysis for Backfills
+class AsyncRateLimiter:
+    """
+    Spaces out request starts so no more than requests_per_minute are sent.
+    """
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def _build_packed_topic_messages(transcripts: list[str]) -> list[dict]:
+    """
+    Builds one request asking for the same analysis as _build_topic_messages for several transcripts at once,
+    so the instructions are only sent once per pack.
+    """
+    packed = "\n\n".join(f"<<<TRANSCRIPT {i}>>>\n{transcript}\n<<<END TRANSCRIPT {i}>>>" for i, transcript in enumerate(transcripts))
+    prompt = f"""
+    You are a multi-stage analysis tool. Analyse EACH of the {len(transcripts)} transcripts below independently:
+    {packed}
+
+    For each transcript: first, identify the 5 most important topics of themes. Do not just include simple keywords; find abstract concepts as well.
+
+    Second, based ONLY on those 5 topics, analyse their association with with these 5 personality traits: [openness, conscientiousness, extraversion, agreeableness, neuroticism].
+
+    Finally, based on the transcripts's interactivity (e.g. questions, short responses, turn-taking) and emotional expression, estimate the overall engagement level of the participants as a single flotat between 0.0 (disengaged, bored) and 1.0 (highly engaged, animated).
+
+    You MUST return ONLY a valid JSON object with one key, "results": a list of {len(transcripts)} objects in the same order as the transcripts, each with the keys:
+    1. "id": The transcript number.
+    2. "topics": A list of 5 topic strings.
+    3. "topic_vector": A list of 5 floats (0.00 - 1.00) representing the score for each personality trait in the given order.
+    4. "engagement_score": A float (0.0 - 1.0).
+    """
+
+    return [{"role": "system", "content": "You are a helpful assistant that returns ONLY valid JSON."},
+            {"role": "user", "content": prompt}]
+
+
+async def _analyse_pack(transcripts: list[str], cache_keys: list[str], limiter: AsyncRateLimiter, semaphore: asyncio.Semaphore) -> list:
+    """
+    Sends one packed request and validates each transcript's result separately.
+    Returns a result tuple per transcript, or None where the pack's output for it was missing or invalid.
+    """
+    async with semaphore:
+        await limiter.wait()
+        try:
+            response = await get_async_openai_client().chat.completions.create(model = config.LLM_MODEL_NAME,
+                                                                  response_format = {"type": "json_object"},
+                                                                  messages = _build_packed_topic_messages(transcripts),
+                                                                  temperature = 0.1)
+            results = json.loads(response.choices[0].message.content)["results"]
+        except Exception as e:
+            print(f"Error: packed LLM request failed ({e}).")
+            return [None] * len(transcripts)
+
+    by_id = {result.get("id"): result for result in results if isinstance(result, dict)}
+    parsed = []
+    for i, cache_key in enumerate(cache_keys):
+        result_data = by_id.get(i)
+        parsed.append(_accept_topic_result(result_data, cache_key) if _is_valid_topic_result(result_data) else None)
+    return parsed
+
+
+async def get_topics_and_vectors_batch_async(transcripts: list[str],
+                                             pack_size: int = config.LLM_BATCH_PACK_SIZE,
+                                             max_concurrency: int = config.LLM_BATCH_MAX_CONCURRENCY,
+                                             requests_per_minute: float = config.LLM_BATCH_REQUESTS_PER_MINUTE) -> list:
+    """
+    Analyses many transcripts, returning one (topics, topic_vector, engagement_score) per transcript in input order.
+    Cached transcripts are skipped; the rest are packed pack_size to a request, and packs are sent concurrently under a rate limit.
+    Any transcript whose packed result fails validation is retried on its own, and falls back to defaults if that fails too.
+    Local backends have no requests to pack, so each transcript is simply analysed on the executor, max_concurrency at a time.
+    Backfills bound their own concurrency, so they bypass the API's admission limiter.
+    """
+    if config.TOPIC_BACKEND != "openai":
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def analyse_alone(transcript):
+            async with semaphore:
+                return await get_topics_and_vectors_async(transcript, admit=False)
+
+        return list(await asyncio.gather(*(analyse_alone(transcript) for transcript in transcripts)))
+
+    results = [None] * len(transcripts)
+    pending = []
+    for i, transcript in enumerate(transcripts):
+        cache_key = cache.make_cache_key(transcript, topic_model_name(), config.TOPIC_PROMPT_VERSION)
+        results[i] = _cached_topics(cache_key)
+        if results[i] is None:
+            pending.append((i, cache_key))
+
+    limiter = AsyncRateLimiter(requests_per_minute)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    packs = [pending[start:start + pack_size] for start in range(0, len(pending), max(1, pack_size))]
+
+    pack_results = await asyncio.gather(*(_analyse_pack([transcripts[i] for i, _ in pack], [key for _, key in pack], limiter, semaphore)
+                                          for pack in packs))
+
+    async def retry_alone(i):
+        async with semaphore:
+            await limiter.wait()
+            results[i] = await get_topics_and_vectors_async(transcripts[i], admit=False)
+
+    retries = []
+    for pack, parsed in zip(packs, pack_results):
+        for (i, _), result in zip(pack, parsed):
+            if result is None:
+                retries.append(retry_alone(i))
+            else:
+                results[i] = result
+    await asyncio.gather(*retries)
+
+    return results
+
+
+def get_topics_and_vectors_batch(transcripts: list[str], **kwargs) -> list:
+    """
+    Blocking entry point to get_topics_and_vectors_batch_async, for scripts such as nightly backfills.
+    """
+    return asyncio.run(get_topics_and_vectors_batch_async(transcripts, **kwargs))
+
+
 # Second Sentiment Analysis Source
-vader_analyzer = SentimentIntensityAnalyzer()
+@_lazy
+def get_vader_analyzer():
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+    return SentimentIntensityAnalyzer()
 
+@metrics.timed("vader")
 def get_vader_sentiment(transcript: str) -> float:
-    scores = vader_analyzer.polarity_scores(transcript)
+    scores = get_vader_analyzer().polarity_scores(transcript)
     return scores['compound']
 
 
+async def get_vader_sentiment_async(transcript: str) -> float:
+    """
+    Runs VADER on the bounded pipeline executor so long transcripts do not block the event loop.
+    """
+    return await run_in_executor(get_vader_sentiment, transcript)
+
+
+# Full Transcript Analysis, Shared across /summarise and /match
+class UnknownAnalysisError(KeyError):
+    """Raised when an analysis_id is not (or no longer) in the analysis store and no transcript was given."""
+
+@_lazy
+def get_analysis_store():
+    spill = None
+    if config.ANALYSIS_STORE_SPILL:
+        spill = cache.TopicCache(os.path.join(PROJECT_ROOT, "cache", config.ANALYSIS_STORE_SPILL_FILENAME), max_entries=config.TOPIC_CACHE_MAX_ENTRIES)
+    return cache.AnalysisStore(max_entries=config.ANALYSIS_STORE_MAX_ENTRIES, spill=spill)
+
+
+async def analyse_transcript_async(transcript: str | None = None, analysis_id: str | None = None) -> dict:
+    """
+    Returns {"analysis_id", "topics", "analysis_results"} for a transcript, where analysis_results holds the
+    topic vector, engagement, VADER score and word count used by the scorers.
+    A known analysis_id is reused without recomputing anything. Otherwise the LLM and VADER run concurrently on the
+    transcript and the result is stored under a hash of it, which becomes its analysis_id.
+    Raises UnknownAnalysisError if only an unknown (or evicted) analysis_id is given.
+    """
+    store = get_analysis_store()
+    if analysis_id is not None:
+        entry = store.get(analysis_id)
+        if entry is not None:
+            return entry
+        if transcript is None:
+            raise UnknownAnalysisError(analysis_id)
+
+    key = cache.make_cache_key(transcript, topic_model_name(), config.TOPIC_PROMPT_VERSION)
+    entry = store.get(key)
+    # Fallback analyses are handed out but never reused for a new request, so a later LLM call can replace them
+    if entry is not None and not entry["fallback"]:
+        return entry
+
+    topic_result, vader_compound_score = await asyncio.gather(
+        get_topics_and_vectors_async(transcript), # Set config.TOPIC_BACKEND to "local" or "mock" while the API calls are down
+        get_vader_sentiment_async(transcript))
+
+    return _store_analysis(key, transcript, topic_result, vader_compound_score)
+
+
+def _store_analysis(key: str, transcript: str, topic_result, vader_compound_score: float) -> dict:
+    topics, topic_vec, engagement_score = topic_result
+    entry = {"analysis_id": key,
+             "topics": topics,
+             "fallback": (topics, topic_vec, engagement_score) == TOPIC_FALLBACK,
+             "analysis_results": {"topic_vector": topic_vec,
+                                  "engagement_score": engagement_score,
+                                  "vader_engagement": vader_compound_score,
+                                  "word_count": len(transcript.split())}}
+    get_analysis_store().set(key, entry)
+    return entry
+
+
+async def analyse_audio_async(audio, pers_vec_1: list[float], pers_vec_2: list[float]):
+    """
+    Runs the whole pipeline for one conversation, from audio to both compatibility scores, and yields (stage, result)
+    pairs as each stage finishes: "transcript" first, then "topics", "baseline_score" and "sentiment" as they become
+    available, and "heuristic_score" last.
+    The LLM and VADER run concurrently, fusion and the baseline score only wait for the LLM, and the analysis is stored
+    so its analysis_id can be reused by /match.
+    """
+    transcript = await transcribe_audio_async(audio)
+    yield "transcript", {"transcript": transcript}
+
+    def baseline_score(topic_vec):
+        return heuristics.baseline_compatibility_score(fuse_vectors(pers_vec_1, topic_vec), fuse_vectors(pers_vec_2, topic_vec))
+
+    key = cache.make_cache_key(transcript, topic_model_name(), config.TOPIC_PROMPT_VERSION)
+    entry = get_analysis_store().get(key)
+
+    if entry is not None and not entry["fallback"]:
+        yield "topics", {"topics": entry["topics"], "analysis_id": key}
+        yield "baseline_score", baseline_score(entry["analysis_results"]["topic_vector"])
+        yield "sentiment", {"vader_engagement": entry["analysis_results"]["vader_engagement"]}
+    else:
+        topics_task = asyncio.ensure_future(get_topics_and_vectors_async(transcript))
+        vader_task = asyncio.ensure_future(get_vader_sentiment_async(transcript))
+        pending = {topics_task, vader_task}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                if topics_task in done:
+                    yield "topics", {"topics": topics_task.result()[0], "analysis_id": key}
+                    yield "baseline_score", baseline_score(topics_task.result()[1])
+                if vader_task in done:
+                    yield "sentiment", {"vader_engagement": vader_task.result()}
+        finally:
+            # The client may disconnect mid-stream
+            for task in pending:
+                task.cancel()
+        entry = _store_analysis(key, transcript, topics_task.result(), vader_task.result())
+
+    yield "heuristic_score", heuristic_compatibility_score(pers_vec_1, pers_vec_2, entry["analysis_results"])
+
+
 # Mock function to handle OPENAI API quota exceeding
 def get_topics_and_vectors_mock(transcript: str):
     """
     Temporary mock function for testing when
-    running out of API calls...
+    running out of API calls... Set config.TOPIC_BACKEND = "mock" to use it everywhere instead.
     """
     print(" USING TEMPORARY HIGH-QUALITY MOCK DATA ")
-    mock_topics = ["Mars Colonisation Logistics", "Future of Humanity", "Civilisation and Risk", "Population Collapse", "Extending Consciousness"]
-    mock_vector = [0.9, 0.7, 0.3, 0.4, 0.6]
-    mock_engagement = 0.5
+    mock_topics, mock_vector, mock_engagement = topic_backends.MockTopicBackend().analyse(transcript)
 
     print(f"Mock topics: {mock_topics}")
     print(f"MOck vector: {mock_vector}")
@@ -136,10 +846,12 @@ def get_topics_and_vectors_mock(transcript: str):
 
 
 # Fuse Topic and Personality Vectors:
+@metrics.timed("fusion")
 def fuse_vectors(personality_vec: list[float], topic_vec: list[float], personality_weight: float = config.FUSION_PERSONALITY_WEIGHT) -> np.ndarray:
     """
     Fuses the personality vector and topic vector using a weighted average.
     This fused vector represents a persons personality in the context of the specific conversation.
+    An (R,5) matrix of personality vectors is fused row by row, giving R fused vectors at once.
     """
 
     topic_weight = 1 - personality_weight
@@ -155,9 +867,56 @@ def fuse_vectors(personality_vec: list[float], topic_vec: list[float], personali
 
 
 # Heuristic Compatibility Score
+@metrics.timed("heuristic_score")
 def heuristic_compatibility_score(pers_vec_1: list[float], pers_vec_2: list[float], analysis_results: dict) -> dict:
     '''
     Scores two users compatibility given their personality vectors, and the dictionary contianing topic vector and engagement.
     '''
 
     return heuristics.calculate_heuristic_score(pers_vec_1, pers_vec_2, analysis_results)
+
+
+# Many Pairs Scored Against One Conversation
+@metrics.timed("batch_match")
+def match_pairs(pers_mat_1, pers_mat_2, analysis_results: dict) -> list[dict]:
+    """
+    Baseline and heuristic scores for row i of pers_mat_1 with row i of pers_mat_2, for every row, in the same form as /match.
+    The topic vector is fused with all pairs, and both scores are computed, in single vectorized passes.
+    """
+    pers_mat_1 = np.asarray(pers_mat_1, dtype=np.float64)
+    pers_mat_2 = np.asarray(pers_mat_2, dtype=np.float64)
+    topic_vec = analysis_results["topic_vector"]
+
+    baseline = heuristics.baseline_compatibility_scores(fuse_vectors(pers_mat_1, topic_vec), fuse_vectors(pers_mat_2, topic_vec))
+    heuristic = heuristics.calculate_heuristic_score_pairs(pers_mat_1, pers_mat_2, [topic_vec], analysis_results["engagement_score"],
+                                                           analysis_results["vader_engagement"], analysis_results["word_count"])
+
+    results = []
+    for i in range(len(pers_mat_1)):
+        final_score = float(heuristic["match_score"][i])
+        scores = {trait: float(heuristic["breakdown"][trait][i]) for trait in heuristics.TRAITS}
+        explanation = heuristics.explain_heuristic_score(final_score, float(heuristic["topic_interest"][i]), float(heuristic["social_cue_bonus"][i]),
+                                                         float(heuristic["length_bonus"][i]), scores)
+        score = float(baseline[i])
+        results.append({"baseline_score": {"score": score, "interpretation": heuristics.interpret_baseline_score(score)},
+                        "heuristic_score": {"match_score": final_score, "explanation": explanation}})
+    return results
+
+
+
+# Optional Warm-up, e.g. from the FastAPI lifespan event
+COMPONENT_LOADERS = {"whisper": get_whisper_model,
+                     "openai": get_openai_client,
+                     "openai_async": get_async_openai_client,
+                     "vader": get_vader_analyzer,
+                     "topic_cache": get_topic_cache,
+                     "topic_backend": get_topic_backend}
+
+def warm_up(components=None) -> None:
+    """
+    Loads the named heavy components now rather than on the first request that needs them.
+    Loads every component if none are given.
+    """
+    for name in (components if components is not None else COMPONENT_LOADERS):
+        COMPONENT_LOADERS[name]()
+        print(f"Warmed up: {name}")
@@ -0,0 +1,205 @@
+# --- Columnar Profile Store --- #
+# A compact on-disk store of user psychometrics, replacing the JSON list for large populations:
+#   psychometrics.f32 - a contiguous little-endian float32 (N,5) matrix, memory-mapped read-only
+#   ids.txt           - one user id per line, row i of the matrix belongs to line i
+#   source.json       - the size, modification time and hash of the JSON file the store was converted from
+# Both data files are only ever appended to, so adding users never rewrites existing data.
+# Appending an id that already exists adds a new row that supersedes the old one.
+#
+# Usage: python -m src.profile_store convert data/user_profiles.json data/profile_store
+
+
+# Import Libraries
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+N_TRAITS = 5
+ROW_BYTES = N_TRAITS * 4
+MATRIX_FILENAME = "psychometrics.f32"
+IDS_FILENAME = "ids.txt"
+SOURCE_FILENAME = "source.json"
+
+
+class ProfileStore:
+    """
+    Memory-mapped psychometrics for every user, with an id to row index.
+    Rows are returned as views into the mapped file, so reading profiles does not copy them into Python objects.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._matrix_path = os.path.join(path, MATRIX_FILENAME)
+        self._ids_path = os.path.join(path, IDS_FILENAME)
+        if not os.path.exists(self._matrix_path) or not os.path.exists(self._ids_path):
+            raise FileNotFoundError(f"No profile store found at {path}")
+        self._load()
+
+    @classmethod
+    def create(cls, path: str) -> "ProfileStore":
+        """
+        Creates an empty store, or opens the existing one at path.
+        """
+        os.makedirs(path, exist_ok=True)
+        for filename in (MATRIX_FILENAME, IDS_FILENAME):
+            open(os.path.join(path, filename), "ab").close()
+        return cls(path)
+
+    def _load(self) -> None:
+        with open(self._ids_path, "r", encoding="utf-8", newline="\n") as f:
+            content = f.read()
+
+        # A crash mid-append can leave a partial last id, or matrix rows without ids; only complete rows are used
+        ids = content.split("\n")[:-1]
+        n_rows = min(len(ids), os.path.getsize(self._matrix_path) // ROW_BYTES)
+        self.ids = ids[:n_rows]
+        self.row_of = {user_id: row for row, user_id in enumerate(self.ids)}
+        self._map()
+
+    def _map(self) -> None:
+        if self.ids:
+            self.psychometrics = np.memmap(self._matrix_path, dtype="<f4", mode="r", shape=(len(self.ids), N_TRAITS))
+        else:
+            self.psychometrics = np.empty((0, N_TRAITS), dtype="<f4")
+
+    def __len__(self) -> int:
+        """
+        Number of distinct users.
+        """
+        return len(self.row_of)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self.row_of
+
+    def get(self, user_id: str) -> np.ndarray:
+        """
+        The psychometrics of one user, as a read-only float32 view into the mapped file.
+        """
+        return self.psychometrics[self.row_of[user_id]]
+
+    def get_many(self, user_ids: list[str]) -> np.ndarray:
+        """
+        The psychometrics of several users, as an (N,5) float32 copy in the order given.
+        """
+        return self.psychometrics[[self.row_of[user_id] for user_id in user_ids]].reshape(-1, N_TRAITS)
+
+    def live_rows(self) -> np.ndarray:
+        """
+        The latest row of every user, in order of first appearance.
+        """
+        return np.fromiter(self.row_of.values(), dtype=np.int64, count=len(self.row_of))
+
+    def append(self, user_ids: list[str], psychometrics) -> None:
+        """
+        Appends users to the end of the store without rewriting it. Existing ids are superseded by their new rows.
+        """
+        matrix = np.ascontiguousarray(psychometrics, dtype="<f4").reshape(-1, N_TRAITS)
+        if len(user_ids) != len(matrix):
+            raise ValueError("user_ids and psychometrics must have the same length")
+        if any("\n" in user_id for user_id in user_ids):
+            raise ValueError("User ids cannot contain newlines")
+
+        # Drop anything left by an earlier crashed append, so new rows stay aligned with their ids
+        ids_bytes = sum(len(user_id.encode("utf-8")) + 1 for user_id in self.ids)
+        for file_path, size in ((self._matrix_path, len(self.ids) * ROW_BYTES), (self._ids_path, ids_bytes)):
+            if os.path.getsize(file_path) != size:
+                with open(file_path, "r+b") as f:
+                    f.truncate(size)
+
+        with open(self._matrix_path, "ab") as f:
+            f.write(matrix.tobytes())
+        with open(self._ids_path, "a", encoding="utf-8", newline="\n") as f:
+            f.writelines(f"{user_id}\n" for user_id in user_ids)
+
+        for user_id in user_ids:
+            self.row_of[user_id] = len(self.ids)
+            self.ids.append(user_id)
+        self._map()
+
+
+def _file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_source(store_path: str) -> dict | None:
+    """
+    What the store was converted from: {"mtime_ns", "size", "sha256", "rows"}, or None if that was not recorded.
+    """
+    try:
+        with open(os.path.join(store_path, SOURCE_FILENAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def is_stale(store_path: str, json_path: str) -> bool:
+    """
+    Whether the JSON file has changed since the store was converted from it. Only a changed size or modification time
+    makes the file be hashed, so an unchanged file costs one stat.
+    """
+    source = read_source(store_path)
+    if source is None:
+        return True
+    stat = os.stat(json_path)
+    if (stat.st_mtime_ns, stat.st_size) == (source["mtime_ns"], source["size"]):
+        return False
+    return _file_sha256(json_path) != source["sha256"]
+
+
+def convert_json_to_store(json_path: str, store_path: str, chunk_size: int = 100_000) -> ProfileStore:
+    """
+    Converts a user_profiles.json list of {"id", "psychometrics"} into a profile store, appending in chunks.
+    Any existing store at store_path is replaced. Processes that already have it open keep reading the old files.
+    """
+    stat = os.stat(json_path)
+    source = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": _file_sha256(json_path)}
+    with open(json_path, "r") as f:
+        profiles_list = json.load(f)
+
+    # Built next to the store, then moved into place file by file; the source is written last, so a crash part way
+    # through leaves a store that is rebuilt on the next start
+    os.makedirs(store_path, exist_ok=True)
+    build_path = tempfile.mkdtemp(prefix=".build-", dir=store_path)
+    try:
+        store = ProfileStore.create(build_path)
+        for start in range(0, len(profiles_list), chunk_size):
+            chunk = profiles_list[start:start + chunk_size]
+            store.append([user["id"] for user in chunk], [user["psychometrics"] for user in chunk])
+        source["rows"] = len(store.ids)
+
+        for filename in (MATRIX_FILENAME, IDS_FILENAME):
+            os.replace(os.path.join(build_path, filename), os.path.join(store_path, filename))
+    finally:
+        shutil.rmtree(build_path, ignore_errors=True)
+    temp_path = os.path.join(store_path, SOURCE_FILENAME + ".tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(source, f)
+    os.replace(temp_path, os.path.join(store_path, SOURCE_FILENAME))
+
+    print(f"Converted {len(profiles_list)} profiles from {json_path} to {store_path}.")
+    return ProfileStore(store_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar profile store tools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    convert = subparsers.add_parser("convert", help="Convert a user_profiles.json file into a profile store.")
+    convert.add_argument("json_path")
+    convert.add_argument("store_path")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        convert_json_to_store(args.json_path, args.store_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# --- Per-request Profiling --- #
+# Profiles single API requests on demand, to see why one /match or /transcribe call is slow without redeploying.
+# Enable it with config.PROFILING_ENABLED, then send a request with an "X-Profile: <config.PROFILING_TOKEN>" header
+# (or a "?profile=<token>" query parameter; any value if no token is set). The response carries an X-Profile-Id header,
+# and these artifacts are written to config.PROFILING_DIR under that id:
+#   <id>.folded - sampled stacks of every thread running code in src/ (including Whisper and VADER on the executor),
+#                 in the collapsed format read by flamegraph.pl and https://www.speedscope.app
+#   <id>.pstats - cProfile of the handler on the event loop thread, e.g. python -m pstats <id>.pstats, or snakeviz
+#   <id>.json   - the request, its duration, the tracemalloc allocation peak and the top allocating lines
+#
+# Profiling is process-wide, so only one request per process is profiled at a time, and work done for other requests
+# during it shows up in the sampled stacks too. It slows the request down (tracemalloc especially), so keep it opt-in.
+# A profile whose response never finishes (e.g. the client left before the body was sent) is stopped after
+# config.PROFILING_MAX_SECONDS, so it cannot keep the profilers running or block later profiles.
+
+
+# Import Libraries
+import asyncio
+import cProfile
+import collections
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+
+from . import config
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILING_DIR = os.path.join(os.path.dirname(SRC_DIR), "cache", config.PROFILING_DIR)
+
+# Only one request is profiled at a time: cProfile and tracemalloc cannot tell concurrent requests apart
+_ACTIVE = threading.Lock()
+
+
+def requested(headers, query_params) -> bool:
+    """
+    Whether a request asked to be profiled, and is allowed to be by config.
+    """
+    if not config.PROFILING_ENABLED:
+        return False
+    value = headers.get("x-profile") or query_params.get("profile")
+    if value is None:
+        return False
+    return config.PROFILING_TOKEN is None or value == config.PROFILING_TOKEN
+
+
+class _StackSampler(threading.Thread):
+    """
+    Counts the stacks of every other thread every interval seconds, keeping those that pass through src/.
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.interval = interval
+        self.counts = collections.Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.ident:
+                    continue
+                stack = []
+                in_src = False
+                while frame is not None:
+                    code = frame.f_code
+                    in_src = in_src or code.co_filename.startswith(SRC_DIR)
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                # Idle threads (the event loop waiting on its selector, executor threads waiting for work) are left out
+                if in_src:
+                    self.counts[";".join([names.get(thread_id, str(thread_id))] + stack[::-1])] += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+class RequestProfile:
+    """
+    Profiles everything the process does between start() and stop(), and saves it under a new request id.
+    """
+
+    def __init__(self, method: str, path: str):
+        self.request_id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self._profiler = cProfile.Profile()
+        self._sampler = _StackSampler(config.PROFILING_SAMPLE_INTERVAL_SECONDS)
+        self._started_tracemalloc = False
+        self._start_memory = 0
+        self._start = None
+        self._watchdog = None
+        self._stopped = False
+        self.summary = None
+
+    def start(self) -> None:
+        """
+        Starts profiling. Must be called on the event loop thread, which is the thread cProfile profiles.
+        """
+        loop = asyncio.get_running_loop()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(config.PROFILING_TRACEMALLOC_FRAMES)
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        self._start_memory = tracemalloc.get_traced_memory()[0]
+        self._sampler.start()
+        self._start = time.perf_counter()
+        self._profiler.enable()
+        # However the response ends, even if its body is never sent, the profile is stopped, on the same thread
+        self._watchdog = loop.call_later(config.PROFILING_MAX_SECONDS, self.stop, None, True)
+
+    def stop(self, status_code: int | None = None, timed_out: bool = False) -> dict:
+        """
+        Stops profiling, writes the artifacts and returns the summary. Another request can be profiled afterwards.
+        Only the first call does anything; later ones return the same summary.
+        """
+        if self._stopped:
+            return self.summary
+        self._stopped = True
+        try:
+            if self._watchdog is not None:
+                self._watchdog.cancel()
+            self._profiler.disable()
+            duration = time.perf_counter() - self._start
+            self._sampler.stop()
+
+            current, peak = tracemalloc.get_traced_memory()
+            top_allocations = tracemalloc.take_snapshot().statistics("lineno")[:10]
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+        finally:
+            _ACTIVE.release()
+
+        summary = {"request_id": self.request_id,
+                   "method": self.method,
+                   "path": self.path,
+                   "status_code": status_code,
+                   "timed_out": timed_out,
+                   "duration_seconds": duration,
+                   "samples": sum(self._sampler.counts.values()),
+                   "tracemalloc_peak_mb": (peak - self._start_memory) / 2**20,
+                   "tracemalloc_retained_mb": (current - self._start_memory) / 2**20,
+                   "top_allocations": [{"location": str(stat.traceback), "size_mb": stat.size / 2**20, "count": stat.count}
+                                       for stat in top_allocations]}
+        self._save(summary)
+        self.summary = summary
+        return summary
+
+    def artifact_path(self, extension: str) -> str:
+        return os.path.join(PROFILING_DIR, self.request_id + extension)
+
+    def _save(self, summary: dict) -> None:
+        os.makedirs(PROFILING_DIR, exist_ok=True)
+        self._profiler.dump_stats(self.artifact_path(".pstats"))
+        with open(self.artifact_path(".folded"), "w", encoding="utf-8") as f:
+            f.writelines(f"{stack} {count}\n" for stack, count in self._sampler.counts.most_common())
+        with open(self.artifact_path(".json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        _prune(config.PROFILING_MAX_PROFILES)
+
+
+def _prune(max_profiles: int) -> None:
+    """
+    Deletes the artifacts of all but the max_profiles most recent profiles.
+    """
+    summaries = sorted((entry for entry in os.scandir(PROFILING_DIR) if entry.name.endswith(".json")),
+                       key=lambda entry: entry.stat().st_mtime)
+    for entry in summaries[:max(0, len(summaries) - max_profiles)]:
+        for extension in (".json", ".pstats", ".folded"):
+            try:
+                os.remove(os.path.join(PROFILING_DIR, entry.name[:-len(".json")] + extension))
+            except FileNotFoundError:
+                pass
+
+
+def try_start(method: str, path: str) -> RequestProfile | None:
+    """
+    Starts profiling a request, or returns None if another request is already being profiled.
+    """
+    if not _ACTIVE.acquire(blocking=False):
+        return None
+    try:
+        profile = RequestProfile(method, path)
+        profile.start()
+        return profile
+    except BaseException:
+        _ACTIVE.release()
+        raise
@@ -1,13 +1,45 @@
 
 
 # Import Libraries
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import Dict, List, Optional
 
 
 # Input Models
 class TranscriptInput(BaseModel):
-    """The JSON body for /summaries and /macth"""
+    """The JSON body for /summaries and /macth: a transcript, or the analysis_id returned by an earlier /summarise"""
+    text: Optional[str] = None
+    analysis_id: Optional[str] = None
+
+    @model_validator(mode="after")
+    def require_text_or_analysis_id(self):
+        if self.text is None and self.analysis_id is None:
+            raise ValueError("Either text or analysis_id is required")
+        return self
+
+class TopKInput(BaseModel):
+    """The JSON body for /match/top-k"""
+    user_id: str
+    k: int = Field(default=10, ge=1, le=1000)
+
+
+class UserPair(BaseModel):
+    """Two users to score against each other"""
+    user_1_id: str
+    user_2_id: str
+
+class BatchMatchInput(TranscriptInput):
+    """The JSON body for /match/batch: one conversation, as for /match, and every pair of its participants to score"""
+    pairs: List[UserPair] = Field(min_length=1, max_length=100_000)
+
+
+class LiveSessionInput(BaseModel):
+    """The JSON body for /sessions: the two users in the conversation"""
+    user_1_id: str
+    user_2_id: str
+
+class ChunkInput(BaseModel):
+    """The JSON body for /sessions/{session_id}/chunks: the next piece of the transcript"""
     text: str
 
 
@@ -17,6 +49,7 @@ class TranscriptOutput(BaseModel):
 
 class TopicsOutput(BaseModel):
     topics: List[str]
+    analysis_id: str
 
 class ScoreInterpretation(BaseModel):
     """A single score and its meaning"""
@@ -31,4 +64,48 @@ class HeuristicBreakdown(BaseModel):
 class MatchOutput(BaseModel):
     """The final output of the /match endpoint"""
     baseline_score: ScoreInterpretation
-    heuristic_score: HeuristicBreakdown
\ No newline at end of file
+    heuristic_score: HeuristicBreakdown
+    analysis_id: Optional[str] = None
+
+class BatchMatchLine(BaseModel):
+    """One line of the /match/batch NDJSON output: the /match scores of one pair"""
+    user_1_id: str
+    user_2_id: str
+    baseline_score: ScoreInterpretation
+    heuristic_score: HeuristicBreakdown
+
+class CandidateMatch(BaseModel):
+    """A single ranked partner from the top-k search"""
+    user_id: str
+    score: float
+    breakdown: Dict[str, float]
+
+class TopKOutput(BaseModel):
+    """The final output of the /match/top-k endpoint"""
+    user_id: str
+    matches: List[CandidateMatch]
+
+class JobSubmissionOutput(BaseModel):
+    """The ids of the jobs created by /jobs/transcribe, in upload order"""
+    job_ids: List[str]
+
+class JobStatusOutput(BaseModel):
+    """The state of a single transcription job"""
+    job_id: str
+    status: str
+    attempts: int
+    error: Optional[str] = None
+
+class LiveSessionOutput(BaseModel):
+    """The id of a new live session"""
+    session_id: str
+
+class LiveScoreOutput(BaseModel):
+    """The scores of a live session after its latest chunk"""
+    session_id: str
+    word_count: int
+    topics: List[str]
+    topics_word_count: int
+    vader_engagement: float
+    baseline_score: ScoreInterpretation
+    heuristic_score: HeuristicBreakdown
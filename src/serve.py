@@ -0,0 +1,165 @@
+# --- Pre-fork Multi-process Server --- #
+# Runs the API in several worker processes that share their large read-only state, instead of each loading its own copy
+# like `uvicorn --workers N` does:
+#   - the Whisper weights (and any other config.SERVE_PRELOAD_COMPONENTS) are loaded once, before forking,
+#     so workers share the parent's pages copy-on-write;
+#   - user profiles are memory-mapped from the profile store, so every worker reads the same page cache,
+#     and the id index and top-k index built on them are also inherited from the parent.
+# Objects alive at fork are moved out of the garbage collector's reach (gc.freeze), so collections in a worker do not
+# write to, and so copy, the shared pages.
+#
+# Usage: python -m src.serve --workers 4 --port 8000
+#        python -m src.serve --workers 4 --no-preload      (each worker loads its own state, like uvicorn --workers)
+#
+# The topic cache cannot be preloaded, since its SQLite connection must not cross a fork.
+#
+# Unix only (it needs os.fork). Set config.JOB_WORKERS = 0 and run `python -m src.jobs work` separately,
+# otherwise every API worker starts its own transcription worker pool.
+
+
+# Import Libraries
+import argparse
+import collections
+import gc
+import os
+import signal
+import socket
+import time
+
+import uvicorn
+
+from . import config
+
+# Components that cannot be loaded before forking, because the workers would share state that must not cross a fork
+FORK_UNSAFE_COMPONENTS = {"topic_cache": "it holds a SQLite connection, which must not be used across os.fork"}
+
+
+def _load_app(components: list[str]):
+    """
+    Imports the API, which opens the profile store and builds the top-k index, and loads the given components.
+    """
+    from . import main
+    from . import pipeline
+
+    pipeline.warm_up(components)
+    return main.app
+
+
+def _run_worker(sock: socket.socket, components: list[str], app, n_workers: int) -> None:
+    if app is None:
+        app = _load_app(components)
+
+    if "whisper" in components:
+        import torch
+        # Workers share the machine's cores rather than each starting a thread per core
+        torch.set_num_threads(config.SERVE_WORKER_THREADS or max(1, (os.cpu_count() or 1) // n_workers))
+
+    server = uvicorn.Server(uvicorn.Config(app, lifespan="on"))
+    server.run(sockets=[sock])
+
+
+def _fork_worker(sock: socket.socket, components: list[str], app, n_workers: int) -> int:
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 1
+        try:
+            _run_worker(sock, components, app, n_workers)
+            exit_code = 0
+        finally:
+            os._exit(exit_code)
+    return pid
+
+
+def serve(host: str = "0.0.0.0",
+          port: int = 8000,
+          n_workers: int = config.SERVE_WORKERS,
+          components: list[str] = config.SERVE_PRELOAD_COMPONENTS,
+          preload: bool = True) -> None:
+    """
+    Binds one listening socket and forks n_workers API processes that accept connections from it.
+    Workers that exit unexpectedly are replaced, with a backoff, until the server receives SIGINT or SIGTERM.
+    Raises RuntimeError, after stopping the other workers, if workers keep exiting (see config.SERVE_MAX_RESTARTS).
+    """
+    if not hasattr(os, "fork"):
+        raise RuntimeError("Pre-fork serving needs os.fork; use `uvicorn src.main:app --workers N` on this platform")
+    unsafe = [name for name in components if name in FORK_UNSAFE_COMPONENTS]
+    if preload and unsafe:
+        raise ValueError(f"Cannot preload {unsafe[0]} before forking: {FORK_UNSAFE_COMPONENTS[unsafe[0]]}. "
+                         f"Leave it out of the preload list (or config.PIPELINE_WARM_UP_COMPONENTS, to load it in each worker).")
+
+    app = None
+    if preload:
+        app = _load_app(components)
+        gc.collect()
+        gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    workers = {_fork_worker(sock, components, app, n_workers) for _ in range(n_workers)}
+    print(f"Serving on http://{host}:{port} with {n_workers} workers (preloaded: {preload}, pids: {sorted(workers)}).")
+
+    stopping = []
+    def stop(signum, frame):
+        stopping.append(signum)
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    restarts = collections.deque()
+    crash_looping = False
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        workers.discard(pid)
+        if stopping:
+            continue
+
+        now = time.monotonic()
+        while restarts and now - restarts[0] > config.SERVE_RESTART_WINDOW_SECONDS:
+            restarts.popleft()
+        if len(restarts) >= config.SERVE_MAX_RESTARTS:
+            print(f"ERROR: Worker {pid} exited with status {status}, after {len(restarts)} restarts in the last "
+                  f"{config.SERVE_RESTART_WINDOW_SECONDS:.0f}s. Stopping the server.")
+            crash_looping = True
+            stop(signal.SIGTERM, None)
+            continue
+
+        # Back off, so workers that crash on startup do not turn into a tight fork loop
+        delay = config.SERVE_RESTART_BACKOFF_SECONDS * 2 ** len(restarts)
+        print(f"Worker {pid} exited with status {status}, restarting it in {delay:.1f}s.")
+        restarts.append(now)
+        time.sleep(delay)
+        if not stopping:
+            workers.add(_fork_worker(sock, components, app, n_workers))
+
+    sock.close()
+    if crash_looping:
+        raise RuntimeError("Workers kept exiting; see the errors above")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API from several processes sharing read-only state.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=config.SERVE_WORKERS)
+    parser.add_argument("--preload", nargs="*", default=config.SERVE_PRELOAD_COMPONENTS,
+                        help="Components from pipeline.COMPONENT_LOADERS to load before forking.")
+    parser.add_argument("--no-preload", action="store_true", help="Load everything in each worker instead, for comparison.")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.workers, args.preload, preload=not args.no_preload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# --- Live Conversation Sessions --- #
+# Scores a conversation while it is happening. Transcript chunks are added as they arrive, and each returns an updated score.
+# VADER and the word count are kept as running aggregates over the chunks, so an update costs O(chunk), not O(transcript).
+# The LLM topic analysis of the whole transcript so far is only re-run every config.LIVE_TOPIC_INTERVAL_WORDS words,
+# in the background: chunks keep being scored with the latest topics while it runs.
+
+
+# Import Libraries
+import asyncio
+import uuid
+
+from . import admission
+from . import cache
+from . import config
+from . import heuristics
+from . import pipeline
+
+# Placeholder topic vector and engagement used until the first topic analysis finishes (topics_word_count is 0 until then).
+# The engagement adds no social cue bonus, but the topic vector is not neutral: it is fused into the baseline score and
+# scored for topic interest like any other, so both scores move when the first real analysis replaces it.
+NEUTRAL_TOPIC_VECTOR = [0.5] * 5
+NEUTRAL_ENGAGEMENT = 0.5
+
+
+class LiveSession:
+    """
+    The running analysis of one conversation between two users.
+    """
+
+    def __init__(self, pers_vec_1: list[float], pers_vec_2: list[float], topic_interval_words: int = config.LIVE_TOPIC_INTERVAL_WORDS):
+        self.session_id = uuid.uuid4().hex
+        self.pers_vec_1 = pers_vec_1
+        self.pers_vec_2 = pers_vec_2
+        self.topic_interval_words = topic_interval_words
+
+        self.chunks = []
+        self.word_count = 0
+        self._vader_weighted_sum = 0.0
+
+        self.topics = []
+        self.topic_vector = NEUTRAL_TOPIC_VECTOR
+        self.engagement_score = NEUTRAL_ENGAGEMENT
+        self.topics_word_count = 0
+
+        self._topic_task = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def vader_engagement(self) -> float:
+        """
+        Word-weighted mean of the VADER compound score of each chunk, approximating VADER on the whole transcript.
+        """
+        return self._vader_weighted_sum / self.word_count if self.word_count else 0.0
+
+    async def add_chunk(self, text: str) -> dict:
+        """
+        Adds the next piece of the transcript and returns the updated scores.
+        Chunks sent concurrently to the same session are applied in arrival order.
+        """
+        async with self._lock:
+            n_words = len(text.split())
+            if n_words:
+                vader = await pipeline.get_vader_sentiment_async(text)
+                self.chunks.append(text)
+                self.word_count += n_words
+                self._vader_weighted_sum += vader * n_words
+
+            if self._topic_task is None and self.word_count - self.topics_word_count >= self.topic_interval_words:
+                self._topic_task = asyncio.ensure_future(self._refresh_topics(" ".join(self.chunks), self.word_count))
+
+            return self.scores()
+
+    async def _refresh_topics(self, transcript: str, word_count: int) -> None:
+        try:
+            result = await pipeline.get_topics_and_vectors_async(transcript)
+            if result != pipeline.TOPIC_FALLBACK:
+                self.topics, self.topic_vector, self.engagement_score = result
+        except admission.Overloaded as e:
+            print(f"Skipping a topic refresh for session {self.session_id}: {e}")
+        finally:
+            # A failed analysis also waits for the next interval, rather than being retried on every chunk
+            self.topics_word_count = word_count
+            self._topic_task = None
+
+    async def flush(self) -> dict:
+        """
+        Waits for any topic analysis in progress and returns the scores including it.
+        """
+        task = self._topic_task
+        if task is not None:
+            await task
+        return self.scores()
+
+    def scores(self) -> dict:
+        analysis_results = {"topic_vector": self.topic_vector,
+                            "engagement_score": self.engagement_score,
+                            "vader_engagement": self.vader_engagement,
+                            "word_count": self.word_count}
+
+        fused_vec_1 = pipeline.fuse_vectors(self.pers_vec_1, self.topic_vector)
+        fused_vec_2 = pipeline.fuse_vectors(self.pers_vec_2, self.topic_vector)
+
+        return {"session_id": self.session_id,
+                "word_count": self.word_count,
+                "topics": self.topics,
+                "topics_word_count": self.topics_word_count,
+                "vader_engagement": self.vader_engagement,
+                "baseline_score": heuristics.baseline_compatibility_score(fused_vec_1, fused_vec_2),
+                "heuristic_score": pipeline.heuristic_compatibility_score(self.pers_vec_1, self.pers_vec_2, analysis_results)}
+
+
+# Open Sessions, the least recently used of which are dropped above config.LIVE_MAX_SESSIONS
+SESSIONS = cache.AnalysisStore(max_entries=config.LIVE_MAX_SESSIONS)
+
+def start_session(pers_vec_1: list[float], pers_vec_2: list[float]) -> LiveSession:
+    session = LiveSession(pers_vec_1, pers_vec_2)
+    SESSIONS.set(session.session_id, session)
+    return session
+
+
+def get_session(session_id: str) -> LiveSession | None:
+    return SESSIONS.get(session_id)
+
+
+def end_session(session_id: str) -> LiveSession | None:
+    return SESSIONS.pop(session_id)
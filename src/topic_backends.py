@@ -0,0 +1,123 @@
+# --- Local Topic Analysis Backends --- #
+# Alternatives to the OpenAI topic analysis in pipeline.py, selected with config.TOPIC_BACKEND.
+# A backend turns a transcript into (topics, topic_vector, engagement_score), like pipeline.get_topics_and_vectors,
+# and raises if it cannot. To add one, implement model_name() and analyse() and register the class in BACKENDS.
+#
+# Compare backends with: python -m benchmarks.topics
+
+
+# Import Libraries
+# torch and transformers are imported when a local model is loaded, so importing this module stays cheap.
+import os
+
+import numpy as np
+
+from . import config
+from . import heuristics
+
+MODEL_CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'model_cache'))
+
+# Candidate high-level themes for the local backend; the 5 closest to the transcript are its topics
+TOPIC_LABELS = ["Space exploration and colonisation", "Science and technology", "Artificial intelligence", "The future of humanity",
+                "Risk and uncertainty", "Ethics and morality", "Politics and society", "Economics and money",
+                "Career and ambition", "Work-life balance", "Education and learning", "Family and children",
+                "Friendship and relationships", "Love and romance", "Health and fitness", "Food and cooking",
+                "Travel and adventure", "Nature and the environment", "Climate change", "Art and creativity",
+                "Music and performance", "Books and storytelling", "Film and television", "Sport and competition",
+                "Religion and spirituality", "Philosophy and meaning", "Mental health and emotions", "Personal growth",
+                "Humour and playfulness", "Home and daily routine", "Culture and identity", "History and tradition"]
+
+# For each trait, and for engagement, a description of its high and low end. A transcript's score is a zero-shot
+# choice between the two, by which one its embedding is closer to.
+TRAIT_POLES = {"openness": ("Curiosity about new ideas, imagination, art, abstract thinking and exploring the unknown.",
+                            "Sticking to the familiar, routine, practical concerns and traditional ways of doing things."),
+               "conscientiousness": ("Careful planning, organisation, responsibility, discipline and long-term goals.",
+                                     "Spontaneity, improvisation, going with the flow and not worrying about plans."),
+               "extraversion": ("Parties, meeting new people, being social, talkative and the centre of attention.",
+                                "Quiet time alone, reading, reflection and small groups of close friends."),
+               "agreeableness": ("Kindness, empathy, cooperation, helping others and finding common ground.",
+                                 "Competition, criticism, arguing, scepticism and putting yourself first."),
+               "neuroticism": ("Worry, stress, anxiety, fear of what could go wrong and emotional ups and downs.",
+                               "Calm, relaxed, emotionally stable and confident that things will work out.")}
+
+ENGAGEMENT_POLES = ("An animated, enthusiastic conversation full of questions, laughter and eager back-and-forth.",
+                    "A flat, bored conversation with short answers, long pauses and little interest.")
+
+
+class LocalEmbeddingBackend:
+    """
+    Fully local topic analysis with a small sentence-embedding model (config.LOCAL_TOPIC_MODEL_NAME) on the CPU.
+    Topics are the TOPIC_LABELS closest to the transcript, and each trait and the engagement score are scored
+    zero-shot against TRAIT_POLES and ENGAGEMENT_POLES. No network access is needed once the model is downloaded.
+    """
+
+    # Words per chunk when embedding long transcripts, to stay within the model's context
+    CHUNK_WORDS = 150
+
+    def __init__(self, temperature: float = config.LOCAL_TOPIC_TEMPERATURE):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        self._torch = torch
+        self.temperature = temperature
+        self.tokenizer = AutoTokenizer.from_pretrained(config.LOCAL_TOPIC_MODEL_NAME, cache_dir=MODEL_CACHE_DIR)
+        self.model = AutoModel.from_pretrained(config.LOCAL_TOPIC_MODEL_NAME, cache_dir=MODEL_CACHE_DIR).eval()
+
+        self.label_embeddings = self.embed(TOPIC_LABELS)
+        poles = [pole for trait in heuristics.TRAITS for pole in TRAIT_POLES[trait]] + list(ENGAGEMENT_POLES)
+        self.pole_embeddings = self.embed(poles)
+
+    @staticmethod
+    def model_name() -> str:
+        return f"local:{config.LOCAL_TOPIC_MODEL_NAME}"
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """
+        Mean-pooled, L2-normalised sentence embeddings, one row per text.
+        """
+        with self._torch.inference_mode():
+            batch = self.tokenizer(texts, padding=True, truncation=True, return_tensors="pt")
+            hidden = self.model(**batch).last_hidden_state
+            mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = ((hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)).numpy()
+        return pooled / np.linalg.norm(pooled, axis=1, keepdims=True)
+
+    def embed_transcript(self, transcript: str) -> np.ndarray:
+        """
+        Embeds a transcript of any length as the normalised mean of its chunk embeddings.
+        """
+        words = transcript.split()
+        chunks = [" ".join(words[start:start + self.CHUNK_WORDS]) for start in range(0, len(words), self.CHUNK_WORDS)] or [""]
+        mean = self.embed(chunks).mean(axis=0)
+        return mean / np.linalg.norm(mean)
+
+    def analyse(self, transcript: str):
+        document = self.embed_transcript(transcript)
+
+        topic_similarity = self.label_embeddings @ document
+        topics = [TOPIC_LABELS[i] for i in np.argsort(-topic_similarity)[:5]]
+
+        # Probability of the high pole over the low pole, for the 5 traits and then engagement
+        high, low = (self.pole_embeddings @ document).reshape(-1, 2).T
+        scores = 1 / (1 + np.exp(-(high - low) / self.temperature))
+
+        return topics, [round(float(score), 2) for score in scores[:5]], round(float(scores[5]), 2)
+
+
+class MockTopicBackend:
+    """
+    Fixed, high-quality example output, for when no LLM is available at all (e.g. the API quota has run out).
+    """
+
+    @staticmethod
+    def model_name() -> str:
+        return "mock"
+
+    def analyse(self, transcript: str):
+        return (["Mars Colonisation Logistics", "Future of Humanity", "Civilisation and Risk", "Population Collapse", "Extending Consciousness"],
+                [0.9, 0.7, 0.3, 0.4, 0.6],
+                0.5)
+
+
+BACKENDS = {"local": LocalEmbeddingBackend,
+            "mock": MockTopicBackend}
@@ -0,0 +1,105 @@
+# --- Voice Activity Detection --- #
+# An energy-based VAD used to drop long silences before transcription.
+# Short pauses are kept, so Whisper still hears the natural gaps between words and turns,
+# and timestamps in the trimmed audio are mapped back to the original audio.
+
+
+# Import Libraries
+import bisect
+
+import numpy as np
+
+from . import config
+
+
+class SpeechRegions:
+    """
+    The voiced regions of a clip, as (start, end) sample ranges in the original audio.
+    """
+
+    def __init__(self, regions: list[tuple[int, int]], n_samples: int, sample_rate: int):
+        self.regions = regions
+        self.n_samples = n_samples
+        self.sample_rate = sample_rate
+
+        # Start of each region in the trimmed audio, in seconds
+        self._trimmed_starts = []
+        trimmed = 0
+        for start, end in regions:
+            self._trimmed_starts.append(trimmed / sample_rate)
+            trimmed += end - start
+        self.voiced_samples = trimmed
+
+    @property
+    def trimmed_seconds(self) -> float:
+        """
+        Seconds of silence removed from the original audio.
+        """
+        return (self.n_samples - self.voiced_samples) / self.sample_rate
+
+    def voiced(self, audio: np.ndarray) -> np.ndarray:
+        """
+        The voiced regions of audio, joined end to end.
+        """
+        if not self.regions:
+            return audio[:0]
+        return np.concatenate([audio[start:end] for start, end in self.regions])
+
+    def to_original(self, seconds: float, is_end: bool = False) -> float:
+        """
+        Maps a time in the trimmed audio to the original audio.
+        A time on the join between two regions maps to the end of the first one if is_end, and the start of the second otherwise.
+        """
+        if not self.regions:
+            return seconds
+        search = bisect.bisect_left if is_end else bisect.bisect_right
+        index = max(search(self._trimmed_starts, seconds) - 1, 0)
+        start, end = self.regions[index]
+        original = start / self.sample_rate + seconds - self._trimmed_starts[index]
+        return min(original, end / self.sample_rate)
+
+    def map_segments(self, segments: list[dict]) -> list[dict]:
+        """
+        Copies Whisper segments with their start and end times mapped back to the original audio.
+        """
+        return [{**segment,
+                 "start": self.to_original(segment["start"]),
+                 "end": self.to_original(segment["end"], is_end=True)}
+                for segment in segments]
+
+
+def detect_speech(audio: np.ndarray,
+                  sample_rate: int,
+                  frame_seconds: float = config.VAD_FRAME_SECONDS,
+                  threshold_db: float = config.VAD_THRESHOLD_DB,
+                  min_silence_seconds: float = config.VAD_MIN_SILENCE_SECONDS,
+                  padding_seconds: float = config.VAD_PADDING_SECONDS) -> SpeechRegions:
+    """
+    Finds the voiced regions of a float32 clip. A frame is voiced if its energy is within threshold_db of the loudest frame.
+    Silences shorter than min_silence_seconds are kept, and each region is padded by padding_seconds on both sides.
+    """
+    frame = max(1, int(frame_seconds * sample_rate))
+    n_frames = -(-len(audio) // frame)
+    if n_frames == 0:
+        return SpeechRegions([], 0, sample_rate)
+
+    padded = np.zeros(n_frames * frame, dtype=np.float32)
+    padded[:len(audio)] = audio
+    energy_db = 10 * np.log10(np.mean(padded.reshape(n_frames, frame) ** 2, axis=1) + 1e-10)
+    voiced = energy_db > max(energy_db.max() + threshold_db, config.VAD_MIN_DB)
+
+    # Runs of voiced frames, as [start, end) frame indices
+    edges = np.diff(np.concatenate([[0], voiced.astype(np.int8), [0]]))
+    runs = list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+    min_gap = min_silence_seconds * sample_rate
+    pad = int(padding_seconds * sample_rate)
+    regions = []
+    for start, end in runs:
+        start, end = max(int(start) * frame - pad, 0), min(int(end) * frame + pad, len(audio))
+        if regions and start - regions[-1][1] < min_gap:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+
+    return SpeechRegions(regions, len(audio), sample_rate)
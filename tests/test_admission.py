@@ -0,0 +1,88 @@
+# --- Admission Control and Request Coalescing Tests --- #
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import admission
+from src import pipeline
+from src.main import app
+
+
+def test_limiter_queues_then_rejects_when_full():
+    limiter = admission.StageLimiter("test", concurrency=1, queue=1, timeout=5)
+    order = []
+
+    async def call(name):
+        async with limiter.slot():
+            order.append(name)
+            await asyncio.sleep(0.05)
+
+    async def run():
+        first, second = asyncio.ensure_future(call("first")), asyncio.ensure_future(call("second"))
+        await asyncio.sleep(0.01)
+        assert (limiter.active, limiter.queue_depth) == (1, 1)
+        with pytest.raises(admission.Overloaded) as rejected:
+            await call("third")
+        await asyncio.gather(first, second)
+        return rejected.value
+
+    rejected = asyncio.run(run())
+    assert rejected.status_code == 429
+    assert rejected.retry_after >= 1
+    assert order == ["first", "second"]
+    assert (limiter.active, limiter.queue_depth) == (0, 0)
+
+
+def test_limiter_rejects_requests_that_wait_too_long():
+    limiter = admission.StageLimiter("test", concurrency=1, queue=4, timeout=0.02)
+
+    async def run():
+        async with limiter.slot():
+            with pytest.raises(admission.Overloaded) as rejected:
+                async with limiter.slot():
+                    pass
+        # The timed-out waiter does not hold on to a slot
+        async with limiter.slot():
+            pass
+        return rejected.value
+
+    assert asyncio.run(run()).status_code == 503
+    assert (limiter.active, limiter.queue_depth) == (0, 0)
+
+
+def test_identical_concurrent_topic_requests_share_one_llm_call(monkeypatch):
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        await asyncio.sleep(0.05)
+        content = json.dumps({"topics": ["a", "b", "c", "d", "e"], "topic_vector": [0.9, 0.7, 0.3, 0.4, 0.6], "engagement_score": 0.8})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(pipeline, "get_async_openai_client", lambda: client)
+    monkeypatch.setattr(pipeline, "get_topic_cache", lambda: None)
+    monkeypatch.setattr(pipeline.config, "TOPIC_BACKEND", "openai")
+
+    async def run():
+        return await asyncio.gather(*(pipeline.get_topics_and_vectors_async(transcript)
+                                      for transcript in ["same transcript"] * 5 + ["another transcript"]))
+
+    results = asyncio.run(run())
+    assert len(calls) == 2
+    assert all(result == results[0] for result in results)
+    assert results[0][1] == [0.9, 0.7, 0.3, 0.4, 0.6]
+
+
+def test_overloaded_requests_get_retry_after(monkeypatch):
+    async def overloaded(transcript=None, analysis_id=None):
+        raise admission.Overloaded("llm", 429, 7)
+
+    monkeypatch.setattr(pipeline, "analyse_transcript_async", overloaded)
+    response = TestClient(app).post("/summarise", json={"text": "A transcript during a load spike."})
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "7"
@@ -2,6 +2,8 @@
 
 from fastapi.testclient import TestClient
 from src.main import app
+from src import config
+import json
 import os
 
 client = TestClient(app)
@@ -16,6 +18,24 @@ def test_transcribe_endpoint():
         assert "transcript" in response.json()
 
 
+def test_transcribe_stream_endpoint():
+    audio_path = "tests/dummy_audio.wav"
+    with open(audio_path, "rb") as f:
+        response = client.post("/transcribe/stream", files={"file": ("dummy_audio.wav", f, "audio/wav")})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert "event: done" in response.text
+
+
+
+
+def test_transcribe_stream_large_upload(monkeypatch):
+    # Uploads over the limit are decoded from the server's spooled file instead of memory
+    monkeypatch.setattr(config, "UPLOAD_MEMORY_LIMIT_BYTES", 0)
+    with open("tests/dummy_audio.wav", "rb") as f:
+        response = client.post("/transcribe/stream", files={"file": ("dummy_audio.wav", f, "audio/wav")})
+        assert response.status_code == 200
+        assert "event: done" in response.text
 
 
 def test_summarise_endpoint():
@@ -33,4 +53,105 @@ def test_match_endpoint():
     assert "baseline_score" in response.json()
     assert "heuristic_score" in response.json()
     assert "score" in response.json()["baseline_score"]
-    assert "match_score" in response.json()["heuristic_score"]
\ No newline at end of file
+    assert "match_score" in response.json()["heuristic_score"]
+
+
+
+def test_match_reuses_summarise_analysis():
+    summary = client.post("/summarise", json={"text": "A transcript analysed once and matched later."})
+    analysis_id = summary.json()["analysis_id"]
+
+    response = client.post("/match", json={"analysis_id": analysis_id})
+    assert response.status_code == 200
+    assert response.json()["analysis_id"] == analysis_id
+
+
+def test_match_unknown_analysis_id():
+    response = client.post("/match", json={"analysis_id": "not_an_analysis"})
+    assert response.status_code == 404
+
+
+def test_match_requires_text_or_analysis_id():
+    response = client.post("/match", json={})
+    assert response.status_code == 422
+
+
+def test_match_batch_streams_match_scores_per_pair(monkeypatch):
+    monkeypatch.setattr(config, "BATCH_MATCH_CHUNK_SIZE", 2)
+    pairs = [{"user_1_id": "user_1", "user_2_id": "user_2"}, {"user_1_id": "user_2", "user_2_id": "user_1"}, {"user_1_id": "user_1", "user_2_id": "user_1"}]
+    response = client.post("/match/batch", json={"text": "A group conversation about space and mars.", "pairs": pairs})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [(line["user_1_id"], line["user_2_id"]) for line in lines] == [(pair["user_1_id"], pair["user_2_id"]) for pair in pairs]
+
+    # The same scores as /match gives for the pair, from the same analysis
+    single = client.post("/match", json={"analysis_id": response.headers["x-analysis-id"]}).json()
+    assert lines[0]["heuristic_score"]["explanation"] == single["heuristic_score"]["explanation"]
+    assert abs(lines[0]["heuristic_score"]["match_score"] - single["heuristic_score"]["match_score"]) < 1e-9
+    assert abs(lines[0]["baseline_score"]["score"] - single["baseline_score"]["score"]) < 1e-9
+    assert lines[0]["baseline_score"]["interpretation"] == single["baseline_score"]["interpretation"]
+
+
+def test_match_batch_unknown_user():
+    pairs = [{"user_1_id": "user_1", "user_2_id": "not_a_user"}]
+    response = client.post("/match/batch", json={"text": "A group conversation.", "pairs": pairs})
+    assert response.status_code == 404
+    assert client.post("/match/batch", json={"text": "A group conversation.", "pairs": []}).status_code == 422
+
+
+def test_match_top_k_endpoint():
+    response = client.post("/match/top-k", json={"user_id": "user_1", "k": 5})
+    assert response.status_code == 200
+    assert response.json()["user_id"] == "user_1"
+    assert all(match["user_id"] != "user_1" for match in response.json()["matches"])
+
+
+def test_match_top_k_unknown_user():
+    response = client.post("/match/top-k", json={"user_id": "not_a_user", "k": 5})
+    assert response.status_code == 404
+
+
+def test_live_session():
+    session_id = client.post("/sessions", json={"user_1_id": "user_1", "user_2_id": "user_2"}).json()["session_id"]
+
+    response = client.post(f"/sessions/{session_id}/chunks", json={"text": "So what got you interested in space?"})
+    assert response.status_code == 200
+    assert response.json()["word_count"] == 7
+    assert "match_score" in response.json()["heuristic_score"]
+
+    assert client.delete(f"/sessions/{session_id}").status_code == 200
+    assert client.post(f"/sessions/{session_id}/chunks", json={"text": "Hello?"}).status_code == 404
+
+
+def test_unknown_job_status():
+    response = client.get("/jobs/not_a_job")
+    assert response.status_code == 404
+
+
+def test_metrics_endpoint():
+    client.post("/match", json={"text": "This is a test transcript about space and mars."})
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'pipeline_stage_duration_seconds_count{stage="vader"}' in response.text
+    assert "llm_fallbacks_total" in response.text
+
+
+def test_analyse_endpoint():
+    audio_path = "tests/dummy_audio.wav"
+    with open(audio_path, "rb") as f:
+        response = client.post("/analyse", files={"file": ("dummy_audio.wav", f, "audio/wav")},
+                               data={"user_1_id": "user_1", "user_2_id": "user_2"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        for stage in ("transcript", "topics", "sentiment", "baseline_score", "heuristic_score", "done"):
+            assert f"event: {stage}" in response.text
+
+
+def test_analyse_unknown_user():
+    audio_path = "tests/dummy_audio.wav"
+    with open(audio_path, "rb") as f:
+        response = client.post("/analyse", files={"file": ("dummy_audio.wav", f, "audio/wav")},
+                               data={"user_1_id": "user_1", "user_2_id": "not_a_user"})
+        assert response.status_code == 404
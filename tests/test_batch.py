@@ -0,0 +1,99 @@
+# --- Offline Batch Scoring Tests --- #
+
+import asyncio
+import json
+
+from src import batch
+from src import pipeline
+
+
+def _patch_pipeline(monkeypatch):
+    calls = []
+
+    async def fake_topics(transcript, admit=True):
+        assert not admit
+        calls.append(transcript)
+        await asyncio.sleep(0.01 if "slow" in transcript else 0)
+        return ["Space", "Travel", "Risk", "Family", "Work"], [0.9, 0.7, 0.3, 0.4, 0.6], 0.8
+
+    monkeypatch.setattr(pipeline, "get_topics_and_vectors_async", fake_topics)
+    monkeypatch.setattr(pipeline, "get_vader_sentiment", lambda transcript: 0.25)
+    return calls
+
+
+def _write_input(path, n):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            record = {"id": f"call-{i}", "text": f"{'slow ' if i % 3 == 0 else ''}conversation number {i}",
+                      "pers_vec_1": [0.8, 0.4, 0.7, 0.2, 0.9], "pers_vec_2": [0.3, 0.9, 0.1, 0.6, 0.4]}
+            f.write(json.dumps(record) + "\n")
+        f.write("\n")
+        f.write(json.dumps({"id": "bad", "text": "no users"}) + "\n")
+
+
+def _run(input_path, output_path, **kwargs):
+    return asyncio.run(batch.BatchScorer(n_workers=0, llm_concurrency=4).run(str(input_path), str(output_path), **kwargs))
+
+
+def _read_output(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_results_are_written_in_input_order(monkeypatch, tmp_path):
+    _patch_pipeline(monkeypatch)
+    _write_input(tmp_path / "in.jsonl", 10)
+
+    counts = _run(tmp_path / "in.jsonl", tmp_path / "out.jsonl", max_in_flight=4, checkpoint_every=3)
+    results = _read_output(tmp_path / "out.jsonl")
+
+    assert counts == {"scored": 10, "failed": 1}
+    assert [result["id"] for result in results] == [f"call-{i}" for i in range(10)] + ["bad"]
+    assert [result["line"] for result in results] == list(range(1, 11)) + [12]
+    assert "error" in results[-1]
+
+    expected = pipeline.heuristic_compatibility_score([0.8, 0.4, 0.7, 0.2, 0.9], [0.3, 0.9, 0.1, 0.6, 0.4], results[0]["analysis_results"])
+    assert results[0]["heuristic_score"]["match_score"] == expected["match_score"]
+    assert results[0]["analysis_results"]["vader_engagement"] == 0.25
+    assert batch.read_checkpoint(str(tmp_path / "out.jsonl"))["input_lines"] == 12
+
+
+def test_resume_after_crash_skips_checkpointed_lines(monkeypatch, tmp_path):
+    calls = _patch_pipeline(monkeypatch)
+    _write_input(tmp_path / "in.jsonl", 10)
+    _run(tmp_path / "in.jsonl", tmp_path / "full.jsonl")
+    with open(tmp_path / "full.jsonl", "rb") as f:
+        full = f.read()
+
+    # A crash after the checkpoint at line 4, having written part of line 5's result
+    first_four = b"".join(full.splitlines(keepends=True)[:4])
+    with open(tmp_path / "out.jsonl", "wb") as f:
+        f.write(first_four + b'{"line": 5, "id": "ca')
+    with open(tmp_path / "out.jsonl.checkpoint", "w") as f:
+        json.dump({"input_lines": 4, "output_bytes": len(first_four)}, f)
+
+    calls.clear()
+    counts = _run(tmp_path / "in.jsonl", tmp_path / "out.jsonl")
+    with open(tmp_path / "out.jsonl", "rb") as f:
+        assert f.read() == full
+    assert counts == {"scored": 6, "failed": 1}
+    assert len(calls) == 6
+
+    # A finished run has nothing left to do, unless restarted
+    assert _run(tmp_path / "in.jsonl", tmp_path / "out.jsonl") == {"scored": 0, "failed": 0}
+    assert _run(tmp_path / "in.jsonl", tmp_path / "out.jsonl", restart=True) == {"scored": 10, "failed": 1}
+    with open(tmp_path / "out.jsonl", "rb") as f:
+        assert f.read() == full
+
+
+def test_large_batches_bypass_api_admission_limits(monkeypatch, tmp_path):
+    monkeypatch.setattr(pipeline.config, "TOPIC_BACKEND", "mock")
+    monkeypatch.setattr(pipeline, "get_topic_cache", lambda: None)
+    monkeypatch.setattr(pipeline, "get_vader_sentiment", lambda transcript: 0.25)
+    transcripts = [f"conversation number {i}" for i in range(200)]
+
+    assert len(pipeline.get_topics_and_vectors_batch(transcripts)) == 200
+
+    _write_input(tmp_path / "in.jsonl", 200)
+    counts = asyncio.run(batch.BatchScorer(n_workers=0, llm_concurrency=150).run(str(tmp_path / "in.jsonl"), str(tmp_path / "out.jsonl")))
+    assert counts == {"scored": 200, "failed": 1}
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import time
+import unittest
+
+from src.cache import AnalysisStore, TopicCache, make_cache_key
+
+
+class TestTopicCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "topics.sqlite3")
+        self.value = {"topics": ["a", "b", "c", "d", "e"], "topic_vector": [0.1, 0.2, 0.3, 0.4, 0.5], "engagement_score": 0.7}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_key_ignores_whitespace_but_not_model_or_prompt(self):
+        key = make_cache_key("hello   world\n", "model-a", "1")
+        self.assertEqual(key, make_cache_key(" hello world", "model-a", "1"))
+        self.assertNotEqual(key, make_cache_key("hello world", "model-b", "1"))
+        self.assertNotEqual(key, make_cache_key("hello world", "model-a", "2"))
+
+    def test_hit_and_miss_counters(self):
+        cache = TopicCache(self.path)
+        self.assertIsNone(cache.get("key"))
+        cache.set("key", self.value)
+        self.assertEqual(cache.get("key"), self.value)
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "size": 1})
+
+    def test_entries_survive_restart(self):
+        TopicCache(self.path).set("key", self.value)
+        self.assertEqual(TopicCache(self.path).get("key"), self.value)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TopicCache(self.path, max_entries=2)
+        cache.set("old", self.value)
+        time.sleep(0.01)
+        cache.set("new", self.value)
+        time.sleep(0.01)
+        cache.get("old")
+        time.sleep(0.01)
+        cache.set("newest", self.value)
+
+        self.assertIsNotNone(cache.get("old"))
+        self.assertIsNone(cache.get("new"))
+        self.assertEqual(len(cache), 2)
+
+    def test_expired_entries_are_misses(self):
+        cache = TopicCache(self.path, ttl_seconds=0.01)
+        cache.set("key", self.value)
+        time.sleep(0.05)
+        self.assertIsNone(cache.get("key"))
+        self.assertEqual(len(cache), 0)
+
+
+class TestAnalysisStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "analyses.sqlite3")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_least_recently_used_entry_is_evicted(self):
+        store = AnalysisStore(max_entries=2)
+        store.set("old", {"n": 1})
+        store.set("new", {"n": 2})
+        store.get("old")
+        store.set("newest", {"n": 3})
+
+        self.assertEqual(store.get("old"), {"n": 1})
+        self.assertIsNone(store.get("new"))
+        self.assertEqual(len(store), 2)
+
+    def test_evicted_entries_spill_to_disk_and_are_promoted(self):
+        store = AnalysisStore(max_entries=1, spill=TopicCache(self.path))
+        store.set("first", {"n": 1})
+        store.set("second", {"n": 2})
+
+        self.assertIn("first", store)
+        self.assertEqual(store.get("first"), {"n": 1})
+        self.assertEqual(list(store._entries), ["first"])
+
+
+if __name__ == '__main__':
+    unittest.main()
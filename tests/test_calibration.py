@@ -0,0 +1,81 @@
+# --- Weight Calibration Sweep Tests --- #
+
+import numpy as np
+import pytest
+
+from src import calibration
+from src import config
+from src import heuristics
+
+
+def _records(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{"pers_vec_1": rng.random(5).round(2).tolist(),
+             "pers_vec_2": rng.random(5).round(2).tolist(),
+             "analysis_results": {"topic_vector": rng.random(5).round(2).tolist(),
+                                  "engagement_score": round(float(rng.random()), 2),
+                                  "vader_engagement": round(float(rng.uniform(-1, 1)), 2),
+                                  "word_count": int(rng.integers(0, 3000))},
+             "outcome": 0}
+            for _ in range(n)]
+
+
+def test_pair_scores_match_single_pair_scoring():
+    records = _records(50)
+    arrays = calibration.records_to_arrays(records)
+
+    scores = calibration.score_records(arrays)
+    expected = [heuristics.calculate_heuristic_score(r["pers_vec_1"], r["pers_vec_2"], r["analysis_results"])["match_score"] for r in records]
+    assert np.allclose(scores, expected)
+
+
+def test_sweep_finds_the_weights_behind_the_outcomes():
+    records = _records(400, seed=1)
+    arrays = calibration.records_to_arrays(records)
+
+    # Outcomes generated by a known variant: the top half of its scores matched
+    true_variant = {"HEURISTIC_WEIGHTS.agreeableness": 0.1, "HEURISTIC_PERSONALITY_WEIGHT": 0.9}
+    with calibration.config_overrides(true_variant):
+        true_scores = calibration.score_records(arrays)
+    arrays["outcomes"] = (true_scores > np.median(true_scores)).astype(np.float64)
+
+    grid = {"HEURISTIC_WEIGHTS.agreeableness": [0.1, 0.34, 0.6], "HEURISTIC_PERSONALITY_WEIGHT": [0.3, 0.7, 0.9],
+            "FUSION_PERSONALITY_WEIGHT": [0.5, 0.75]}
+    results = calibration.sweep(arrays, calibration.grid_variants(grid), n_workers=1)
+
+    best = max(results, key=lambda result: result["metrics"]["auc"])
+    assert best["metrics"]["auc"] == pytest.approx(1.0)
+    assert {key: best["variant"][key] for key in true_variant} == true_variant
+
+    # The fusion weight has no effect on the heuristic score, so it has no sensitivity
+    report = calibration.sensitivity(results, "auc")
+    assert report["FUSION_PERSONALITY_WEIGHT"]["spread"] == pytest.approx(0.0)
+    assert report["HEURISTIC_PERSONALITY_WEIGHT"]["spread"] > 0
+
+    # Config is left as it was
+    assert config.HEURISTIC_WEIGHTS["agreeableness"] == 0.34
+
+
+def test_parallel_sweep_matches_serial():
+    arrays = calibration.records_to_arrays(_records(100, seed=2))
+    arrays["outcomes"] = np.arange(100, dtype=np.float64)
+    variants = calibration.grid_variants({"HEURISTIC_TOPIC_WEIGHTS.social_cue_bonus": [0.2, 0.45, 0.7], "HEURISTIC_PERSONALITY_BONUS.max_cap": [500, 1500]})
+
+    serial = calibration.sweep(arrays, variants, n_workers=1)
+    parallel = calibration.sweep(arrays, variants, n_workers=2, chunk_size=2)
+    assert serial == parallel
+
+
+def test_sampled_variants_are_distinct_grid_points():
+    grid = {"HEURISTIC_WEIGHTS.openness": [0.1, 0.2, 0.3], "HEURISTIC_PERSONALITY_WEIGHT": [0.5, 0.7], "OPENNESS_SIMILARITY_WEIGHT": [0.1, 0.2, 0.3, 0.4]}
+    full = calibration.grid_variants(grid)
+    sample = calibration.grid_variants(grid, samples=10, seed=3)
+
+    assert len(full) == calibration.grid_size(grid) == 24
+    assert len(sample) == 10
+    assert all(variant in full for variant in sample)
+    assert len({tuple(variant.values()) for variant in sample}) == 10
+
+    with pytest.raises(ValueError):
+        with calibration.config_overrides({"NOT_A_WEIGHT": 1}):
+            pass
@@ -11,8 +11,11 @@ from src.heuristics import (
     _score_agreeableness,
     _score_neuroticism,
     _scaled_euclidean_similarity,
-    calculate_heuristic_score 
+    calculate_heuristic_score,
+    calculate_heuristic_score_matrix
 )
+from src import config
+from src import metrics
 
 class TestHeuristicFunctions(unittest.TestCase):
 
@@ -125,7 +128,64 @@ class TestHeuristicFunctions(unittest.TestCase):
         result = calculate_heuristic_score(persona_avg, persona_avg, self.mock_analysis_results)
         print(f"Average identical score: {result['match_score']:.2f}")
         self.assertTrue(0.35 < result["match_score"] < 0.65, "Two 'average' people should have a medium score.")
-        
+
+
+    # Test Batched Heuristic Scores
+    def test_score_matrix_matches_scalar_scores(self):
+        """
+        Every cell of the batched N x M score matrix should equal the single pair score exactly.
+        """
+        personas = [self.persona_ideal_partner, self.persona_ideal_complement, self.persona_volatile]
+        candidates = [self.persona_argumentative, [0.5] * 5]
+        result = calculate_heuristic_score_matrix(personas, candidates, self.mock_analysis_results)
+
+        self.assertEqual(result["match_score"].shape, (3, 2))
+        for i, p1 in enumerate(personas):
+            for j, p2 in enumerate(candidates):
+                single = calculate_heuristic_score(p1, p2, self.mock_analysis_results)
+                self.assertEqual(single["match_score"], result["match_score"][i, j])
+                for trait, score in single["breakdown"].items():
+                    self.assertEqual(score, result["breakdown"][trait][i, j])
+
+    def test_score_matrix_rejects_wrong_shape(self):
+        """
+        Psychometrics must have exactly 5 traits per row.
+        """
+        with self.assertRaises(ValueError):
+            calculate_heuristic_score_matrix([[0.5] * 4], [[0.5] * 5], self.mock_analysis_results)
+
+
+    # Test Memoised Trait Scores
+    def test_repeat_pair_reuses_trait_scores(self):
+        """
+        A repeat match of the same pair hits the trait cache and gives exactly the same score.
+        """
+        pair = ([0.11, 0.22, 0.33, 0.44, 0.55], [0.66, 0.77, 0.88, 0.99, 0.12])
+        hits = metrics.TRAIT_CACHE_REQUESTS.value("hit")
+
+        first = calculate_heuristic_score(*pair, self.mock_analysis_results)
+        second = calculate_heuristic_score(*pair, self.mock_analysis_results)
+
+        self.assertEqual(metrics.TRAIT_CACHE_REQUESTS.value("hit"), hits + 1)
+        self.assertEqual(first, second)
+
+    def test_trait_cache_is_invalidated_by_weight_changes(self):
+        """
+        Changing the trait weights must not return scores cached under the old weights.
+        """
+        pair = ([0.21, 0.32, 0.43, 0.54, 0.65], [0.76, 0.87, 0.98, 0.19, 0.2])
+        before = calculate_heuristic_score(*pair, self.mock_analysis_results)
+
+        original = config.HEURISTIC_WEIGHTS
+        config.HEURISTIC_WEIGHTS = {**original, "openness": original["openness"] + 0.2}
+        try:
+            after = calculate_heuristic_score(*pair, self.mock_analysis_results)
+            uncached = calculate_heuristic_score_matrix([pair[0]], [pair[1]], self.mock_analysis_results)
+        finally:
+            config.HEURISTIC_WEIGHTS = original
+
+        self.assertNotEqual(before["match_score"], after["match_score"])
+        self.assertEqual(after["match_score"], uncached["match_score"][0, 0])
 
 
 if __name__ == '__main__':
@@ -0,0 +1,122 @@
+import os
+import tempfile
+import time
+import unittest
+
+from src import jobs
+
+
+class TestJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.queue = jobs.JobQueue(os.path.join(self.tmp_dir.name, "jobs.sqlite3"), max_attempts=2)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_jobs_are_claimed_in_submission_order(self):
+        first = self.queue.submit("a.wav")
+        second = self.queue.submit("b.wav")
+        self.assertEqual(self.queue.claim(), (first, "a.wav"))
+        self.assertEqual(self.queue.claim(), (second, "b.wav"))
+        self.assertIsNone(self.queue.claim())
+        self.assertEqual(self.queue.get(first)["status"], jobs.RUNNING)
+
+    def test_worker_completes_jobs_and_cleans_up_audio(self):
+        audio_path = os.path.join(self.tmp_dir.name, "upload.wav")
+        open(audio_path, "wb").close()
+        job_id = self.queue.submit(audio_path, cleanup=True)
+
+        processed = jobs.run_worker(self.queue, transcribe=lambda path: "hello", exit_when_empty=True)
+
+        self.assertEqual(processed, 1)
+        self.assertEqual(self.queue.get(job_id)["status"], jobs.DONE)
+        self.assertEqual(self.queue.get(job_id)["result"], "hello")
+        self.assertFalse(os.path.exists(audio_path))
+
+    def test_failed_jobs_are_retried_until_max_attempts(self):
+        job_id = self.queue.submit("broken.wav")
+
+        def transcribe(path):
+            raise RuntimeError("decode error")
+
+        jobs.run_worker(self.queue, transcribe=transcribe, exit_when_empty=True)
+
+        job = self.queue.get(job_id)
+        self.assertEqual(job["status"], jobs.FAILED)
+        self.assertEqual(job["attempts"], 2)
+        self.assertEqual(job["error"], "decode error")
+
+    def test_running_jobs_are_requeued_after_a_crash(self):
+        queue = jobs.JobQueue(self.queue.path, lease_seconds=0.05)
+        job_id = queue.submit("a.wav")
+        queue.claim()
+        # The lease is still live, so another worker starting up leaves the job alone
+        self.assertEqual(queue.requeue_expired(), 0)
+
+        time.sleep(0.1)
+        self.assertEqual(queue.requeue_expired(), 1)
+        self.assertEqual(queue.get(job_id)["status"], jobs.QUEUED)
+        self.assertEqual(queue.claim(), (job_id, "a.wav"))
+        self.assertEqual(queue.get(job_id)["attempts"], 2)
+
+    def test_jobs_that_keep_crashing_their_worker_fail(self):
+        queue = jobs.JobQueue(self.queue.path, max_attempts=2, lease_seconds=0.05)
+        audio_path = os.path.join(self.tmp_dir.name, "crashes.wav")
+        open(audio_path, "wb").close()
+        job_id = queue.submit(audio_path, cleanup=True)
+
+        # Each worker claims the job and dies without completing or failing it
+        for _ in range(2):
+            self.assertEqual(queue.claim(), (job_id, audio_path))
+            time.sleep(0.1)
+        self.assertEqual(queue.requeue_expired(), 1)
+
+        job = queue.get(job_id)
+        self.assertEqual(job["status"], jobs.FAILED)
+        self.assertEqual(job["attempts"], 2)
+        self.assertIn("stopped responding", job["error"])
+        self.assertIsNone(queue.claim())
+        self.assertFalse(os.path.exists(audio_path))
+
+    def test_a_worker_whose_lease_expired_cannot_overwrite_the_job(self):
+        queue = jobs.JobQueue(self.queue.path, lease_seconds=0.05)
+        audio_path = os.path.join(self.tmp_dir.name, "slow.wav")
+        open(audio_path, "wb").close()
+        job_id = queue.submit(audio_path, cleanup=True)
+        queue.claim()
+        time.sleep(0.1)
+        queue.requeue_expired()
+
+        # The stalled worker finishes late, after the job went back in the queue
+        queue.complete(job_id, "late transcript")
+        queue.fail(job_id, "late error")
+        job = queue.get(job_id)
+        self.assertEqual((job["status"], job["result"], job["attempts"]), (jobs.QUEUED, None, 1))
+        self.assertTrue(os.path.exists(audio_path))
+
+    def test_leases_are_renewed_while_a_job_runs(self):
+        queue = jobs.JobQueue(self.queue.path, lease_seconds=0.1)
+        other_process = jobs.JobQueue(self.queue.path)
+        job_id = queue.submit("long.wav")
+        requeued = []
+
+        def transcribe(path):
+            for _ in range(5):
+                time.sleep(0.06)
+                requeued.append(other_process.requeue_expired())
+            return "still alive"
+
+        jobs.run_worker(queue, transcribe=transcribe, exit_when_empty=True)
+
+        self.assertEqual(requeued, [0] * 5)
+        self.assertEqual(queue.get(job_id)["status"], jobs.DONE)
+        self.assertEqual(queue.get(job_id)["attempts"], 1)
+
+    def test_unknown_job(self):
+        self.assertIsNone(self.queue.get("missing"))
+
+
+if __name__ == '__main__':
+    unittest.main()
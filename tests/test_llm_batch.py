@@ -0,0 +1,83 @@
+# --- Batched LLM Analysis Tests against a local mock OpenAI-compatible server --- #
+
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from openai import AsyncOpenAI
+
+from src import pipeline
+
+
+def _analysis(transcript, i=None):
+    """Deterministic mock analysis; transcripts containing INVALID get a malformed topic vector."""
+    result = {"topics": ["t1", "t2", "t3", "t4", "t5"],
+              "topic_vector": [0.1, 0.2, 0.3] if "INVALID" in transcript else [round(len(transcript) % 10 / 10, 1)] * 5,
+              "engagement_score": 0.5}
+    if i is not None:
+        result["id"] = i
+    return result
+
+
+class _MockOpenAIHandler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["messages"][-1]["content"]
+        packed = re.findall(r"<<<TRANSCRIPT (\d+)>>>\n(.*?)\n<<<END TRANSCRIPT", prompt, re.S)
+        type(self).requests.append(len(packed) or 1)
+
+        if packed:
+            content = {"results": [_analysis(text, int(i)) for i, text in packed]}
+        else:
+            content = _analysis(re.search(r'"""\n\s*(.*?)\n\s*"""', prompt, re.S).group(1))
+
+        payload = json.dumps({"id": "mock", "object": "chat.completion", "created": 0, "model": body["model"],
+                              "choices": [{"index": 0, "finish_reason": "stop",
+                                           "message": {"role": "assistant", "content": json.dumps(content)}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def mock_llm(monkeypatch):
+    _MockOpenAIHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MockOpenAIHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    monkeypatch.setattr(pipeline, "get_async_openai_client", lambda: AsyncOpenAI(base_url=base_url, api_key="test", max_retries=0))
+    monkeypatch.setattr(pipeline, "get_topic_cache", lambda: None)
+    yield _MockOpenAIHandler.requests
+
+    server.shutdown()
+    server.server_close()
+
+
+def test_batch_packs_transcripts_and_keeps_order(mock_llm):
+    transcripts = [f"transcript {'x' * i}" for i in range(12)]
+    results = pipeline.get_topics_and_vectors_batch(transcripts, pack_size=5, requests_per_minute=0)
+
+    assert len(mock_llm) == 3
+    assert [result[1] for result in results] == [_analysis(t)["topic_vector"] for t in transcripts]
+
+
+def test_batch_validates_each_result_separately(mock_llm):
+    transcripts = ["a good transcript", "an INVALID transcript", "another good one"]
+    results = pipeline.get_topics_and_vectors_batch(transcripts, pack_size=3, requests_per_minute=0)
+
+    # The invalid result is retried alone, then falls back, without affecting its pack mates
+    assert mock_llm == [3, 1]
+    assert results[1] == pipeline.TOPIC_FALLBACK
+    assert results[0][1] == _analysis(transcripts[0])["topic_vector"]
+    assert results[2][1] == _analysis(transcripts[2])["topic_vector"]
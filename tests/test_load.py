@@ -0,0 +1,59 @@
+# --- Concurrent Load Tests --- #
+
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import httpx
+import numpy as np
+
+from src.main import app
+from src import pipeline
+
+LLM_LATENCY = 0.2
+VADER_LATENCY = 0.05
+N_REQUESTS = 40
+
+
+class _SlowCompletions:
+    """Stands in for the OpenAI API with a fixed network latency."""
+    async def create(self, **kwargs):
+        await asyncio.sleep(LLM_LATENCY)
+        content = json.dumps({"topics": ["a", "b", "c", "d", "e"], "topic_vector": [0.5] * 5, "engagement_score": 0.5})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class _SlowVader:
+    """Stands in for VADER with a fixed amount of blocking CPU time."""
+    def polarity_scores(self, transcript):
+        time.sleep(VADER_LATENCY)
+        return {"compound": 0.1}
+
+
+async def _timed_match(client, i):
+    start = time.perf_counter()
+    response = await client.post("/match", json={"text": f"Load test transcript number {i}."})
+    assert response.status_code == 200
+    return time.perf_counter() - start
+
+
+async def _run_load():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*(_timed_match(client, i) for i in range(N_REQUESTS)))
+
+
+def test_match_p99_latency_under_concurrent_load(monkeypatch):
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=_SlowCompletions()))
+    monkeypatch.setattr(pipeline, "get_async_openai_client", lambda: fake_client)
+    monkeypatch.setattr(pipeline, "get_vader_analyzer", lambda: _SlowVader())
+    monkeypatch.setattr(pipeline, "get_topic_cache", lambda: None)
+
+    latencies = asyncio.run(_run_load())
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(f"\n/match x{N_REQUESTS} concurrent: p50 {p50 * 1000:.0f} ms, p99 {p99 * 1000:.0f} ms")
+
+    # If the handlers blocked the event loop, requests would run one after another
+    serial_time = N_REQUESTS * (LLM_LATENCY + VADER_LATENCY)
+    assert p99 < serial_time / 4
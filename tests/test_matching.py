@@ -0,0 +1,50 @@
+import unittest
+import numpy as np
+
+from src.heuristics import calculate_trait_score_matrix
+from src.matching import PsychometricIndex
+
+
+class TestPsychometricIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.psychometrics = rng.random((2000, 5))
+        self.user_ids = [f"user_{i}" for i in range(len(self.psychometrics))]
+        self.index = PsychometricIndex(self.user_ids, self.psychometrics, block_size=64)
+
+    def _brute_force(self, row, k):
+        _, scores = calculate_trait_score_matrix(self.psychometrics[row], self.psychometrics)
+        scores = scores[0].copy()
+        scores[row] = -np.inf
+        return [self.user_ids[i] for i in np.argsort(-scores, kind="stable")[:k]]
+
+    def test_top_k_matches_brute_force(self):
+        """
+        The pruned search should return exactly the same ranking as scoring every candidate.
+        """
+        for row in (0, 17, 999, 1999):
+            result = self.index.top_k(self.user_ids[row], 25)
+            self.assertEqual([match["user_id"] for match in result], self._brute_force(row, 25))
+
+    def test_top_k_excludes_query_user(self):
+        """
+        A user should never be recommended to themselves.
+        """
+        result = self.index.top_k("user_3", 50)
+        self.assertNotIn("user_3", [match["user_id"] for match in result])
+
+    def test_top_k_is_capped_by_population(self):
+        """
+        Asking for more partners than exist returns everyone else.
+        """
+        small = PsychometricIndex(["a", "b", "c"], self.psychometrics[:3])
+        self.assertEqual(len(small.top_k("a", 10)), 2)
+
+    def test_unknown_user_raises(self):
+        with self.assertRaises(KeyError):
+            self.index.top_k("missing", 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
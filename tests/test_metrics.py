@@ -0,0 +1,44 @@
+import asyncio
+import unittest
+
+from src import metrics
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = metrics.Histogram("test_duration_seconds", "Test.", ["stage"], buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, "llm")
+
+        rendered = "\n".join(histogram.render())
+        self.assertIn('test_duration_seconds_bucket{stage="llm",le="0.1"} 1', rendered)
+        self.assertIn('test_duration_seconds_bucket{stage="llm",le="1.0"} 2', rendered)
+        self.assertIn('test_duration_seconds_bucket{stage="llm",le="+Inf"} 3', rendered)
+        self.assertIn('test_duration_seconds_count{stage="llm"} 3', rendered)
+
+    def test_counter_is_split_by_labels(self):
+        counter = metrics.Counter("test_total", "Test.", ["reason"])
+        counter.inc("error")
+        counter.inc("error")
+        counter.inc("invalid_output", amount=3)
+        self.assertEqual(counter.value("error"), 2)
+        self.assertEqual(counter.value("invalid_output"), 3)
+
+    def test_timed_records_sync_and_async_calls(self):
+        @metrics.timed("test_sync_stage")
+        def sync_stage():
+            return 1
+
+        @metrics.timed("test_async_stage")
+        async def async_stage():
+            return 2
+
+        self.assertEqual(sync_stage(), 1)
+        self.assertEqual(asyncio.run(async_stage()), 2)
+        self.assertEqual(metrics.STAGE_DURATION.count("test_sync_stage"), 1)
+        self.assertEqual(metrics.STAGE_DURATION.count("test_async_stage"), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+# --- Pipeline Unit Tests --- #
+
+import asyncio
+import io
+import os
+import subprocess
+import sys
+import time
+import types
+
+import numpy as np
+import pytest
+
+from src import cache
+from src import pipeline
+from src import topic_backends
+
+AUDIO_PATH = os.path.join(os.path.dirname(__file__), "dummy_audio.wav")
+
+
+def _pcm_bytes(n_seconds):
+    samples = np.arange(int(n_seconds * pipeline.WHISPER_SAMPLE_RATE)) % 1000
+    return samples.astype(np.int16).tobytes()
+
+
+def test_pcm_windows_overlap_and_cover_audio():
+    windows = list(pipeline._iter_pcm_windows(io.BytesIO(_pcm_bytes(25)), window_seconds=10, overlap_seconds=2))
+
+    assert [offset for offset, _, _ in windows] == [0, 8, 16]
+    assert [is_last for _, _, is_last in windows] == [False, False, True]
+    assert all(len(window) <= 10 * pipeline.WHISPER_SAMPLE_RATE for _, window, _ in windows)
+
+    # The last window ends exactly at the end of the audio
+    offset, window, _ = windows[-1]
+    assert offset + len(window) / pipeline.WHISPER_SAMPLE_RATE == 25
+
+
+class _FakeWhisper:
+    """Returns one segment every 3 seconds of the audio window it is given."""
+    def transcribe(self, audio, initial_prompt=None):
+        duration = len(audio) / pipeline.WHISPER_SAMPLE_RATE
+        starts = np.arange(0, duration, 3.0)
+        return {"segments": [{"start": s, "end": min(s + 3.0, duration), "text": f" seg{s}"} for s in starts]}
+
+
+def test_stream_stitches_overlapping_windows(monkeypatch):
+    monkeypatch.setattr(pipeline, "get_whisper_model", lambda: _FakeWhisper())
+    monkeypatch.setattr(pipeline, "_iter_audio_windows",
+                        lambda path, window, overlap: pipeline._iter_pcm_windows(io.BytesIO(_pcm_bytes(50)), window, overlap))
+
+    segments = list(pipeline.transcribe_audio_stream("unused.wav", window_seconds=20, overlap_seconds=4))
+    starts = [segment["start"] for segment in segments]
+
+    # Segments come out in order, with no duplicates from the overlapping audio, and cover the whole file
+    assert starts == sorted(starts)
+    assert len(starts) == len(set(starts))
+    assert starts[0] == 0
+    assert segments[-1]["end"] == 50
+
+
+def _decode_path_with_ffmpeg(path):
+    pcm = subprocess.run(pipeline._ffmpeg_pcm_command(path), capture_output=True, check=True).stdout
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def test_uploads_decode_from_memory_and_file_objects():
+    expected = _decode_path_with_ffmpeg(AUDIO_PATH)
+    with open(AUDIO_PATH, "rb") as f:
+        data = f.read()
+        assert np.array_equal(pipeline.decode_audio(data), expected)
+        assert np.array_equal(pipeline.decode_audio(f), expected)
+    assert np.array_equal(pipeline.decode_audio(io.BytesIO(data)), expected)
+
+
+def test_stream_windows_decode_from_memory():
+    expected = _decode_path_with_ffmpeg(AUDIO_PATH)
+    with open(AUDIO_PATH, "rb") as f:
+        windows = list(pipeline._iter_audio_windows(f.read(), window_seconds=10, overlap_seconds=0))
+    assert np.array_equal(np.concatenate([window for _, window, _ in windows]), expected)
+
+
+def test_vad_trims_silence_and_maps_segments_back(monkeypatch):
+    class _RecordingWhisper:
+        def transcribe(self, audio, **kwargs):
+            self.seconds = len(audio) / pipeline.WHISPER_SAMPLE_RATE
+            return {"text": " hi", "segments": [{"start": self.seconds - 0.5, "end": self.seconds, "text": " hi"}]}
+
+    t = np.arange(pipeline.WHISPER_SAMPLE_RATE) / pipeline.WHISPER_SAMPLE_RATE
+    tone = (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    audio = np.concatenate([tone, np.zeros(10 * pipeline.WHISPER_SAMPLE_RATE, dtype=np.float32), tone])
+    monkeypatch.setattr(pipeline.config, "VAD_ENABLED", True)
+
+    model = _RecordingWhisper()
+    result, trimmed_seconds = pipeline._transcribe_pcm(model, audio)
+
+    # Whisper only sees the two voiced seconds (plus padding), and the last segment ends at the end of the original clip
+    assert model.seconds < 3
+    assert trimmed_seconds > 9
+    assert abs(result["segments"][0]["end"] - 12) < 0.05
+
+
+def test_analyse_audio_streams_stages_and_overlaps_llm_with_vader(monkeypatch):
+    async def fake_transcribe(audio_path):
+        return "A short conversation about rockets."
+
+    async def slow_topics(transcript):
+        await asyncio.sleep(0.2)
+        return ["a", "b", "c", "d", "e"], [0.9, 0.7, 0.3, 0.4, 0.6], 0.8
+
+    async def fast_vader(transcript):
+        await asyncio.sleep(0.1)
+        return 0.2
+
+    monkeypatch.setattr(pipeline, "transcribe_audio_async", fake_transcribe)
+    monkeypatch.setattr(pipeline, "get_topics_and_vectors_async", slow_topics)
+    monkeypatch.setattr(pipeline, "get_vader_sentiment_async", fast_vader)
+    monkeypatch.setattr(pipeline, "get_analysis_store", lambda: store)
+    store = cache.AnalysisStore()
+
+    async def run():
+        start = time.perf_counter()
+        stages = [stage async for stage in pipeline.analyse_audio_async("audio.wav", [0.5] * 5, [0.4] * 5)]
+        return stages, time.perf_counter() - start
+
+    stages, elapsed = asyncio.run(run())
+    assert [name for name, _ in stages] == ["transcript", "sentiment", "topics", "baseline_score", "heuristic_score"]
+    assert elapsed < 0.3
+
+    # The analysis is stored under the returned analysis_id, so /match can reuse it
+    analysis_id = dict(stages)["topics"]["analysis_id"]
+    assert store.get(analysis_id)["analysis_results"]["vader_engagement"] == 0.2
+
+
+def test_topic_backend_is_selected_by_config_and_keyed_separately(monkeypatch):
+    topic_cache = cache.TopicCache(":memory:")
+    monkeypatch.setattr(pipeline, "get_topic_cache", lambda: topic_cache)
+    monkeypatch.setattr(pipeline, "get_topic_backend", pipeline._lazy(pipeline.get_topic_backend.__wrapped__))
+    monkeypatch.setattr(pipeline.config, "TOPIC_BACKEND", "mock")
+
+    transcript = "A short conversation about rockets."
+    expected = topic_backends.MockTopicBackend().analyse(transcript)
+    assert pipeline.get_topics_and_vectors(transcript) == expected
+    assert asyncio.run(pipeline.get_topics_and_vectors_async(transcript)) == expected
+    assert asyncio.run(pipeline.get_topics_and_vectors_batch_async([transcript, "Another one."])) == [expected, expected]
+
+    # Results from one backend are never served for another
+    mock_key = cache.make_cache_key(transcript, pipeline.topic_model_name(), pipeline.config.TOPIC_PROMPT_VERSION)
+    monkeypatch.setattr(pipeline.config, "TOPIC_BACKEND", "openai")
+    openai_key = cache.make_cache_key(transcript, pipeline.topic_model_name(), pipeline.config.TOPIC_PROMPT_VERSION)
+    assert topic_cache.get(mock_key) is not None
+    assert topic_cache.get(openai_key) is None
+
+
+def _fake_whisper_module(torch):
+    """
+    A whisper module whose load_model returns a tiny model built from Whisper's own Linear subclass.
+    """
+    class Linear(torch.nn.Linear):
+        def forward(self, x):
+            return super().forward(x.to(self.weight.dtype))
+
+    class TinyModel(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.encoder = Linear(8, 8)
+            self.decoder = torch.nn.Sequential(Linear(8, 4), torch.nn.ReLU())
+
+        def forward(self, x):
+            return self.decoder(self.encoder(x))
+
+    return types.SimpleNamespace(model=types.SimpleNamespace(Linear=Linear), load_model=lambda *args, **kwargs: TinyModel())
+
+
+def test_int8_whisper_quantizes_linear_layers_and_sets_threads(monkeypatch):
+    torch = pytest.importorskip("torch")
+    monkeypatch.setitem(sys.modules, "whisper", _fake_whisper_module(torch))
+    threads = torch.get_num_threads()
+    try:
+        model = pipeline.load_whisper_model("tiny", device="cpu", threads=2, int8=True)
+        assert torch.get_num_threads() == 2
+    finally:
+        torch.set_num_threads(threads)
+
+    quantized_linear = torch.ao.nn.quantized.dynamic.Linear
+    assert isinstance(model.encoder, quantized_linear)
+    assert isinstance(model.decoder[0], quantized_linear)
+    assert model(torch.rand(3, 8)).shape == (3, 4)
+
+
+def test_int8_whisper_is_cpu_only(monkeypatch):
+    monkeypatch.setitem(sys.modules, "whisper", types.SimpleNamespace())
+    with pytest.raises(ValueError):
+        pipeline.load_whisper_model("tiny", device="cuda", int8=True)
@@ -0,0 +1,117 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src import pipeline
+from src.matching import PsychometricIndex
+from src.profile_store import ProfileStore, convert_json_to_store, MATRIX_FILENAME
+
+
+class TestProfileStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.tmp_dir.name, "user_profiles.json")
+        self.store_path = os.path.join(self.tmp_dir.name, "profile_store")
+        with open(self.json_path, "w") as f:
+            json.dump([{"id": "user_1", "psychometrics": [0.8, 0.4, 0.7, 0.2, 0.9]},
+                       {"id": "user_2", "psychometrics": [0.3, 0.9, 0.1, 0.6, 0.4]}], f)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_convert_from_json(self):
+        store = convert_json_to_store(self.json_path, self.store_path)
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.psychometrics.dtype, np.float32)
+        np.testing.assert_allclose(store.get("user_2"), [0.3, 0.9, 0.1, 0.6, 0.4], rtol=1e-6)
+
+    def test_reopened_store_is_memory_mapped(self):
+        convert_json_to_store(self.json_path, self.store_path)
+        store = ProfileStore(self.store_path)
+        self.assertIsInstance(store.psychometrics, np.memmap)
+        self.assertIn("user_1", store)
+
+    def test_append_does_not_rewrite_existing_rows(self):
+        store = convert_json_to_store(self.json_path, self.store_path)
+        matrix_path = os.path.join(self.store_path, MATRIX_FILENAME)
+        with open(matrix_path, "rb") as f:
+            before = f.read()
+
+        store.append(["user_3"], [[0.1, 0.2, 0.3, 0.4, 0.5]])
+
+        with open(matrix_path, "rb") as f:
+            after = f.read()
+        self.assertEqual(after[:len(before)], before)
+        self.assertEqual(len(ProfileStore(self.store_path)), 3)
+
+    def test_appending_an_existing_id_supersedes_it(self):
+        store = convert_json_to_store(self.json_path, self.store_path)
+        store.append(["user_1"], [[0.5] * 5])
+        self.assertEqual(len(store), 2)
+        np.testing.assert_allclose(store.get("user_1"), [0.5] * 5)
+
+        index = PsychometricIndex.from_store(store)
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.top_k("user_2", 1)[0]["user_id"], "user_1")
+
+    def test_index_is_unaffected_by_later_appends(self):
+        store = convert_json_to_store(self.json_path, self.store_path)
+        index = PsychometricIndex.from_store(store)
+        store.append(["user_1", "user_3"], [[0.5] * 5, [0.1] * 5])
+
+        self.assertIn("user_1", index)
+        self.assertNotIn("user_3", index)
+        self.assertEqual(index.top_k("user_2", 1)[0]["user_id"], "user_1")
+
+    def _edit_json(self, profiles):
+        mtime = os.stat(self.json_path).st_mtime_ns
+        with open(self.json_path, "w") as f:
+            json.dump(profiles, f)
+        os.utime(self.json_path, ns=(mtime + 10**9, mtime + 10**9))
+
+    def test_store_is_rebuilt_when_json_changes(self):
+        pipeline.load_profile_store(self.store_path, self.json_path)
+        matrix_inode = os.stat(os.path.join(self.store_path, MATRIX_FILENAME)).st_ino
+
+        # A touched but unchanged file is not converted again
+        with open(self.json_path) as f:
+            profiles = json.load(f)
+        self._edit_json(profiles)
+        pipeline.load_profile_store(self.store_path, self.json_path)
+        self.assertEqual(os.stat(os.path.join(self.store_path, MATRIX_FILENAME)).st_ino, matrix_inode)
+
+        profiles[0]["psychometrics"] = [0.1] * 5
+        self._edit_json(profiles + [{"id": "user_3", "psychometrics": [0.2] * 5}])
+        store = pipeline.load_profile_store(self.store_path, self.json_path)
+        self.assertEqual(len(store), 3)
+        np.testing.assert_allclose(store.get("user_1"), [0.1] * 5, rtol=1e-6)
+        self.assertEqual(len(ProfileStore(self.store_path).ids), 3)
+
+    def test_changed_json_does_not_overwrite_appended_users(self):
+        store = pipeline.load_profile_store(self.store_path, self.json_path)
+        store.append(["user_3"], [[0.2] * 5])
+        self._edit_json([{"id": "user_1", "psychometrics": [0.1] * 5}])
+        with self.assertRaises(ValueError):
+            pipeline.load_profile_store(self.store_path, self.json_path)
+
+    def test_partial_append_is_ignored(self):
+        store = convert_json_to_store(self.json_path, self.store_path)
+        with open(os.path.join(self.store_path, MATRIX_FILENAME), "ab") as f:
+            f.write(b"\x00" * 7)
+
+        reopened = ProfileStore(self.store_path)
+        self.assertEqual(len(reopened), 2)
+        reopened.append(["user_3"], [[0.1] * 5])
+        np.testing.assert_allclose(ProfileStore(self.store_path).get("user_3"), [0.1] * 5, rtol=1e-6)
+
+    def test_missing_store(self):
+        with self.assertRaises(FileNotFoundError):
+            ProfileStore(os.path.join(self.tmp_dir.name, "missing"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+# --- Per-request Profiling Tests --- #
+
+import asyncio
+import json
+import os
+import pstats
+import threading
+import tracemalloc
+
+import numpy as np
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from src import config
+from src import pipeline
+from src import profiling
+from src.main import app, profile_request
+
+client = TestClient(app)
+
+
+def _enable(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(config, "PROFILING_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "PROFILING_DIR", str(tmp_path))
+
+
+def test_profiled_request_saves_artifacts(monkeypatch, tmp_path):
+    _enable(monkeypatch, tmp_path)
+    analysis = {"analysis_id": "id", "topics": ["a"] * 5,
+                "analysis_results": {"topic_vector": [0.9, 0.7, 0.3, 0.4, 0.6], "engagement_score": 0.8, "vader_engagement": 0.2, "word_count": 500}}
+
+    # Some real CPU work in the executor, for the stack sampler to see
+    async def slow_analysis(transcript=None, analysis_id=None):
+        pers = np.random.default_rng(0).random((20000, 5))
+        await pipeline.run_in_executor(pipeline.match_pairs, pers, pers, analysis["analysis_results"])
+        return analysis
+
+    monkeypatch.setattr(pipeline, "analyse_transcript_async", slow_analysis)
+    response = client.post("/match", json={"text": "A slow conversation."}, headers={"X-Profile": "secret"})
+    assert response.status_code == 200
+
+    profile_id = response.headers["x-profile-id"]
+    with open(os.path.join(tmp_path, f"{profile_id}.json")) as f:
+        summary = json.load(f)
+    assert summary["path"] == "/match"
+    assert summary["status_code"] == 200
+    assert summary["tracemalloc_peak_mb"] > 0
+    assert summary["top_allocations"]
+
+    assert pstats.Stats(os.path.join(tmp_path, f"{profile_id}.pstats")).total_calls > 0
+    with open(os.path.join(tmp_path, f"{profile_id}.folded")) as f:
+        folded = f.read()
+    assert "match_pairs (pipeline.py" in folded
+
+
+def test_profiling_is_opt_in_and_restricted(monkeypatch, tmp_path):
+    request = {"user_id": "user_1", "k": 5}
+    assert "x-profile-id" not in client.post("/match/top-k", json=request, headers={"X-Profile": "secret"}).headers
+
+    _enable(monkeypatch, tmp_path)
+    assert "x-profile-id" not in client.post("/match/top-k", json=request).headers
+    assert "x-profile-id" not in client.post("/match/top-k", json=request, headers={"X-Profile": "wrong"}).headers
+    assert "x-profile-id" in client.post("/match/top-k?profile=secret", json=request).headers
+    assert len(os.listdir(tmp_path)) == 3
+
+
+def test_profile_of_a_dropped_response_is_stopped(monkeypatch, tmp_path):
+    _enable(monkeypatch, tmp_path)
+    monkeypatch.setattr(config, "PROFILING_MAX_SECONDS", 0.05)
+
+    async def call_next(request):
+        async def body():
+            yield b"never sent"
+        return StreamingResponse(body())
+
+    async def run():
+        scope = {"type": "http", "method": "POST", "path": "/match", "query_string": b"", "headers": [(b"x-profile", b"secret")]}
+        response = await profile_request(Request(scope), call_next)
+        # The client disconnects before the body iterator is ever started
+        profile_id = response.headers["x-profile-id"]
+        del response
+        await asyncio.sleep(0.2)
+        return profile_id
+
+    profile_id = asyncio.run(run())
+    assert not profiling._ACTIVE.locked()
+    assert not tracemalloc.is_tracing()
+    assert not any(thread.name == "request-profiler" for thread in threading.enumerate())
+    with open(os.path.join(tmp_path, f"{profile_id}.json")) as f:
+        assert json.load(f)["timed_out"]
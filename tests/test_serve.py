@@ -0,0 +1,41 @@
+# --- Pre-fork Server Tests --- #
+
+import os
+import signal
+import time
+
+import pytest
+
+from src import config
+from src import serve
+
+
+def test_topic_cache_cannot_be_preloaded_before_fork():
+    with pytest.raises(ValueError):
+        serve.serve("127.0.0.1", 0, n_workers=1, components=["vader", "topic_cache"])
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_server_stops_when_workers_keep_crashing(monkeypatch):
+    def crash_on_startup(sock, components, app, n_workers):
+        raise RuntimeError("bad config")
+
+    monkeypatch.setattr(serve, "_run_worker", crash_on_startup)
+    monkeypatch.setattr(config, "SERVE_RESTART_BACKOFF_SECONDS", 0.01)
+    monkeypatch.setattr(config, "SERVE_MAX_RESTARTS", 3)
+    forks = []
+    fork_worker = serve._fork_worker
+    monkeypatch.setattr(serve, "_fork_worker", lambda *args: forks.append(1) or fork_worker(*args))
+
+    handlers = {signum: signal.getsignal(signum) for signum in (signal.SIGINT, signal.SIGTERM)}
+    start = time.monotonic()
+    try:
+        with pytest.raises(RuntimeError):
+            serve.serve("127.0.0.1", 0, n_workers=2, components=[], preload=False)
+    finally:
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+
+    # Two workers, then three restarts, then the server gives up
+    assert len(forks) == 5
+    assert time.monotonic() - start < 10
@@ -0,0 +1,60 @@
+# --- Live Session Tests --- #
+
+import asyncio
+
+from src import pipeline
+from src import sessions
+
+
+def _patch_pipeline(monkeypatch):
+    calls = {"vader": [], "llm": []}
+
+    async def fake_vader(text):
+        calls["vader"].append(text)
+        return 0.5 if "great" in text else -0.5
+
+    async def fake_topics(transcript):
+        calls["llm"].append(transcript)
+        return ["Space", "Travel", "Risk", "Family", "Work"], [0.9, 0.7, 0.3, 0.4, 0.6], 0.9
+
+    monkeypatch.setattr(pipeline, "get_vader_sentiment_async", fake_vader)
+    monkeypatch.setattr(pipeline, "get_topics_and_vectors_async", fake_topics)
+    return calls
+
+
+def test_chunks_update_running_aggregates(monkeypatch):
+    calls = _patch_pipeline(monkeypatch)
+    session = sessions.LiveSession([0.8, 0.4, 0.7, 0.2, 0.9], [0.3, 0.9, 0.1, 0.6, 0.4], topic_interval_words=1000)
+
+    async def run():
+        await session.add_chunk("this is great news")
+        return await session.add_chunk("that is bad")
+
+    scores = asyncio.run(run())
+
+    # VADER only ever sees the new chunk, and its scores are averaged by word count
+    assert calls["vader"] == ["this is great news", "that is bad"]
+    assert scores["word_count"] == 7
+    assert abs(scores["vader_engagement"] - (4 * 0.5 - 3 * 0.5) / 7) < 1e-12
+    assert calls["llm"] == []
+    assert scores["topics"] == []
+
+
+def test_topics_refresh_at_word_intervals(monkeypatch):
+    calls = _patch_pipeline(monkeypatch)
+    session = sessions.LiveSession([0.8, 0.4, 0.7, 0.2, 0.9], [0.3, 0.9, 0.1, 0.6, 0.4], topic_interval_words=10)
+
+    async def run():
+        before = await session.add_chunk("one two three four five six")
+        await session.add_chunk("seven eight nine ten")
+        after = await session.flush()
+        await session.add_chunk("eleven twelve")
+        return before, after
+
+    before, after = asyncio.run(run())
+
+    # One analysis of the first ten words, and none for the next two
+    assert calls["llm"] == ["one two three four five six seven eight nine ten"]
+    assert after["topics_word_count"] == 10
+    assert after["topics"][0] == "Space"
+    assert after["heuristic_score"]["match_score"] != before["heuristic_score"]["match_score"]
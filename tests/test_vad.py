@@ -0,0 +1,53 @@
+import unittest
+
+import numpy as np
+
+from src.vad import detect_speech
+
+SAMPLE_RATE = 16000
+
+
+def _tone(seconds):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def _silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+class TestVoiceActivityDetection(unittest.TestCase):
+
+    def setUp(self):
+        # 1s speech, 5s silence, 1s speech, 0.5s pause, 1s speech
+        self.audio = np.concatenate([_tone(1), _silence(5), _tone(1), _silence(0.5), _tone(1)])
+
+    def test_long_silences_are_dropped_and_short_pauses_kept(self):
+        speech = detect_speech(self.audio, SAMPLE_RATE, min_silence_seconds=1.0, padding_seconds=0.2)
+
+        self.assertEqual(len(speech.regions), 2)
+        self.assertAlmostEqual(speech.trimmed_seconds, 5 - 0.4, places=1)
+        self.assertEqual(len(speech.voiced(self.audio)), speech.voiced_samples)
+
+    def test_timestamps_map_back_to_original_audio(self):
+        speech = detect_speech(self.audio, SAMPLE_RATE, min_silence_seconds=1.0, padding_seconds=0.0)
+        first_end = speech.regions[0][1] / SAMPLE_RATE
+        second_start = speech.regions[1][0] / SAMPLE_RATE
+
+        # The second region starts about 1s into the trimmed audio, and about 6s into the original
+        self.assertAlmostEqual(second_start, 6.0, places=1)
+        self.assertAlmostEqual(speech.to_original(first_end), second_start, places=6)
+        self.assertAlmostEqual(speech.to_original(first_end, is_end=True), first_end, places=6)
+
+        segments = speech.map_segments([{"start": 0.5, "end": first_end + 0.5, "text": " hi"}])
+        self.assertAlmostEqual(segments[0]["start"], 0.5, places=6)
+        self.assertAlmostEqual(segments[0]["end"], second_start + 0.5, places=6)
+
+    def test_silent_audio_has_no_speech(self):
+        speech = detect_speech(_silence(3), SAMPLE_RATE)
+        self.assertEqual(speech.regions, [])
+        self.assertAlmostEqual(speech.trimmed_seconds, 3.0)
+
+
+if __name__ == '__main__':
+    unittest.main()